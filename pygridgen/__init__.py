@@ -14,6 +14,7 @@ Released under an MIT license.
 
 from .grid import *  # noqa: F403
 from . import csa  # noqa: F401
+from . import roms  # noqa: F401
 from . import utils  # noqa: F401
 from .tests import test, teststrict  # noqa: F401
 
@@ -1,10 +1,97 @@
+import re
 import sys
 import os
+import time
 import ctypes
+import logging
 
 import numpy
 from matplotlib import pyplot
 
+from .utils import log_native_output
+
+
+logger = logging.getLogger(__name__)
+
+_CSA_STAGES = [
+    ('squarize', 'squarizing'),
+    ('primary', 'primary triangles'),
+    ('secondary', 'propagating'),
+    ('check', 'checking that all coefficients'),
+]
+
+
+def parse_csa_message(line):
+    """
+    Make sense of a line csa printed in verbose mode.
+
+    Parameters
+    ----------
+    line : str
+
+    Returns
+    -------
+    info : dict
+        ``message`` (the stripped line) and ``stage`` (one of
+        'squarize', 'primary', 'secondary', 'check', or None for details
+        of the current stage). The summary of the primary fits also
+        gets the spline ``order`` and the number of ``sets`` fitted
+        with it, and the size of the square grid ``squares``.
+
+    Examples
+    --------
+    >>> info = parse_csa_message('  2nd order -- 14 sets')
+    >>> info['order'], info['sets']
+    (2, 14)
+
+    """
+
+    message = line.strip()
+    info = {'message': message, 'stage': None}
+    for stage, keyword in _CSA_STAGES:
+        if keyword in message:
+            info['stage'] = stage
+
+    order = re.match(r'(\d)\w\w order -- (\d+) sets', message)
+    if order is not None:
+        info['order'] = int(order.group(1))
+        info['sets'] = int(order.group(2))
+
+    squares = re.match(r'(\d+) x (\d+) squares', message)
+    if squares is not None:
+        info['squares'] = (int(squares.group(1)), int(squares.group(2)))
+
+    return info
+
+
+def _as_points(chunk):
+    """ A chunk of input points as a new (n, 3) array of doubles. """
+    if isinstance(chunk, tuple):
+        x, y, z = (numpy.ravel(values) for values in chunk)
+        if not x.size == y.size == z.size:
+            raise ValueError('x, y and z must have the same number of elements')
+        points = numpy.empty((x.size, 3), dtype='d')
+        points[:, 0] = x
+        points[:, 1] = y
+        points[:, 2] = z
+        return points
+
+    chunk = numpy.asarray(chunk)
+    if chunk.ndim != 2 or chunk.shape[1] != 3:
+        raise ValueError(f'the points must have a shape of (n, 3), not {chunk.shape}')
+    return numpy.array(chunk, dtype='d', order='C')
+
+
+def _bin_sums(keys, values):
+    """
+    The unique rows of ``keys`` and, for each, the sums of the matching
+    rows of ``values``.
+    """
+    unique, inverse = numpy.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    sums = [numpy.bincount(inverse, weights=column, minlength=len(unique)) for column in values.T]
+    return unique, numpy.column_stack(sums)
+
 
 class CSA:
     """
@@ -33,13 +120,30 @@ class CSA:
     npmax : integer
         Maximum number of points locally involved in spline
         calculation (default = 40)
+    verbose : bool
+        Have csa report its progress (default = False). The messages
+        are sent to the ``pygridgen.csa`` logger (see
+        :func:`~parse_csa_message`) and the time spent in each stage
+        is recorded in ``timings['stages']``.
+    refit : bool
+        Keep the least squares fits at the input points, so that when
+        only ``zin`` is replaced, the spline is refit from them, which
+        is much faster (default = False). Keeping them makes the first
+        fit slower and uses more memory. Needs a csa library built from
+        the sources shipped with pygridgen; the spline is computed from
+        scratch otherwise.
 
     Returns
     -------
     csa_interp : object
         This object can be called with arguments of x and y points to be
         interpolated to.  The input data, zin, can be reset by overwriting
-        that object parameter.
+        that object parameter. The spline is computed once and reused
+        until ``xin``, ``yin``, ``zin``, ``sigma`` or one of the
+        parameters is replaced (modifying the arrays in place goes
+        unnoticed). With ``refit``, replacing only ``zin`` reuses the
+        least squares fits at the input points, and the time it took is
+        recorded in ``timings['refit']`` instead of ``timings['spline']``.
 
     Examples
     --------
@@ -77,8 +181,25 @@ class CSA:
             raise OSError('Failed to load the CSA library.')
 
     _csa.csa_approximatepoints2.restype = ctypes.POINTER(ctypes.c_double)
-
-    def __init__(self, xin, yin, zin, sigma=None, npmin=3, npmax=40, k=140, nppc=5):
+    _csa.csa_create.restype = ctypes.c_void_p
+    _csa.csa_destroy.argtypes = [ctypes.c_void_p]
+    _csa.csa_addpoints.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p]
+    _csa.csa_addstd.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p]
+    _csa.csa_calculatespline.argtypes = [ctypes.c_void_p]
+    _csa.csa_approximatepoints.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_void_p]
+    for _setter in ['csa_setnpmin', 'csa_setnpmax', 'csa_setk', 'csa_setnppc']:
+        getattr(_csa, _setter).argtypes = [ctypes.c_void_p, ctypes.c_int]
+
+    # libraries built from pygridgen's own sources can refit the spline to
+    # new values at the same points
+    _refit = hasattr(_csa, 'csa_refit')
+    if _refit:
+        _csa.csa_refit.argtypes = [ctypes.c_void_p]
+        _csa.csa_setrefit.argtypes = [ctypes.c_void_p, ctypes.c_int]
+
+    def __init__(self, xin, yin, zin, sigma=None, npmin=3, npmax=40, k=140, nppc=5,
+                 verbose=False, refit=False):
+        self._points = None
         self.xin = numpy.asarray(xin)
         self.yin = numpy.asarray(yin)
 
@@ -94,11 +215,184 @@ class CSA:
         self.nppc = nppc
         self.npmin = npmin
         self.npmax = npmax
+        self.verbose = verbose
+        self.refit = refit
+        self.timings = {}
+
+        # the native spline, and the inputs it was computed from
+        self._handle = None
+        self._handle_inputs = None
+        self._buffers = None
+
+    @classmethod
+    def _from_points(cls, points, sigma=None, npmin=3, npmax=40, k=140, nppc=5,
+                     verbose=False, refit=False):
+        """
+        A CSA over a list of (n, 3) float arrays of x, y and z, which
+        are handed to csa as they are.
+        """
+        if not sum(len(chunk) for chunk in points):
+            raise ValueError('no input points')
+
+        self = cls.__new__(cls)
+        self._points = points
+        self._xin = self._yin = self._zin = None
+        self.sigma = sigma
+        self.k = k
+        self.nppc = nppc
+        self.npmin = npmin
+        self.npmax = npmax
+        self.verbose = verbose
+        self.refit = refit
+        self.timings = {}
+        self._handle = None
+        self._handle_inputs = None
+        self._buffers = None
+        return self
+
+    @classmethod
+    def from_chunks(cls, chunks, bin_size=None, **kwargs):
+        """
+        Build a CSA from input points that come in pieces, e.g. read
+        from files too large to load at once.
+
+        Every chunk is copied once into the buffers csa reads the
+        points from, and nothing else of it is kept.
+
+        Parameters
+        ----------
+        chunks : iterable
+            Yields ``(x, y, z)`` tuples of array-likes, or arrays of
+            shape (n, 3).
+        bin_size : float, optional
+            Merge the points falling in the same ``bin_size`` square
+            (or, if 0, at the same location) into one, at their mean
+            location and value. Only the bins are kept in memory.
+        **kwargs
+            ``sigma`` (a scalar) and the parameters of :class:`~CSA`.
+
+        Returns
+        -------
+        csa : :class:`~CSA`
+
+        Notes
+        -----
+        ``xin``, ``yin`` and ``zin`` are put together from the chunks
+        when asked for. Replacing one of them rebuilds the spline from
+        full arrays.
+
+        """
+
+        if bin_size is not None and bin_size < 0:
+            raise ValueError('bin_size must not be negative')
+
+        points = []
+        for chunk in chunks:
+            chunk = _as_points(chunk)
+            if not len(chunk):
+                continue
+            if bin_size is not None:
+                # bins (or locations), and the sums of x, y, z and of the points in them
+                keys = chunk[:, :2] if bin_size == 0 else numpy.floor(chunk[:, :2] / bin_size)
+                chunk = _bin_sums(keys, numpy.column_stack([chunk, numpy.ones(len(chunk))]))
+            points.append(chunk)
+
+        if bin_size is not None and points:
+            _, sums = _bin_sums(*(numpy.concatenate(part) for part in zip(*points)))
+            points = [numpy.ascontiguousarray(sums[:, :3] / sums[:, 3:])]
+
+        return cls._from_points(points, **kwargs)
+
+    @classmethod
+    def from_memmap(cls, path, dtype='d', chunk_size=2**20, bin_size=None, **kwargs):
+        """
+        Build a CSA from input points stored in a binary file.
+
+        When the file holds C-ordered doubles (and no binning is asked
+        for), csa reads the points straight from the memory-mapped file
+        without any copy. The file must then stay unchanged.
+
+        Parameters
+        ----------
+        path : str or path-like
+            A ``.npy`` file with an array of shape (n, 3), or a raw file
+            of x, y, z triplets.
+        dtype : numpy dtype, optional (default = 'd')
+            The type of the values of a raw file.
+        chunk_size : int, optional (default = 2**20)
+            Number of points read at a time.
+        bin_size : float, optional
+            See :meth:`~CSA.from_chunks`.
+        **kwargs
+            ``sigma`` (a scalar) and the parameters of :class:`~CSA`.
+
+        Returns
+        -------
+        csa : :class:`~CSA`
+
+        """
+
+        path = os.fspath(path)
+        if path.endswith('.npy'):
+            data = numpy.load(path, mmap_mode='r')
+        else:
+            data = numpy.memmap(path, dtype=dtype, mode='r')
+            if data.size % 3:
+                raise ValueError(f'{path} does not hold x, y, z triplets')
+            data = data.reshape(-1, 3)
+
+        if data.ndim != 2 or data.shape[1] != 3:
+            raise ValueError(f'the points must have a shape of (n, 3), not {data.shape}')
+
+        chunks = (data[start:start + chunk_size] for start in range(0, len(data), chunk_size))
+        if bin_size is None and data.dtype == numpy.float64 and data.flags.c_contiguous:
+            return cls._from_points(list(chunks), **kwargs)
+        return cls.from_chunks(chunks, bin_size=bin_size, **kwargs)
+
+    def __del__(self):
+        self._destroy()
+
+    def _destroy(self):
+        if getattr(self, '_handle', None) is not None:
+            self._csa.csa_destroy(self._handle)
+        self._handle = None
+        self._buffers = None
+
+    def _column(self, index):
+        if len(self._points) == 1:
+            return self._points[0][:, index]
+        return numpy.concatenate([chunk[:, index] for chunk in self._points])
+
+    def _materialize(self):
+        # from here on, the points are given by xin, yin and zin
+        if self._points is not None:
+            self._xin, self._yin, self._zin = (self._column(i) for i in range(3))
+            self._points = None
+
+    @property
+    def xin(self):
+        """ x-coordinates of the input points """
+        return self._column(0) if self._points is not None else self._xin
+
+    @xin.setter
+    def xin(self, value):
+        self._materialize()
+        self._xin = numpy.asarray(value)
+
+    @property
+    def yin(self):
+        """ y-coordinates of the input points """
+        return self._column(1) if self._points is not None else self._yin
+
+    @yin.setter
+    def yin(self, value):
+        self._materialize()
+        self._yin = numpy.asarray(value)
 
     @property
     def zin(self):
         """ Input values to be approximated """
-        return self._zin
+        return self._column(2) if self._points is not None else self._zin
 
     @zin.setter
     def zin(self, value):
@@ -106,61 +400,200 @@ class CSA:
         if zin.size != self.xin.size:
             raise ValueError('zin must have the same number of elements as '
                              'xin and yin')
+        self._materialize()
         self._zin = value
 
-    def _calculate_points(self, xout, yout):
-        xout = numpy.asarray(xout)
-        yout = numpy.asarray(yout)
-
-        nin = self.xin.size
-        nout = xout.size
+    def _inputs(self):
+        return (self._points, self._xin, self._yin, self._zin, self.sigma,
+                self.npmin, self.npmax, self.k, self.nppc, self.verbose, self.refit)
 
-        if self.sigma is None:
-            sigma = ctypes.POINTER(ctypes.c_double)()
+    def _spline(self):
+        """
+        The native spline, computed when first needed and again whenever
+        one of the inputs, parameters or ``verbose`` was replaced. When
+        only ``zin`` was, and the spline is refit, the least squares
+        fits kept by csa are reused.
+        """
+        inputs = self._inputs()
+        if self._handle is not None:
+            same = [
+                new is old or (numpy.isscalar(new) and numpy.isscalar(old) and new == old)
+                for new, old in zip(inputs, self._handle_inputs)
+            ]
+            if all(same):
+                return self._handle
+            if self._refitting() and self._points is None and same[:3] + same[4:] == [True] * 10:
+                return self._refit_spline(inputs)
+
+        self._destroy()
+
+        # csa keeps pointers into these, so they live as long as the handle
+        if self._points is None:
+            points = numpy.empty((self._xin.size, 3), dtype='d')
+            points[:, 0] = self._xin.ravel()
+            points[:, 1] = self._yin.ravel()
+            points[:, 2] = numpy.asarray(self._zin).ravel()
+            points = [points]
+        else:
+            points = self._points
+        nin = sum(len(chunk) for chunk in points)
+        self._buffers = {'points': points}
+        if self.sigma is not None:
+            shape = (nin,) if self._points is not None else self._xin.shape
+            self._buffers['std'] = numpy.ascontiguousarray(
+                self.sigma * numpy.ones(shape), dtype='d'
+            ).ravel()
+
+        tic = time.perf_counter()
+        handle = self._csa.csa_create()
+        if self._refitting():
+            self._csa.csa_setrefit(handle, 1)
+        # the same defaults as csa_approximatepoints2
+        if self.npmin > 0:
+            self._csa.csa_setnpmin(handle, self.npmin)
+        if self.npmax > 0 and self.npmax > self.npmin:
+            self._csa.csa_setnpmax(handle, self.npmax)
+        if self.k > 0:
+            self._csa.csa_setk(handle, self.k)
+        if self.nppc > 0:
+            self._csa.csa_setnppc(handle, self.nppc)
+        for chunk in points:
+            self._csa.csa_addpoints(handle, len(chunk), chunk.ctypes.data)
+        if self.sigma is not None:
+            self._csa.csa_addstd(handle, nin, self._buffers['std'].ctypes.data)
+
+        if self.verbose:
+            # csa_verbose is global, so it's only set while the output is captured
+            csa_verbose = ctypes.c_int.in_dll(self._csa, 'csa_verbose')
+            with log_native_output(logger, parse_csa_message) as native:
+                csa_verbose.value = 1
+                try:
+                    self._csa.csa_calculatespline(handle)
+                finally:
+                    csa_verbose.value = 0
+            self.timings['stages'] = native.timings
         else:
-            sigma = (ctypes.c_double * nin)(*(self.sigma * numpy.ones_like(self.xin)))
-
-        zout = None
-
-        zout = self._csa.csa_approximatepoints2(
-            ctypes.c_int(nin),                         # int nin
-            (ctypes.c_double * nin)(*self.xin.flat),   # double xin[]
-            (ctypes.c_double * nin)(*self.yin.flat),   # double yin[]
-            (ctypes.c_double * nin)(*self._zin.flat),  # double zin[]
-            sigma,                                     # double sigma[] or NULL
-            ctypes.c_int(nout),                        # int nout
-            (ctypes.c_double * nout)(*xout.flat),      # double xout[]
-            (ctypes.c_double * nout)(*yout.flat),      # double yout[]
-            ctypes.c_int(self.npmin),                  # int npmin
-            ctypes.c_int(self.npmax),                  # int npmax
-            ctypes.c_int(self.k),                      # int k
-            ctypes.c_int(self.nppc)                    # int nppc
-        )
-
-        zout = numpy.asarray([zout[i] for i in range(nout)])
-        zout.shape = xout.shape
-        return numpy.ma.masked_where(numpy.isnan(zout), zout)
-
-    def __call__(self, xout, yout):
+            self._csa.csa_calculatespline(handle)
+            self.timings.pop('stages', None)
+        self.timings['spline'] = time.perf_counter() - tic
+        self.timings.pop('refit', None)
+
+        self._handle = handle
+        self._handle_inputs = inputs
+        return handle
+
+    def _refitting(self):
+        # whether csa keeps the fits, so that new zin can be refit
+        return self.refit and self._refit
+
+    def _refit_spline(self, inputs):
+        tic = time.perf_counter()
+        # csa reads the new values from the points it was given
+        points, = self._buffers['points']
+        points[:, 2] = numpy.asarray(self._zin).ravel()
+        self._csa.csa_refit(self._handle)
+        self.timings.pop('stages', None)
+        self.timings.pop('spline', None)
+        self.timings['refit'] = time.perf_counter() - tic
+
+        self._handle_inputs = inputs
+        return self._handle
+
+    def iter_evaluate(self, xout, yout, chunk_size=65536):
+        """
+        Evaluate the spline a chunk of points at a time.
+
+        Only one chunk of points is held in memory besides the inputs,
+        whatever the number of points, so ``xout`` and ``yout`` may be
+        memory-mapped.
+
+        Parameters
+        ----------
+        xout, yout : array-like
+            Coordinates of the points, of any (but the same) shape. They
+            are taken in C order.
+        chunk_size : int, optional (default = 65536)
+            Number of points per chunk.
+
+        Yields
+        ------
+        index : slice
+            The points of the chunk, in the flattened ``xout``.
+        zout : numpy.ndarray
+            The spline at those points, NaN outside of its domain.
+
+        """
+
+        xout = numpy.ravel(xout)
+        yout = numpy.ravel(yout)
+        if xout.size != yout.size:
+            raise ValueError('xout and yout must have the same number of elements')
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be positive')
+
+        handle = self._spline()
+        chunk_size = int(min(chunk_size, max(xout.size, 1)))
+        points = numpy.empty((chunk_size, 3), dtype='d')
+        for start in range(0, xout.size, chunk_size):
+            stop = min(start + chunk_size, xout.size)
+            chunk = points[:stop - start]
+            chunk[:, 0] = xout[start:stop]
+            chunk[:, 1] = yout[start:stop]
+            self._csa.csa_approximatepoints(handle, stop - start, chunk.ctypes.data)
+            yield slice(start, stop), chunk[:, 2].copy()
+
+    def _calculate_points(self, xout, yout, chunk_size=65536, out=None):
+        xout = numpy.asarray(xout)
+        yout = numpy.asarray(yout)
+        if xout.shape != yout.shape:
+            raise ValueError('xout and yout must have the same shape')
+
+        zout = numpy.empty(xout.shape, dtype='d') if out is None else out
+        if zout.shape != xout.shape:
+            raise ValueError(f'out must have the shape of xout {xout.shape}, not {zout.shape}')
+        if not zout.flags.c_contiguous:
+            raise ValueError('out must be C-contiguous')
+        flat = zout.reshape(-1)
+
+        # fit the spline first, so that it isn't timed twice
+        self._spline()
+        tic = time.perf_counter()
+        for index, values in self.iter_evaluate(xout, yout, chunk_size=chunk_size):
+            flat[index] = values
+        self.timings['approximate'] = time.perf_counter() - tic
+
+        return numpy.ma.masked_invalid(zout, copy=False)
+
+    def __call__(self, xout, yout, chunk_size=65536, out=None):
         """
         Return interpolated values of ``zin``
 
+        The spline is computed on the first call and reused until the
+        inputs or parameters are replaced. The points are evaluated in
+        chunks, so memory use doesn't grow with their number beyond
+        the output itself.
+
         Parameters
         ----------
         xout, yout : array-like
             Two-dimensional arrays of x/y coordinates at which ``zout``
             should be estimated.
+        chunk_size : int, optional (default = 65536)
+            Number of points evaluated at a time.
+        out : numpy.ndarray, optional
+            A contiguous float array (e.g., a ``numpy.memmap``) with the
+            shape of ``xout`` to write the values into, with NaN outside
+            of the domain of the spline.
 
         Returns
         -------
-        zout : numpy ndarray
-            Interpolated z-values.
+        zout : numpy.ma.MaskedArray
+            Interpolated z-values, masked outside of the domain of the
+            spline. A view of ``out``, when given.
 
         """
 
-        xout = numpy.asarray(xout)
-        yout = numpy.asarray(yout)
-        return self._calculate_points(xout, yout)
+        return self._calculate_points(xout, yout, chunk_size=chunk_size, out=out)
 
     def plot(self, xout, yout, ax=None, mesh_opts=None, scatter_opts=None):
         """
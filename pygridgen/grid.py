@@ -1,16 +1,35 @@
 import os
+import re
+import json
 import sys
+import time
 import ctypes
+import logging
 import warnings
+import functools
+import collections
+import multiprocessing
+import concurrent.futures
+import multiprocessing.connection
 
 import numpy
 from matplotlib.path import Path
 
+from .utils import NativeLog, capture_fd, log_native_output
+
 
 """Tools for creating curvilinear grids using gridgen by Pavel Sakov"""
 
 __docformat__ = "restructuredtext en"
 
+__all__ = [
+    'Focus', 'CGrid', 'CGrid_geo', 'Gridgen', 'Tile',
+    'simplify_boundary', 'validate_boundary', 'parse_gridgen_message',
+    'rho_to_vert', 'uvp_masks',
+]
+
+logger = logging.getLogger(__name__)
+
 
 def _points_inside_poly(points, verts):
     poly = Path(verts)
@@ -41,6 +60,738 @@ def _approximate_erf(x):
     return numpy.sign(x) * numpy.sqrt(1.0 - numpy.exp(guts))
 
 
+def _polygon_area(x, y):
+    """ Signed (shoelace) area of a polygon, positive when the vertices
+    are ordered counter-clockwise. """
+    x = numpy.asarray(x, dtype='d')
+    y = numpy.asarray(y, dtype='d')
+    return 0.5 * numpy.sum(x * numpy.roll(y, -1) - numpy.roll(x, -1) * y)
+
+
+def _full_beta(beta, nbry):
+    """ gridgen-c reads ``nbry`` turning values, so any that are not
+    provided are zero. """
+    full = numpy.zeros(nbry, dtype='d')
+    full[:len(beta)] = beta
+    return full
+
+
+def _rectangularize(xbry, ybry, beta, ul_idx=0):
+    """
+    Cheap stand-in for gridgen's rectangularized domain.
+
+    Each straight run of the boundary (consecutive edges between two
+    turning points) keeps its end-to-end length but is snapped to the
+    direction given by the number of quarter turns (``beta``) made since
+    the ``ul_idx`` corner. Runs going in opposite directions are then
+    rescaled so the polygon closes.
+
+    Returns
+    -------
+    i, j : numpy.ndarray
+        Vertices of the rectangularized polygon, starting at ``ul_idx``.
+        ``i`` runs along the grid columns (``nx``), ``j`` along the rows
+        (``ny``).
+
+    """
+
+    x = numpy.roll(numpy.asarray(xbry, dtype='d'), -ul_idx)
+    y = numpy.roll(numpy.asarray(ybry, dtype='d'), -ul_idx)
+    b = numpy.roll(_full_beta(beta, x.size), -ul_idx)
+
+    dx = numpy.diff(x, append=x[0])
+    dy = numpy.diff(y, append=y[0])
+    turns = numpy.concatenate([[0.0], numpy.cumsum(b[1:])])
+    direction = numpy.round(turns).astype(int) % 4
+
+    # shrink the edges of each run so that the run spans its chord
+    run = numpy.concatenate([[0], numpy.cumsum(direction[1:] != direction[:-1])])
+    if run[-1] > 0 and direction[-1] == direction[0]:
+        run[run == run[-1]] = 0
+    arclength = numpy.hypot(dx, dy)
+    chord = numpy.hypot(numpy.bincount(run, weights=dx), numpy.bincount(run, weights=dy))
+    total = numpy.bincount(run, weights=arclength)
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        length = arclength * numpy.where(total > 0, chord / total, 0.0)[run]
+
+    # going counter-clockwise from the upper left corner, the sides run
+    # down the first column, along the first row, up the last column and
+    # back along the last row.
+    di = numpy.array([0.0, 1.0, 0.0, -1.0])[direction] * length
+    dj = numpy.array([-1.0, 0.0, 1.0, 0.0])[direction] * length
+    for d in (di, dj):
+        forward = d[d > 0].sum()
+        backward = -d[d < 0].sum()
+        if forward == 0 or backward == 0:
+            raise ValueError('boundary does not enclose a domain with these beta values')
+        mean = 0.5 * (forward + backward)
+        d[d > 0] *= mean / forward
+        d[d < 0] *= mean / backward
+
+    i = numpy.concatenate([[0.0], numpy.cumsum(di)[:-1]])
+    j = numpy.concatenate([[0.0], numpy.cumsum(dj)[:-1]])
+    return i, j
+
+
+def _segment_distance(x, y, x0, y0, x1, y1):
+    """ Distance from points (x, y) to the segment (x0, y0)-(x1, y1). """
+    dx, dy = x1 - x0, y1 - y0
+    length2 = dx * dx + dy * dy
+    if length2 == 0:
+        return numpy.hypot(x - x0, y - y0)
+    t = numpy.clip(((x - x0) * dx + (y - y0) * dy) / length2, 0.0, 1.0)
+    return numpy.hypot(x - (x0 + t * dx), y - (y0 + t * dy))
+
+
+def simplify_boundary(xbry, ybry, beta, tolerance, ul_idx=0):
+    """
+    Remove boundary vertices that barely change its shape.
+
+    The Douglas-Peucker algorithm is applied to each stretch of the
+    boundary between vertices that must be kept: all vertices with a
+    nonzero ``beta`` and the ``ul_idx`` corner. No remaining vertex of
+    the original boundary lies further than ``tolerance`` from the
+    simplified one.
+
+    Parameters
+    ----------
+    xbry, ybry, beta : array-like
+        The boundary, as in :class:`~Gridgen`.
+    tolerance : float
+        Maximum allowed deviation, in the units of the boundary.
+    ul_idx : int, optional (default = 0)
+        Index of the upper left corner.
+
+    Returns
+    -------
+    xbry, ybry, beta : numpy.ndarray
+        The simplified boundary.
+    ul_idx : int
+        Index of the upper left corner in the simplified boundary.
+    kept : numpy.ndarray
+        Indices of the retained vertices in the original boundary.
+
+    """
+
+    x = numpy.asarray(xbry, dtype='d')
+    y = numpy.asarray(ybry, dtype='d')
+    beta = _full_beta(beta, x.size)
+    n = x.size
+
+    keep = beta != 0
+    keep[ul_idx] = True
+    anchors = numpy.flatnonzero(keep)
+
+    # walk the boundary twice so stretches can wrap around the end
+    xx = numpy.concatenate([x, x])
+    yy = numpy.concatenate([y, y])
+    stack = [(a, b) for a, b in zip(anchors, numpy.append(anchors[1:], anchors[0] + n))]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        dist = _segment_distance(xx[start + 1:end], yy[start + 1:end],
+                                 xx[start], yy[start], xx[end], yy[end])
+        worst = numpy.argmax(dist)
+        if dist[worst] > tolerance:
+            split = start + 1 + worst
+            keep[split % n] = True
+            stack.extend([(start, split), (split, end)])
+
+    kept = numpy.flatnonzero(keep)
+    new_ul = int(numpy.searchsorted(kept, ul_idx))
+    return x[kept], y[kept], beta[kept], new_ul, kept
+
+
+def _cross(ax, ay, bx, by, cx, cy):
+    return (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+
+
+def _edges_touch(edges, a, b, n):
+    """
+    Whether edges ``a`` and ``b`` of a closed polygon with ``n`` edges
+    (each a tuple of its start and end points) meet other than at a
+    shared vertex.
+    """
+    if (b - a) % n == 1 or (a - b) % n == 1:
+        # neighbours: only backtracking along the shared vertex is wrong
+        first, second = (a, b) if (b - a) % n == 1 else (b, a)
+        px, py, qx, qy = edges[first]
+        _, _, rx, ry = edges[second]
+        return (_cross(px, py, qx, qy, rx, ry) == 0 and
+                (px - qx) * (rx - qx) + (py - qy) * (ry - qy) > 0)
+
+    ax, ay, bx, by = edges[a]
+    cx, cy, dx, dy = edges[b]
+    if (max(ax, bx) < min(cx, dx) or max(cx, dx) < min(ax, bx) or
+            max(ay, by) < min(cy, dy) or max(cy, dy) < min(ay, by)):
+        return False
+
+    o1 = _cross(ax, ay, bx, by, cx, cy)
+    o2 = _cross(ax, ay, bx, by, dx, dy)
+    o3 = _cross(cx, cy, dx, dy, ax, ay)
+    o4 = _cross(cx, cy, dx, dy, bx, by)
+    if ((o1 > 0 and o2 < 0) or (o1 < 0 and o2 > 0)) and ((o3 > 0 and o4 < 0) or (o3 < 0 and o4 > 0)):
+        return True
+
+    def on_segment(sx, sy, tx, ty, px, py):
+        return min(sx, tx) <= px <= max(sx, tx) and min(sy, ty) <= py <= max(sy, ty)
+
+    return ((o1 == 0 and on_segment(ax, ay, bx, by, cx, cy)) or
+            (o2 == 0 and on_segment(ax, ay, bx, by, dx, dy)) or
+            (o3 == 0 and on_segment(cx, cy, dx, dy, ax, ay)) or
+            (o4 == 0 and on_segment(cx, cy, dx, dy, bx, by)))
+
+
+def _sweep_intersection(x, y):
+    """
+    Find a pair of edges of the closed polygon (x, y) that touch or
+    cross other than at the vertex they share, or return None if the
+    polygon is simple.
+
+    This is a Shamos-Hoey sweep over x: edges enter an ordered set of
+    active edges (ordered by y at the sweep position) at their left end
+    and leave it at their right end, and each edge is only tested
+    against its neighbours in the set, in O(n log n). Edges through the
+    same point at the sweep position are all tested against each other,
+    so that touching edges are found too.
+    """
+
+    n = x.size
+    x0, y0 = x.tolist(), y.tolist()
+    x1, y1 = x0[1:] + x0[:1], y0[1:] + y0[:1]
+
+    polygon = list(zip(x0, y0, x1, y1))
+
+    # edges from their lower-left to their upper-right end
+    edges = [
+        (ax, ay, bx, by) if (ax, ay) <= (bx, by) else (bx, by, ax, ay)
+        for ax, ay, bx, by in polygon
+    ]
+    events = sorted(
+        [(e[0], e[1], 0, k) for k, e in enumerate(edges)] +
+        [(e[2], e[3], 1, k) for k, e in enumerate(edges)]
+    )
+
+    slopes = [(by - ay) / (bx - ax) if bx != ax else float('inf') for ax, ay, bx, by in edges]
+
+    def y_at(k, sweep):
+        ax, ay, bx, by = edges[k]
+        if sweep <= ax:
+            return ay
+        if sweep >= bx:
+            return by
+        return ay + (sweep - ax) * slopes[k]
+
+    def check(a, b):
+        return (min(a, b), max(a, b)) if _edges_touch(polygon, a, b, n) else None
+
+    active = []
+    for sweep, ykey, leaving, k in events:
+        if leaving:
+            # (vertical edges are kept at the y of their lower end)
+            ykey = y_at(k, sweep)
+
+        # the edges through the event point are active[lo:hi]
+        lo, hi = 0, len(active)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if y_at(active[mid], sweep) < ykey:
+                lo = mid + 1
+            else:
+                hi = mid
+        hi = lo
+        while hi < len(active) and y_at(active[hi], sweep) == ykey:
+            hi += 1
+
+        if not leaving:
+            # the neighbours of the new edge, and all the edges through its end
+            for other in active[max(lo - 1, 0):hi + 1]:
+                pair = check(k, other)
+                if pair is not None:
+                    return pair
+
+            # edges starting at the same point are ordered by their slope
+            index = lo
+            while index < hi and slopes[active[index]] <= slopes[k]:
+                index += 1
+            active.insert(index, k)
+        else:
+            index = active.index(k, lo, hi) if k in active[lo:hi] else active.index(k)
+            del active[index]
+            if 0 < index < len(active):
+                pair = check(active[index - 1], active[index])
+                if pair is not None:
+                    return pair
+
+    return None
+
+
+def _orientation(ax, ay, bx, by, cx, cy):
+    return numpy.sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+
+def _on_segment(ax, ay, bx, by, px, py):
+    """ Whether p, known to be collinear with a-b, lies on that segment. """
+    return ((numpy.minimum(ax, bx) <= px) & (px <= numpy.maximum(ax, bx)) &
+            (numpy.minimum(ay, by) <= py) & (py <= numpy.maximum(ay, by)))
+
+
+def _find_intersection(x, y, chunksize=1000000, max_pairs=16):
+    """
+    Find a pair of edges of the closed polygon (x, y) that touch or
+    cross other than at the vertex they share, or return None if the
+    polygon is simple.
+
+    Edges are sorted by their smallest x-coordinate and each one is
+    tested against the edges that start before it ends in x, vectorized
+    over the candidate pairs. When that makes more than ``max_pairs``
+    pairs per edge (long edges, or edges overlapping in x as with
+    coastlines), :func:`~_sweep_intersection` is used instead, which is
+    O(n log n) but runs at Python speed.
+    """
+
+    n = x.size
+    x0, y0 = x, y
+    x1, y1 = numpy.roll(x, -1), numpy.roll(y, -1)
+
+    # neighbours only meet wrongly when one backtracks along the other
+    x2, y2 = numpy.roll(x1, -1), numpy.roll(y1, -1)
+    back = ((_orientation(x0, y0, x1, y1, x2, y2) == 0) &
+            ((x0 - x1) * (x2 - x1) + (y0 - y1) * (y2 - y1) > 0))
+    if numpy.any(back):
+        k = int(numpy.argmax(back))
+        return tuple(sorted((k, (k + 1) % n)))
+
+    order = numpy.argsort(numpy.minimum(x0, x1), kind='stable')
+    xmin = numpy.minimum(x0, x1)[order]
+    xmax = numpy.maximum(x0, x1)[order]
+    stop = numpy.searchsorted(xmin, xmax, side='right')
+    counts = numpy.maximum(stop - numpy.arange(n) - 1, 0)
+    if counts.sum() > max_pairs * n:
+        return _sweep_intersection(x, y)
+
+    start = 0
+    while start < n:
+        # take as many sweep positions as fit in one chunk of pairs
+        end = start + max(1, int(numpy.searchsorted(numpy.cumsum(counts[start:]), chunksize)))
+        first = numpy.repeat(numpy.arange(start, end), counts[start:end])
+        offset = numpy.arange(first.size) - numpy.repeat(
+            numpy.cumsum(counts[start:end]) - counts[start:end], counts[start:end]
+        )
+        a = order[first]
+        b = order[first + 1 + offset]
+        start = end
+
+        # neighbours share a vertex by construction
+        gap = numpy.abs(a - b)
+        keep = (gap != 1) & (gap != n - 1)
+        keep &= (numpy.maximum(y0[a], y1[a]) >= numpy.minimum(y0[b], y1[b]))
+        keep &= (numpy.maximum(y0[b], y1[b]) >= numpy.minimum(y0[a], y1[a]))
+        a, b = a[keep], b[keep]
+
+        o1 = _orientation(x0[a], y0[a], x1[a], y1[a], x0[b], y0[b])
+        o2 = _orientation(x0[a], y0[a], x1[a], y1[a], x1[b], y1[b])
+        o3 = _orientation(x0[b], y0[b], x1[b], y1[b], x0[a], y0[a])
+        o4 = _orientation(x0[b], y0[b], x1[b], y1[b], x1[a], y1[a])
+
+        hit = (o1 * o2 < 0) & (o3 * o4 < 0)
+        hit |= (o1 == 0) & _on_segment(x0[a], y0[a], x1[a], y1[a], x0[b], y0[b])
+        hit |= (o2 == 0) & _on_segment(x0[a], y0[a], x1[a], y1[a], x1[b], y1[b])
+        hit |= (o3 == 0) & _on_segment(x0[b], y0[b], x1[b], y1[b], x0[a], y0[a])
+        hit |= (o4 == 0) & _on_segment(x0[b], y0[b], x1[b], y1[b], x1[a], y1[a])
+        if numpy.any(hit):
+            k = numpy.argmax(hit)
+            return tuple(sorted((int(a[k]), int(b[k]))))
+
+    return None
+
+
+def validate_boundary(xbry, ybry, beta, ul_idx=0, check_intersections=True):
+    """
+    Check that a boundary can be passed to gridgen.
+
+    These are the checks gridgen-c makes (and a few it doesn't), done in
+    Python so that bad boundaries fail in milliseconds instead of after
+    an expensive setup. A ``ValueError`` describing the first problem
+    found is raised, otherwise nothing is returned.
+
+    Parameters
+    ----------
+    xbry, ybry, beta : array-like
+        The boundary, as in :class:`~Gridgen`. As in gridgen-c,
+        ``beta`` may be shorter than the boundary, in which case the
+        missing values are zero.
+    ul_idx : int, optional (default = 0)
+        Index of the upper left corner.
+    check_intersections : bool, optional (default = True)
+        Toggles the check that the boundary does not touch or cross
+        itself.
+
+    """
+
+    x = numpy.asarray(xbry, dtype='d')
+    y = numpy.asarray(ybry, dtype='d')
+    beta = numpy.asarray(beta, dtype='d')
+
+    if x.ndim != 1 or x.shape != y.shape:
+        raise ValueError('xbry and ybry must be one dimensional and the same size')
+
+    if x.size < 3:
+        raise ValueError('the boundary must have at least 3 vertices')
+
+    if not (numpy.all(numpy.isfinite(x)) and numpy.all(numpy.isfinite(y))):
+        bad = numpy.flatnonzero(~(numpy.isfinite(x) & numpy.isfinite(y)))
+        raise ValueError(f'boundary vertex {bad[0]} is not finite')
+
+    if beta.ndim != 1 or beta.size > x.size:
+        raise ValueError('beta must be one dimensional and no longer than the boundary')
+
+    if not numpy.isclose(beta.sum(), 4.0):
+        raise ValueError(f'sum of beta must be 4.0 (got {beta.sum():g})')
+
+    if int(ul_idx) != ul_idx or not 0 <= ul_idx < x.size:
+        raise ValueError(f'ul_idx must be an integer index into the boundary (got {ul_idx})')
+
+    # both orientations are accepted by gridgen, degenerate polygons are not
+    if _polygon_area(x, y) == 0:
+        raise ValueError('the boundary encloses no area')
+
+    if check_intersections:
+        # repeated vertices (e.g., closing the polygon) are zero-length edges
+        unique = numpy.flatnonzero((x != numpy.roll(x, -1)) | (y != numpy.roll(y, -1)))
+        pair = _find_intersection(x[unique], y[unique])
+        if pair is not None:
+            a, b = unique[list(pair)]
+            raise ValueError(
+                f'the boundary intersects itself: the edges starting at vertex {a} '
+                f'({x[a]:g}, {y[a]:g}) and vertex {b} ({x[b]:g}, {y[b]:g}) touch or cross'
+            )
+
+
+def _double_array(pointer, count):
+    """ Zero-copy view of ``count`` doubles at a ctypes pointer. """
+    if pointer is None or not pointer.value or not count.value:
+        return None
+    pointer = ctypes.cast(pointer, ctypes.POINTER(ctypes.c_double))
+    return numpy.ctypeslib.as_array(pointer, shape=(count.value,))
+
+
+def _haversine(lon0, lat0, lon1, lat1, radius=6371008.8):
+    """ Great circle distance (in meters, on a sphere with the mean
+    radius of the Earth) between points given in degrees. """
+    lon0, lat0, lon1, lat1 = (numpy.radians(a) for a in (lon0, lat0, lon1, lat1))
+    a = (numpy.sin(0.5 * (lat1 - lat0))**2 +
+         numpy.cos(lat0) * numpy.cos(lat1) * numpy.sin(0.5 * (lon1 - lon0))**2)
+    return 2.0 * radius * numpy.arcsin(numpy.sqrt(a))
+
+
+def _quad_area(x, y):
+    """ Area of each cell of the vertex arrays ``x`` and ``y``, as half
+    of the cross product of its diagonals. """
+    dx1 = x[1:, 1:] - x[:-1, :-1]
+    dy1 = y[1:, 1:] - y[:-1, :-1]
+    dx2 = x[1:, :-1] - x[:-1, 1:]
+    dy2 = y[1:, :-1] - y[:-1, 1:]
+    return 0.5 * abs(dx1 * dy2 - dy1 * dx2)
+
+
+def _triangle_area(a, b, c):
+    """ Area of triangles from the lengths of their sides, with Kahan's
+    stable form of Heron's formula. """
+    c, b, a = numpy.sort(numpy.stack([a, b, c]), axis=0)
+    product = (a + (b + c)) * (c - (a - b)) * (c + (a - b)) * (a + (b - c))
+    return 0.25 * numpy.sqrt(numpy.maximum(product, 0.0))
+
+
+def _cell_quality(x, y, wet):
+    """
+    Quality metrics of every cell of the (NaN-filled) vertex arrays
+    ``x`` and ``y``. Cells that aren't ``wet`` aren't neighbours in the
+    size ratio. See :meth:`~CGrid.quality`.
+    """
+
+    # edges, walking around the cell from the (j, i) corner
+    bx, by = x[:-1, 1:] - x[:-1, :-1], y[:-1, 1:] - y[:-1, :-1]  # bottom, along xi
+    tx, ty = x[1:, 1:] - x[1:, :-1], y[1:, 1:] - y[1:, :-1]      # top, along xi
+    lx, ly = x[1:, :-1] - x[:-1, :-1], y[1:, :-1] - y[:-1, :-1]  # left, along eta
+    rx, ry = x[1:, 1:] - x[:-1, 1:], y[1:, 1:] - y[:-1, 1:]      # right, along eta
+    lb, lt, ll, lr = (numpy.hypot(u, v) for u, v in [(bx, by), (tx, ty), (lx, ly), (rx, ry)])
+
+    len_xi = 0.5 * (lb + lt)
+    len_eta = 0.5 * (ll + lr)
+    aspect_ratio = numpy.maximum(len_xi, len_eta) / numpy.minimum(len_xi, len_eta)
+
+    # cross and dot products of the two edges leaving each corner
+    cross = numpy.stack([bx * ly - by * lx, ry * bx - rx * by, tx * ry - ty * rx, ly * tx - lx * ty])
+    dot = numpy.stack([bx * lx + by * ly, -(rx * bx + ry * by), tx * rx + ty * ry, -(lx * tx + ly * ty)])
+    norm = numpy.stack([lb * ll, lr * lb, lt * lr, ll * lt])
+
+    angles = numpy.degrees(numpy.arctan2(abs(cross), dot))
+    min_angle = angles.min(axis=0)
+    max_angle = angles.max(axis=0)
+    skewness = numpy.maximum((max_angle - 90.0) / 90.0, (90.0 - min_angle) / 90.0)
+    orthogonality = numpy.maximum(max_angle - 90.0, 90.0 - min_angle)
+
+    # scaled jacobian of each corner: its sign flips on folded cells
+    jacobians = cross / norm
+
+    # largest ratio between the area of a cell and one of its neighbours
+    area = 0.5 * abs((x[1:, 1:] - x[:-1, :-1]) * (y[1:, :-1] - y[:-1, 1:]) -
+                     (y[1:, 1:] - y[:-1, :-1]) * (x[1:, :-1] - x[:-1, 1:]))
+    padded = numpy.pad(numpy.where(wet, area, numpy.nan), 1, constant_values=numpy.nan)
+    size_ratio = numpy.full(area.shape, numpy.nan)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        for neighbour in [padded[:-2, 1:-1], padded[2:, 1:-1], padded[1:-1, :-2], padded[1:-1, 2:]]:
+            ratio = numpy.maximum(area / neighbour, neighbour / area)
+            size_ratio = numpy.fmax(size_ratio, ratio)
+
+    return {
+        'aspect_ratio': aspect_ratio,
+        'skewness': skewness,
+        'size_ratio': size_ratio,
+        'min_angle': min_angle,
+        'orthogonality': orthogonality,
+        'jacobian': jacobians.min(axis=0),
+        # the same, should the grid run clockwise
+        'jacobian_reversed': (-jacobians).min(axis=0),
+        'orientation': numpy.sign(jacobians.sum(axis=0)),
+    }
+
+
+# (low, high) of the histogram of each quality metric
+_QUALITY_RANGES = {
+    'aspect_ratio': (1.0, 10.0),
+    'skewness': (0.0, 1.0),
+    'size_ratio': (1.0, 4.0),
+    'min_angle': (0.0, 90.0),
+    'orthogonality': (0.0, 90.0),
+    'jacobian': (-1.0, 1.0),
+}
+
+
+def _smooth_rows(x, y, r0, r1, method):
+    """
+    New positions of the interior nodes in rows ``r0:r1`` of ``x`` and
+    ``y`` after one Laplace or Winslow (elliptic) sweep.
+    """
+    def stencil(a):
+        a = a[r0 - 1:r1 + 1]
+        return {
+            'c': a[1:-1, 1:-1], 'e': a[1:-1, 2:], 'w': a[1:-1, :-2], 'n': a[2:, 1:-1], 's': a[:-2, 1:-1],
+            'ne': a[2:, 2:], 'nw': a[2:, :-2], 'se': a[:-2, 2:], 'sw': a[:-2, :-2],
+        }
+
+    sx, sy = stencil(x), stencil(y)
+    if method == 'laplace':
+        return [0.25 * (s['e'] + s['w'] + s['n'] + s['s']) for s in (sx, sy)]
+
+    # alpha x_xixi - 2 beta x_xieta + gamma x_etaeta = 0, solved for the center node
+    x_xi, y_xi = 0.5 * (sx['e'] - sx['w']), 0.5 * (sy['e'] - sy['w'])
+    x_eta, y_eta = 0.5 * (sx['n'] - sx['s']), 0.5 * (sy['n'] - sy['s'])
+    alpha = x_eta ** 2 + y_eta ** 2
+    beta = x_xi * x_eta + y_xi * y_eta
+    gamma = x_xi ** 2 + y_xi ** 2
+    return [
+        (alpha * (s['e'] + s['w']) + gamma * (s['n'] + s['s'])
+         - 0.5 * beta * (s['ne'] - s['nw'] - s['se'] + s['sw'])) / (2.0 * (alpha + gamma))
+        for s in (sx, sy)
+    ]
+
+
+def _slide(px, py, bx, by, s, t):
+    """
+    Move the nodes at arc lengths ``t`` along the polyline ``bx, by``
+    (with cumulative arc lengths ``s``) towards the projection of the
+    points ``px, py`` onto it. The end points stay put and no node
+    passes the midpoint to its neighbours.
+    """
+    k = numpy.clip(numpy.searchsorted(s, t[1:-1], side='right') - 1, 0, s.size - 2)
+    tx, ty = bx[k + 1] - bx[k], by[k + 1] - by[k]
+    cx, cy = numpy.interp(t[1:-1], s, bx), numpy.interp(t[1:-1], s, by)
+    step = ((px - cx) * tx + (py - cy) * ty) / numpy.hypot(tx, ty)
+
+    new = t.copy()
+    new[1:-1] = numpy.clip(t[1:-1] + numpy.where(numpy.isfinite(step), step, 0.0),
+                           0.5 * (t[:-2] + t[1:-1]), 0.5 * (t[1:-1] + t[2:]))
+    return new
+
+
+def _lagrange_weights(position, n, order=3):
+    """
+    First node and weights of the ``order + 1``-point Lagrange
+    interpolation at the fractional ``position`` along an axis of ``n``
+    nodes. The stencil is centered where possible, one-sided at the
+    ends, and shrinks when there are fewer than ``order + 1`` nodes.
+    """
+    k = min(order + 1, n)
+    start = numpy.clip(numpy.floor(position).astype(int) - (k - 1) // 2, 0, n - k)
+    t = position - start
+    weights = numpy.ones((position.size, k))
+    for a in range(k):
+        for b in range(k):
+            if a != b:
+                weights[:, a] *= (t - b) / (a - b)
+    return start, weights
+
+
+def _interpolate_axis(values, start, weights, axis):
+    """ Apply :func:`~_lagrange_weights` along ``axis``. Nodes with a
+    weight of zero don't contribute, even when they're NaN. """
+    shape = [1, 1]
+    shape[axis] = -1
+    out = 0.0
+    for k in range(weights.shape[1]):
+        w = weights[:, k].reshape(shape)
+        out = out + numpy.where(w != 0, w * numpy.take(values, start + k, axis=axis), 0.0)
+    return out
+
+
+def _orthogonality_error(x, y):
+    """
+    Mean absolute deviation from 90 degrees, in radians, of the angles
+    between the grid lines crossing at each interior node.
+    """
+    x_xi, y_xi = x[1:-1, 2:] - x[1:-1, :-2], y[1:-1, 2:] - y[1:-1, :-2]
+    x_eta, y_eta = x[2:, 1:-1] - x[:-2, 1:-1], y[2:, 1:-1] - y[:-2, 1:-1]
+    cos = (x_xi * x_eta + y_xi * y_eta) / (numpy.hypot(x_xi, y_xi) * numpy.hypot(x_eta, y_eta))
+    return float(numpy.nanmean(numpy.arcsin(numpy.abs(cos))))
+
+
+_LIBGRIDGEN = None
+
+
+def _load_libgridgen():
+    """ Find, load and set up the gridgen-c shared library (once). """
+    global _LIBGRIDGEN
+    if _LIBGRIDGEN is not None:
+        return _LIBGRIDGEN
+
+    libgridgen_paths = [
+        ('libgridgen.so', os.path.join(sys.prefix, 'lib')),
+        ('libgridgen', os.path.join(sys.prefix, 'lib')),
+        ('libgridgen.so', '/usr/local/lib'),
+        ('libgridgen', '/usr/local/lib'),
+    ]
+
+    for name, path in libgridgen_paths:
+        try:
+            lib = numpy.ctypeslib.load_library(name, path)
+            break
+        except OSError:
+            pass
+    else:
+        raise OSError('Failed to load libgridgen.')
+
+    # initialize/set types of critical variables
+    lib.gridgen_generategrid2.restype = ctypes.POINTER(ctypes.c_void_p)
+    lib.gridnodes_getx.restype = ctypes.POINTER(ctypes.POINTER(ctypes.c_double))
+    lib.gridnodes_gety.restype = ctypes.POINTER(ctypes.POINTER(ctypes.c_double))
+    lib.gridnodes_getnce1.restype = ctypes.c_int
+    lib.gridnodes_getnce2.restype = ctypes.c_int
+    lib.gridmap_build.restype = ctypes.c_void_p
+
+    _LIBGRIDGEN = lib
+    return lib
+
+
+def _summarize(values):
+    values = numpy.ma.compressed(values)
+    return {
+        'min': float(values.min()),
+        'median': float(numpy.median(values)),
+        'max': float(values.max()),
+    }
+
+
+def _import_pyproj():
+    """ pyproj, from wherever it can be found, or None. """
+    try:
+        import pyproj
+    except ImportError:
+        try:
+            from mpl_toolkits.basemap import pyproj
+        except ImportError:
+            pyproj = None
+    return pyproj
+
+
+def _proj_to_srs(proj):
+    """ The PROJ string a grid archive stores a projection as. """
+    if proj is None:
+        return None
+    srs = getattr(proj, 'srs', None)
+    if srs is None:
+        raise ValueError(f'cannot save a grid with a {type(proj).__name__} projection, only '
+                         'projections with a PROJ string (srs), such as pyproj.Proj')
+    return srs
+
+
+def _proj_from_srs(srs):
+    """ Rebuild the projection of a grid archive from its PROJ string. """
+    if srs is None:
+        return None
+    pyproj = _import_pyproj()
+    if pyproj is None:
+        raise ValueError('pyproj is needed to restore the projection of this grid')
+    return pyproj.Proj(srs)
+
+
+def _read_only(value):
+    """ A read-only view of an array (or of the arrays in a dict or
+    tuple), so that it can be handed out without copying. """
+    if isinstance(value, dict):
+        return {key: _read_only(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return tuple(_read_only(item) for item in value)
+    if isinstance(value, numpy.ndarray):
+        view = value.view()
+        view.flags.writeable = False
+        if isinstance(view, numpy.ma.MaskedArray) and view.mask is not numpy.ma.nomask:
+            view._mask = view._mask.view()
+            view._mask.flags.writeable = False
+        return view
+    return value
+
+
+def _cached(method):
+    """
+    Like ``property``, but the value is kept in ``self._cache`` until
+    the vertices of the grid are assigned again. The value is handed
+    out as a read-only view, so it cannot be changed behind the cache's
+    back.
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def getter(self):
+        cache = self.__dict__.setdefault('_cache', {})
+        if name not in cache:
+            cache[name] = _read_only(method(self))
+        return cache[name]
+
+    return property(getter)
+
+
+_ARCHIVE_VERSION = 1
+
+
+def _archive_arrays(name, value):
+    """ The plain arrays a (possibly masked) array is stored as. """
+    arrays = {name: numpy.ma.getdata(value)}
+    if isinstance(value, numpy.ma.MaskedArray):
+        arrays[name + '_mask'] = numpy.ma.getmaskarray(value)
+    return arrays
+
+
+def _unarchive_array(arrays, name):
+    """ Inverse of :func:`~_archive_arrays` (without copying). """
+    mask_name = name + '_mask'
+    if mask_name in arrays:
+        return numpy.ma.MaskedArray(arrays[name], mask=arrays[mask_name], copy=False)
+    return arrays[name]
+
+
 class _FocusPoint:
     """
     Return a transformed, uniform grid, focused in the x- or
@@ -219,6 +970,41 @@ class Focus:
         return f
 
 
+Tile = collections.namedtuple('Tile', ['index', 'grid', 'rows', 'cols', 'interior'])
+Tile.__doc__ = """
+A tile of a grid, as yielded by :meth:`CGrid.tiles`: its ``(row,
+column)`` ``index`` among the tiles, the ``grid`` of its cells plus the
+halo, the ``rows`` and ``cols`` (slices) of cells of the parent it
+covers without the halo, and the ``interior`` slices that select those
+cells from the rho-point arrays of ``grid``.
+"""
+
+
+def _stitch_axis(size, cells, first, owned, total):
+    """
+    Where the values of one axis of a tile output go in the full output.
+
+    ``size`` is the tile output's length along the axis, ``cells`` the
+    tile's number of cells, ``first`` the first parent cell it covers
+    (including the halo), ``owned`` the parent cells it owns (a slice)
+    and ``total`` the parent's number of cells. Returns the length of
+    the full output and the slices into it and into the tile output.
+    """
+    b0, c0, c1 = first, owned.start, owned.stop
+    if size == cells:          # rho-points
+        full, start, stop = total, c0, c1
+    elif size == cells - 1:    # between cells (u- or v-points)
+        full, start, stop = total - 1, c0, min(c1, total - 1)
+    elif size == cells + 1:    # vertices
+        full, start, stop = total + 1, c0, c1 + (c1 == total)
+    else:
+        raise ValueError(f'cannot place an output of length {size} on a tile of {cells} cells')
+
+    if stop - b0 > size:
+        raise ValueError('the tiles need a halo of at least one cell for outputs between cells')
+    return full, slice(start, stop), slice(start - b0, stop - b0)
+
+
 class CGrid:
     """
     Curvilinear Arakawa C-Grid.
@@ -236,6 +1022,11 @@ class CGrid:
     If masked arrays are used, the mask will be a combination of the
     specified mask (if given) and the masked locations.
 
+    The metrics are computed when first needed and then cached as
+    read-only arrays. Assigning ``x_vert`` or ``y_vert`` drops the
+    cache, so after editing the vertices in place, assign them again
+    (e.g., ``grid.x_vert = grid.x_vert``).
+
     Parameters
     ----------
     x, y : numpy.ndarray
@@ -289,6 +1080,32 @@ class CGrid:
         self.x_vert = x
         self.y_vert = y
 
+    @property
+    def x_vert(self):
+        """
+        x-coordinate of the grid vertices. Replacing it drops all of the
+        cached metrics.
+        """
+        return self._x_vert
+
+    @x_vert.setter
+    def x_vert(self, value):
+        self._x_vert = value
+        self._cache = {}
+
+    @property
+    def y_vert(self):
+        """
+        y-coordinate of the grid vertices. Replacing it drops all of the
+        cached metrics.
+        """
+        return self._y_vert
+
+    @y_vert.setter
+    def y_vert(self, value):
+        self._y_vert = value
+        self._cache = {}
+
     @property
     def x(self):
         """
@@ -314,7 +1131,7 @@ class CGrid:
         """
         return self.mask_rho
 
-    @property
+    @_cached
     def x_rho(self):
         """
         x-coordinates of cell centroids
@@ -323,7 +1140,7 @@ class CGrid:
                         self.x_vert[:-1, 1:] + self.x_vert[:-1, :-1])
         return x_rho
 
-    @property
+    @_cached
     def y_rho(self):
         """
         y-coordinates of cell centroids
@@ -369,14 +1186,14 @@ class CGrid:
         else:
             raise ValueError("shapes are mismatched")
 
-    @property
+    @_cached
     def x_u(self):
         """
         x-coordinate of u-point (leading edge in i-direction?)
         """
         return 0.5 * (self.x_vert[:-1, 1:-1] + self.x_vert[1:, 1:-1])
 
-    @property
+    @_cached
     def y_u(self):
         """
         y-coordinate of u-point (leading edge in i-direction?)
@@ -390,14 +1207,14 @@ class CGrid:
         """
         return self.mask_rho[:, 1:] * self.mask_rho[:, :-1]
 
-    @property
+    @_cached
     def x_v(self):
         """
         x-coordinate of y-point (leading edge in j-direction?)
         """
         return 0.5 * (self.x_vert[1:-1, :-1] + self.x_vert[1:-1, 1:])
 
-    @property
+    @_cached
     def y_v(self):
         """
         y-coordinate of y-point (leading edge in j-direction?)
@@ -434,7 +1251,7 @@ class CGrid:
                     self.mask_rho[1:, :-1] * self.mask_rho[:-1, :-1])
         return mask_psi
 
-    @property
+    @_cached
     def dx(self):
         """
         dimension of cell in x-direction?
@@ -448,7 +1265,7 @@ class CGrid:
     def pm(self):
         return 1.0 / self.dx
 
-    @property
+    @_cached
     def dy(self):
         """
         dimension of cell in y-direction?
@@ -462,7 +1279,7 @@ class CGrid:
     def pn(self):
         return 1.0 / self.dy
 
-    @property
+    @_cached
     def dndx(self):
         if isinstance(self.dy, numpy.ma.MaskedArray):
             dndx = numpy.ma.zeros(self.x_rho.shape, dtype='d')
@@ -472,7 +1289,7 @@ class CGrid:
         dndx[1:-1, 1:-1] = 0.5 * (self.dy[1:-1, 2:] - self.dy[1:-1, :-2])
         return dndx
 
-    @property
+    @_cached
     def dmde(self):
         if isinstance(self.dx, numpy.ma.MaskedArray):
             dmde = numpy.ma.zeros(self.x_rho.shape, dtype='d')
@@ -482,7 +1299,7 @@ class CGrid:
         dmde[1:-1, 1:-1] = 0.5 * (self.dx[2:, 1:-1] - self.dx[:-2, 1:-1])
         return dmde
 
-    @property
+    @_cached
     def angle(self):
         if isinstance(self.x_vert, numpy.ma.MaskedArray) or \
            isinstance(self.y_vert, numpy.ma.MaskedArray):
@@ -524,7 +1341,7 @@ class CGrid:
 
         return angle
 
-    @property
+    @_cached
     def angle_rho(self):
         angle_rho = numpy.arctan2(
             numpy.diff(0.5 * (self.y_vert[1:, :] + self.y_vert[:-1, :])),
@@ -533,6 +1350,631 @@ class CGrid:
 
         return angle_rho
 
+    @_cached
+    def area(self):
+        """
+        Area of each cell (in the units of ``x_vert`` and ``y_vert``,
+        squared), as half of the cross product of its diagonals. Exact
+        for any quadrilateral, skewed or not.
+        """
+        return _quad_area(self.x_vert, self.y_vert)
+
+    def integrate(self, field, mask=True, mean=False):
+        """
+        Area-weighted sum (or mean) of a field defined on the rho-points.
+
+        Parameters
+        ----------
+        field : array-like
+            Values on the rho-points. Any leading dimensions (e.g., time
+            or depth) are integrated separately, all at once, with one
+            matrix product. Masked values are left out.
+        mask : bool or array-like, optional (default = True)
+            Only integrate over the wet cells (``mask_rho``), all of the
+            cells (False), or the nonzero cells of the given mask.
+        mean : bool, optional (default = False)
+            Divide by the area that was integrated over.
+
+        Returns
+        -------
+        total : float or numpy.ndarray
+            One value for every index of the leading dimensions.
+
+        Examples
+        --------
+        >>> x, y = numpy.meshgrid(numpy.arange(4.0), numpy.arange(3.0))
+        >>> grid = CGrid(x, y)
+        >>> float(grid.integrate(numpy.ones((2, 3))))
+        6.0
+        >>> grid.integrate(numpy.arange(12.0).reshape(2, 2, 3), mean=True)
+        array([2.5, 8.5])
+
+        """
+
+        shape = self.x_rho.shape
+        if numpy.shape(field)[-2:] != shape:
+            raise ValueError(f'field must end with the shape of the rho-points {shape}')
+
+        weights = numpy.ma.filled(self.area, 0.0)
+        if mask is True:
+            weights = weights * self.mask_rho
+        elif mask is not False:
+            weights = weights * (numpy.asarray(mask) != 0)
+        weights = weights.ravel()
+
+        leading = numpy.shape(field)[:-2]
+        stack = numpy.ma.getdata(field).reshape(-1, weights.size)
+        if numpy.ma.isMaskedArray(field):
+            valid = ~numpy.ma.getmaskarray(field).reshape(stack.shape)
+            total = numpy.where(valid, stack, 0.0) @ weights
+            if mean:
+                total = total / (valid @ weights)
+        else:
+            total = stack @ weights
+            if mean:
+                total = total / weights.sum()
+
+        if not leading:
+            return total[0]
+        return total.reshape(leading)
+
+    def quality(self, tile_rows=1024, bins=50, fields=False):
+        """
+        Measure the quality of every cell, a tile of rows at a time.
+
+        The metrics, all computed from the vertices of each cell, are:
+
+        ``aspect_ratio``
+            Longest over shortest of the mean xi- and eta-lengths (>= 1).
+        ``skewness``
+            Equiangle skewness: the largest deviation of an interior
+            angle from 90 degrees, relative to 90 degrees (0 to 1).
+        ``size_ratio``
+            Largest area ratio to any of the four neighbouring wet
+            cells (>= 1), a measure of the smoothness of the grid.
+        ``min_angle``
+            Smallest interior angle, in degrees.
+        ``orthogonality``
+            Largest deviation of an interior angle from 90 degrees, in
+            degrees.
+        ``jacobian``
+            Scaled Jacobian (-1 to 1), oriented so that it's positive
+            for most cells. Negative values are folded cells.
+
+        Only cells with four valid vertices and a nonzero ``mask_rho``
+        are measured.
+
+        Parameters
+        ----------
+        tile_rows : int, optional (default = 1024)
+            Rows of cells per tile. Memory use is proportional to it.
+        bins : int, optional (default = 50)
+            Number of bins of the histograms. Each metric has a fixed
+            range (see ``histograms``); values outside of it are counted
+            in the first or last bin.
+        fields : bool, optional (default = False)
+            Return the metrics of every cell as well, and not just their
+            summaries.
+
+        Returns
+        -------
+        quality : dict
+            ``summary`` (min, mean and max of each metric),
+            ``histograms`` (``(counts, edges)`` of each metric),
+            ``inverted`` (the number of folded or degenerate cells),
+            ``cells`` (the number of cells that were measured) and, with
+            ``fields``, ``fields`` (masked arrays on the rho-points).
+
+        """
+
+        wet = numpy.asarray(self.mask_rho) != 0
+        nrho = wet.shape[0]
+
+        ranges = dict(_QUALITY_RANGES, jacobian_reversed=_QUALITY_RANGES['jacobian'])
+        names = list(ranges)
+        edges = {name: numpy.linspace(*ranges[name], num=bins + 1) for name in names}
+        counts = {name: numpy.zeros(bins, dtype=int) for name in names}
+        stats = {name: [numpy.inf, 0.0, -numpy.inf] for name in names}
+        inverted = {'jacobian': 0, 'jacobian_reversed': 0}
+        output = {name: numpy.full(wet.shape, numpy.nan) for name in names} if fields else None
+        ncells = orientation = 0
+
+        def histogram(values, name):
+            low, high = ranges[name]
+            values = numpy.clip(values[~numpy.isnan(values)], low, high)
+            return numpy.histogram(values, bins=edges[name])[0]
+
+        for r0 in range(0, nrho, tile_rows):
+            r1 = min(r0 + tile_rows, nrho)
+
+            # a row of halo on either side for the size ratio
+            v0 = max(r0 - 1, 0)
+            v1 = min(r1 + 1, nrho) + 1
+            x = numpy.ma.filled(numpy.ma.asarray(self.x_vert[v0:v1], dtype='d'), numpy.nan)
+            y = numpy.ma.filled(numpy.ma.asarray(self.y_vert[v0:v1], dtype='d'), numpy.nan)
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                tile = _cell_quality(x, y, wet[v0:v1 - 1])
+
+            rows = slice(r0 - v0, r0 - v0 + r1 - r0)
+            valid = wet[r0:r1] & numpy.isfinite(tile['jacobian'][rows])
+            ncells += int(valid.sum())
+            orientation += int(tile['orientation'][rows][valid].sum())
+            for name in names:
+                values = tile[name][rows][valid]
+                if fields:
+                    output[name][r0:r1][valid] = values
+                if name in inverted:
+                    inverted[name] += int(numpy.sum(values <= 0))
+                counts[name] += histogram(values, name)
+                if values.size:
+                    stats[name][0] = min(stats[name][0], float(numpy.nanmin(values)))
+                    stats[name][1] += float(numpy.nansum(values))
+                    stats[name][2] = max(stats[name][2], float(numpy.nanmax(values)))
+
+        # orient the jacobian like the majority of cells
+        jacobian = 'jacobian' if orientation >= 0 else 'jacobian_reversed'
+        for results in [counts, stats, inverted] + ([output] if fields else []):
+            results['jacobian'] = results.pop(jacobian)
+            results.pop('jacobian_reversed', None)
+
+        quality = {
+            'summary': {
+                name: {'min': low, 'mean': total / max(ncells, 1), 'max': high}
+                for name, (low, total, high) in stats.items()
+            },
+            'histograms': {name: (counts[name], edges[name]) for name in _QUALITY_RANGES},
+            'inverted': inverted['jacobian'],
+            'cells': ncells,
+        }
+        if fields:
+            quality['fields'] = {
+                name: numpy.ma.masked_invalid(values) for name, values in output.items()
+            }
+
+        return quality
+
+    def _with_vertices(self, x, y):
+        """ A new grid of the same kind on the vertices ``x, y``. """
+        return CGrid(x, y)
+
+    def smooth(self, method='laplace', iterations=100, fix_boundary=True, tol=1e-6, workers=None,
+               relaxation=1.0):
+        """
+        Smooth the grid with an iterative elliptic solver.
+
+        Each iteration is a red-black sweep over the interior vertices,
+        moving each one according to the stencil of its eight
+        neighbours. Vertices that are masked or next to a masked vertex
+        stay where they are.
+
+        Parameters
+        ----------
+        method : {'laplace', 'winslow'}, optional (default = 'laplace')
+            ``'laplace'`` moves every vertex to the mean of its four
+            neighbours. ``'winslow'`` solves the Winslow equations,
+            which keep the grid lines from crossing and are less prone
+            to pulling them into concave corners.
+        iterations : int, optional (default = 100)
+            Maximum number of sweeps.
+        fix_boundary : bool, optional (default = True)
+            Keep the vertices of the outer boundary fixed. Otherwise,
+            they slide along the original boundary towards the foot of
+            the grid line coming from the interior, which makes it meet
+            the boundary at a right angle. The corners never move.
+        tol : float, optional (default = 1e-6)
+            Stop once an iteration changes the mean orthogonality error
+            (in radians) of the interior vertices by less than this.
+        workers : int, optional
+            Number of threads each sweep is spread over, each working on
+            a band of rows. The result doesn't depend on it.
+        relaxation : float, optional (default = 1.0)
+            Over-relaxation factor of the sweeps (successive
+            over-relaxation when between 1 and 2). Values around 1.8
+            converge much faster on large grids.
+
+        Returns
+        -------
+        grid : :class:`~CGrid`
+            A new grid of the same kind, with the mask of this one and a
+            ``smoothing`` dict with the ``method``, the number of
+            ``iterations`` done and the mean ``orthogonality`` error
+            before and after.
+
+        """
+
+        if method not in ('laplace', 'winslow'):
+            raise ValueError(f"method must be 'laplace' or 'winslow', not {method!r}")
+
+        mask = numpy.ma.getmaskarray(self.x_vert) | numpy.ma.getmaskarray(self.y_vert)
+        x = numpy.ma.getdata(self.x_vert).astype('d')
+        y = numpy.ma.getdata(self.y_vert).astype('d')
+        x[mask] = y[mask] = numpy.nan
+        ny, nx = x.shape
+
+        # interior vertices with eight valid neighbours, split in red and black
+        finite = numpy.isfinite(x) & numpy.isfinite(y)
+        movable = numpy.zeros_like(finite)
+        movable[1:-1, 1:-1] = numpy.logical_and.reduce([
+            finite[1 + dj:ny - 1 + dj, 1 + di:nx - 1 + di] for dj in (-1, 0, 1) for di in (-1, 0, 1)
+        ])
+        red = numpy.add.outer(numpy.arange(ny), numpy.arange(nx)) % 2 == 0
+        colors = [movable & red, movable & ~red]
+
+        bands = [(rows[0], rows[-1] + 1)
+                 for rows in numpy.array_split(numpy.arange(1, ny - 1), workers or 1) if rows.size]
+
+        # the original outer boundary, as polylines the vertices slide along
+        sides = []
+        if not fix_boundary:
+            for side, inner in [(numpy.s_[0, :], numpy.s_[1, 1:-1]), (numpy.s_[-1, :], numpy.s_[-2, 1:-1]),
+                                (numpy.s_[:, 0], numpy.s_[1:-1, 1]), (numpy.s_[:, -1], numpy.s_[1:-1, -2])]:
+                bx, by = x[side].copy(), y[side].copy()
+                if bx.size > 2 and numpy.all(numpy.isfinite(bx) & numpy.isfinite(by)):
+                    s = numpy.concatenate([[0.0], numpy.cumsum(numpy.hypot(numpy.diff(bx), numpy.diff(by)))])
+                    sides.append([side, inner, bx, by, s, s.copy()])
+
+        def sweep(pool, color):
+            if pool is None:
+                results = [_smooth_rows(x, y, r0, r1, method) for r0, r1 in bands]
+            else:
+                results = list(pool.map(lambda band: _smooth_rows(x, y, *band, method), bands))
+
+            for (r0, r1), (new_x, new_y) in zip(bands, results):
+                if relaxation != 1.0:
+                    new_x = x[r0:r1, 1:-1] + relaxation * (new_x - x[r0:r1, 1:-1])
+                    new_y = y[r0:r1, 1:-1] + relaxation * (new_y - y[r0:r1, 1:-1])
+                update = colors[color][r0:r1, 1:-1] & numpy.isfinite(new_x) & numpy.isfinite(new_y)
+                numpy.copyto(x[r0:r1, 1:-1], new_x, where=update)
+                numpy.copyto(y[r0:r1, 1:-1], new_y, where=update)
+
+        initial = error = _orthogonality_error(x, y)
+        iteration = 0
+        pool = concurrent.futures.ThreadPoolExecutor(workers) if workers and len(bands) > 1 else None
+        try:
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                for iteration in range(1, iterations + 1):
+                    sweep(pool, 0)
+                    sweep(pool, 1)
+                    for boundary in sides:
+                        side, inner, bx, by, s, t = boundary
+                        boundary[5] = t = _slide(x[inner], y[inner], bx, by, s, t)
+                        x[side], y[side] = numpy.interp(t, s, bx), numpy.interp(t, s, by)
+
+                    previous, error = error, _orthogonality_error(x, y)
+                    if abs(previous - error) < tol:
+                        break
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        if mask.any():
+            x[mask] = numpy.ma.getdata(self.x_vert)[mask]
+            y[mask] = numpy.ma.getdata(self.y_vert)[mask]
+            x = numpy.ma.MaskedArray(x, mask=mask)
+            y = numpy.ma.MaskedArray(y, mask=mask)
+
+        grid = self._with_vertices(x, y)
+        grid._mask_rho = numpy.array(self.mask_rho)
+        grid.smoothing = {'method': method, 'iterations': iteration, 'orthogonality': (initial, error)}
+        return grid
+
+    def refine(self, i0, i1, j0, j1, ratio=3, smooth=0):
+        """
+        Derive a nested child grid over a block of cells.
+
+        The child covers the cells ``[j0:j1, i0:i1]`` (i.e., the
+        vertices ``j0`` through ``j1`` and ``i0`` through ``i1``), each
+        split into ``ratio`` by ``ratio`` cells. Its vertices are
+        interpolated from the parent's with cubic Lagrange polynomials
+        in index space (linear ones next to masked vertices), so every
+        ``ratio``-th child vertex is exactly a parent vertex and the
+        child's boundary follows the parent's grid lines.
+
+        Parameters
+        ----------
+        i0, i1, j0, j1 : int
+            Columns and rows of cells to refine, as slices.
+        ratio : int, optional (default = 3)
+            Refinement ratio.
+        smooth : int, optional (default = 0)
+            Number of Winslow sweeps (see :meth:`~smooth`) applied to the
+            child, with its boundary fixed. The interior vertices then
+            no longer coincide with the parent's.
+
+        Returns
+        -------
+        child : :class:`~CGrid`
+            A grid of the same kind with ``((j1 - j0) * ratio + 1, (i1 -
+            i0) * ratio + 1)`` vertices. A child cell is wet where its
+            parent cell is.
+        index_map : dict
+            ``ratio``; ``j_vert`` and ``i_vert``, the (fractional) parent
+            row and column of each row and column of child vertices;
+            ``j_rho`` and ``i_rho``, the parent cell of each row and
+            column of child cells; and ``child`` and ``parent``, slices
+            of the vertices that coincide (``child.x_vert[child] ==
+            parent.x_vert[parent]``).
+
+        """
+
+        ny, nx = (n - 1 for n in self.x_vert.shape)
+        if int(ratio) != ratio or ratio < 1:
+            raise ValueError(f'ratio must be a positive integer (got {ratio})')
+        if not (0 <= j0 < j1 <= ny and 0 <= i0 < i1 <= nx):
+            raise ValueError(f'[{j0}:{j1}, {i0}:{i1}] is not a block of cells of a grid of shape {(ny, nx)}')
+        ratio = int(ratio)
+
+        j_vert = j0 + numpy.arange((j1 - j0) * ratio + 1) / ratio
+        i_vert = i0 + numpy.arange((i1 - i0) * ratio + 1) / ratio
+
+        # cubic, or linear where the cubic stencil reaches a masked vertex
+        x = y = None
+        for order in (3, 1):
+            j_start, j_weights = _lagrange_weights(j_vert, ny + 1, order)
+            i_start, i_weights = _lagrange_weights(i_vert, nx + 1, order)
+
+            # only the parent vertices within reach of the stencils
+            r0, r1 = j_start.min(), j_start.max() + j_weights.shape[1]
+            c0, c1 = i_start.min(), i_start.max() + i_weights.shape[1]
+            vertices = []
+            for v in (self.x_vert, self.y_vert):
+                block = numpy.ma.filled(numpy.ma.asarray(v[r0:r1, c0:c1], dtype='d'), numpy.nan)
+                block = _interpolate_axis(block, i_start - c0, i_weights, axis=1)
+                vertices.append(_interpolate_axis(block, j_start - r0, j_weights, axis=0))
+
+            if x is None:
+                x, y = vertices
+            else:
+                gaps = numpy.isnan(x) | numpy.isnan(y)
+                x[gaps], y[gaps] = vertices[0][gaps], vertices[1][gaps]
+            if not (numpy.isnan(x).any() or numpy.isnan(y).any()):
+                break
+
+        invalid = numpy.isnan(x) | numpy.isnan(y)
+        if invalid.any():
+            x = numpy.ma.MaskedArray(x, mask=invalid)
+            y = numpy.ma.MaskedArray(y, mask=invalid)
+
+        child = self._with_vertices(x, y)
+        wet = numpy.repeat(numpy.repeat(self.mask_rho[j0:j1, i0:i1], ratio, axis=0), ratio, axis=1)
+        child._mask_rho = child.mask_rho * wet
+        if smooth:
+            child = child.smooth('winslow', iterations=smooth, tol=0)
+
+        index_map = {
+            'ratio': ratio,
+            'j_vert': j_vert,
+            'i_vert': i_vert,
+            'j_rho': j0 + numpy.arange((j1 - j0) * ratio) // ratio,
+            'i_rho': i0 + numpy.arange((i1 - i0) * ratio) // ratio,
+            'child': (slice(None, None, ratio), slice(None, None, ratio)),
+            'parent': (slice(j0, j1 + 1), slice(i0, i1 + 1)),
+        }
+        return child, index_map
+
+    def __getitem__(self, key):
+        """ ``grid[j0:j1, i0:i1]`` is ``grid.subset(j0, j1, i0, i1)``. """
+        if not (isinstance(key, tuple) and len(key) == 2 and all(isinstance(k, slice) for k in key)):
+            raise TypeError('grids are indexed with two slices of cells, e.g. grid[j0:j1, i0:i1]')
+        if any(k.step not in (None, 1) for k in key):
+            raise ValueError('grids can only be sliced with a step of 1')
+        rows, cols = key
+        return self.subset(rows.start, rows.stop, cols.start, cols.stop)
+
+    def subset(self, j0=None, j1=None, i0=None, i1=None):
+        """
+        A grid of the cells ``[j0:j1, i0:i1]`` that shares memory with
+        this one.
+
+        The vertices and ``mask_rho`` of the subset are views into this
+        grid's, so nothing is copied or recomputed. Metrics are computed
+        when first used. Only item assignments to either mask (e.g.,
+        ``sub.mask_rho[2, 3] = 0``) show up in both grids; assigning a
+        new ``mask_rho``, which :meth:`~mask_polygon` does, replaces the
+        mask of that grid alone.
+
+        Parameters
+        ----------
+        j0, j1, i0, i1 : int, optional
+            Rows and columns of cells, as in slices (negative values
+            count from the end, None means the start or the end).
+
+        Returns
+        -------
+        grid : :class:`~CGrid`
+            A :class:`~CGrid_geo` for geographic grids, a plain
+            :class:`~CGrid` otherwise.
+
+        """
+
+        ny, nx = self.mask_rho.shape
+        j0, j1, _ = slice(j0, j1).indices(ny)
+        i0, i1, _ = slice(i0, i1).indices(nx)
+        if j1 <= j0 or i1 <= i0:
+            raise ValueError(f'[{j0}:{j1}, {i0}:{i1}] contains no cells')
+
+        return self._subset((slice(j0, j1 + 1), slice(i0, i1 + 1)), (slice(j0, j1), slice(i0, i1)))
+
+    def _subset(self, verts, cells, grid=None):
+        # skip __init__, which would scan the vertices for NaNs
+        if grid is None:
+            grid = CGrid.__new__(CGrid)
+        grid._x = None
+        grid._y = None
+        grid._mask = None
+        grid.x_vert = self.x_vert[verts]
+        grid.y_vert = self.y_vert[verts]
+        grid._mask_rho = self.mask_rho[cells]
+        return grid
+
+    def tiles(self, tile_shape=(256, 256), halo=1):
+        """
+        Split the grid into tiles of cells, each with a halo of
+        neighbouring cells.
+
+        The tiles are views of this grid (see :meth:`~subset`), so
+        making them copies nothing.
+
+        Parameters
+        ----------
+        tile_shape : two-tuple of ints, optional (default = (256, 256))
+            Rows and columns of cells per tile, without the halo. Tiles
+            on the last row or column may be smaller.
+        halo : int, optional (default = 1)
+            Cells of the neighbouring tiles included around each tile
+            (fewer at the edges of the grid).
+
+        Yields
+        ------
+        tile : :class:`~Tile`
+
+        """
+
+        ny, nx = self.mask_rho.shape
+        trows, tcols = tile_shape
+        if trows < 1 or tcols < 1 or halo < 0:
+            raise ValueError('tile_shape must be positive and halo must not be negative')
+
+        for tj, r0 in enumerate(range(0, ny, trows)):
+            r1 = min(r0 + trows, ny)
+            for ti, c0 in enumerate(range(0, nx, tcols)):
+                c1 = min(c0 + tcols, nx)
+                b0, b1 = max(r0 - halo, 0), min(r1 + halo, ny)
+                a0, a1 = max(c0 - halo, 0), min(c1 + halo, nx)
+                yield Tile(
+                    index=(tj, ti),
+                    grid=self.subset(b0, b1, a0, a1),
+                    rows=slice(r0, r1),
+                    cols=slice(c0, c1),
+                    interior=(slice(r0 - b0, r1 - b0), slice(c0 - a0, c1 - a0)),
+                )
+
+    def map_tiles(self, func, tile_shape=(256, 256), halo=1, workers=None, backend='thread'):
+        """
+        Apply a function to every tile of the grid and stitch the
+        results back together.
+
+        ``func`` is called with the grid of each tile (see
+        :meth:`~tiles`) and returns an array, or a tuple of arrays, on
+        the rho-, u-, v- or psi-points or the vertices of that grid,
+        which is told apart by its shape. Every point is taken from
+        the tile that owns the cell to its lower left, so values
+        computed in the halo are dropped.
+
+        Parameters
+        ----------
+        func : callable
+            The function to apply. With the ``'process'`` backend, it
+            must be picklable (e.g., defined at the top level of a
+            module).
+        tile_shape : two-tuple of ints, optional (default = (256, 256))
+        halo : int, optional (default = 1)
+            Outputs on the u-, v- and psi-points need at least 1.
+        workers : int, optional
+            Number of threads or processes. By default, the tiles are
+            processed one after the other.
+        backend : {'thread', 'process'}, optional (default = 'thread')
+            Threads suit functions that spend their time in numpy (or
+            other code that releases the GIL), processes everything
+            else.
+
+        Returns
+        -------
+        output : numpy.ndarray or tuple of numpy.ndarray
+            Masked arrays when any tile returned one.
+
+        """
+
+        if backend == 'thread':
+            executor = concurrent.futures.ThreadPoolExecutor
+        elif backend == 'process':
+            executor = concurrent.futures.ProcessPoolExecutor
+        else:
+            raise ValueError(f"backend must be 'thread' or 'process', not {backend!r}")
+
+        ny, nx = self.mask_rho.shape
+        tiles = list(self.tiles(tile_shape, halo=halo))
+        grids = [tile.grid for tile in tiles]
+        pool = executor(workers) if workers else None
+        try:
+            results = map(func, grids) if pool is None else pool.map(func, grids)
+
+            outputs = masks = None
+            for tile, result in zip(tiles, results):
+                single = not isinstance(result, tuple)
+                result = [result] if single else list(result)
+                if outputs is None:
+                    outputs = [None] * len(result)
+                    masks = [None] * len(result)
+
+                tny, tnx = tile.grid.mask_rho.shape
+                first_row = tile.rows.start - tile.interior[0].start
+                first_col = tile.cols.start - tile.interior[1].start
+                for k, value in enumerate(result):
+                    value = numpy.asanyarray(value)
+                    full_rows, rows, tile_rows = _stitch_axis(value.shape[0], tny, first_row, tile.rows, ny)
+                    full_cols, cols, tile_cols = _stitch_axis(value.shape[1], tnx, first_col, tile.cols, nx)
+                    if outputs[k] is None:
+                        outputs[k] = numpy.empty((full_rows, full_cols) + value.shape[2:], dtype=value.dtype)
+                    outputs[k][rows, cols] = numpy.ma.getdata(value)[tile_rows, tile_cols]
+                    if numpy.ma.isMaskedArray(value):
+                        if masks[k] is None:
+                            masks[k] = numpy.zeros(outputs[k].shape, dtype=bool)
+                        masks[k][rows, cols] = numpy.ma.getmaskarray(value)[tile_rows, tile_cols]
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        outputs = [
+            out if mask is None else numpy.ma.MaskedArray(out, mask=mask)
+            for out, mask in zip(outputs, masks)
+        ]
+        return outputs[0] if single else tuple(outputs)
+
+    def sample(self, csa, point='rho', wet_only=True):
+        """
+        Evaluate a surface at the points of the grid, skipping the dry
+        ones.
+
+        Only the coordinates of the points that are kept are gathered
+        (into compact 1-D arrays) and passed to the surface, so the work
+        scales with the number of wet cells rather than the size of the
+        grid.
+
+        Parameters
+        ----------
+        csa : callable
+            The surface, e.g. a :class:`~pygridgen.csa.CSA`, called with
+            1-D arrays of x- and y-coordinates.
+        point : {'rho', 'u', 'v', 'psi', 'vert'}, optional (default = 'rho')
+            Where to evaluate the surface.
+        wet_only : bool, optional (default = True)
+            Skip the points masked by ``mask_rho`` (or ``mask_u``,
+            ``mask_v``, ``mask_psi``). Masked coordinates are always
+            skipped.
+
+        Returns
+        -------
+        z : numpy.ma.MaskedArray
+            The values on the points, masked wherever the surface
+            wasn't evaluated or returned a masked value or NaN.
+
+        """
+
+        if point not in ('rho', 'u', 'v', 'psi', 'vert'):
+            raise ValueError(f"point must be 'rho', 'u', 'v', 'psi' or 'vert', not {point!r}")
+
+        x, y = getattr(self, 'x_' + point), getattr(self, 'y_' + point)
+        valid = ~(numpy.ma.getmaskarray(x) | numpy.ma.getmaskarray(y))
+        if wet_only and point != 'vert':
+            valid &= numpy.asarray(getattr(self, 'mask_' + point)) != 0
+
+        z = numpy.ma.masked_all(numpy.shape(x), dtype='d')
+        if valid.any():
+            values = csa(numpy.ma.getdata(x)[valid], numpy.ma.getdata(y)[valid])
+            z[valid] = numpy.ma.masked_invalid(values)
+        return z
+
     @property
     def orthogonality(self):
         """
@@ -564,6 +2006,9 @@ class CGrid:
             )
         return self.orthogonality
 
+    _ARCHIVE_METRICS = ('x_rho', 'y_rho', 'x_u', 'y_u', 'x_v', 'y_v', 'dx', 'dy',
+                        'dndx', 'dmde', 'angle', 'angle_rho', 'area')
+
     def mask_polygon(self, polyverts, mask_value=False):
         """
         Mask Cartesian points contained within the polygon defined by
@@ -608,6 +2053,142 @@ class CGrid:
 
         self.mask_rho = mask
 
+    def save(self, path, metrics=()):
+        """
+        Write the grid to a versioned archive that :meth:`~load` can
+        open without recomputing anything.
+
+        The archive is a directory with a ``header.json`` and one
+        ``.npy`` file per array, or a single ``.npz`` file when ``path``
+        ends with ``.npz``. It holds the vertices, ``mask_rho``, the
+        grid's spec (when it has one, e.g., :class:`~Gridgen`) and
+        whichever ``metrics`` are asked for. The projection of the grid,
+        if any, is stored as its PROJ string, so it must have one
+        (``srs``, like ``pyproj.Proj``); others raise a ``ValueError``.
+
+        Parameters
+        ----------
+        path : str or path-like
+        metrics : sequence of str, optional
+            Names of cached metrics to store as well (e.g., ``'dx'``,
+            ``'dy'``, ``'angle'``). Loaded grids serve these from the
+            archive instead of computing them.
+
+        """
+
+        unknown = set(metrics) - set(CGrid._ARCHIVE_METRICS)
+        if unknown:
+            raise ValueError(f'metrics that can be saved: {CGrid._ARCHIVE_METRICS}, not {sorted(unknown)}')
+
+        spec = None
+        if hasattr(self, 'to_spec'):
+            spec = self.to_spec()
+            spec['proj'] = _proj_to_srs(spec.get('proj'))
+
+        state, vertices = self._archive_state()
+        arrays = {}
+        vertices = [('x_vert', self.x_vert), ('y_vert', self.y_vert), ('mask_rho', self.mask_rho)] + vertices
+        for name, value in vertices:
+            arrays.update(_archive_arrays(name, value))
+        for name in metrics:
+            arrays.update(_archive_arrays(name, getattr(self, name)))
+
+        header = {
+            'format': 'pygridgen',
+            'version': _ARCHIVE_VERSION,
+            'class': type(self).__name__,
+            'shape': list(self.x_vert.shape),
+            'metrics': list(metrics),
+            'arrays': sorted(arrays),
+            'spec': spec,
+            'state': state,
+        }
+
+        path = os.fspath(path)
+        if path.endswith('.npz'):
+            numpy.savez(path, header=json.dumps(header), **arrays)
+        else:
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(path, 'header.json'), 'w') as f:
+                json.dump(header, f, indent=2)
+            for name, value in arrays.items():
+                numpy.save(os.path.join(path, name + '.npy'), numpy.asarray(value))
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Open a grid written by :meth:`~save`.
+
+        Nothing is computed while loading: the vertices and mask are
+        taken as they were stored and any saved metrics are placed in
+        the cache.
+
+        Parameters
+        ----------
+        path : str or path-like
+            The archive directory or ``.npz`` file.
+        mmap : bool, optional (default = True)
+            Memory-map the arrays of an archive directory (read-only)
+            instead of reading them. ``.npz`` files are always read.
+
+        Returns
+        -------
+        grid : :class:`~CGrid`
+            A grid of the class that was saved (:class:`~CGrid`,
+            :class:`~CGrid_geo` or :class:`~Gridgen`), with its
+            projection rebuilt from the stored PROJ string. The header
+            (including the spec of the grid, if any) is available as
+            ``grid.archive_header``.
+
+        """
+
+        path = os.fspath(path)
+        if path.endswith('.npz'):
+            with numpy.load(path) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+            header = json.loads(str(arrays.pop('header')))
+        else:
+            with open(os.path.join(path, 'header.json')) as f:
+                header = json.load(f)
+            mmap_mode = 'r' if mmap else None
+            arrays = {
+                name: numpy.load(os.path.join(path, name + '.npy'), mmap_mode=mmap_mode)
+                for name in header['arrays']
+            }
+
+        if header.get('format') != 'pygridgen':
+            raise ValueError(f'{path} is not a pygridgen grid archive')
+        if header['version'] > _ARCHIVE_VERSION:
+            raise ValueError(f'grid archive version {header["version"]} is newer than this '
+                             f'version of pygridgen can read ({_ARCHIVE_VERSION})')
+
+        kinds = {kind.__name__: kind for kind in (CGrid, CGrid_geo, Gridgen)}
+        if header['class'] not in kinds:
+            raise ValueError(f'cannot load a grid of class {header["class"]}')
+        grid = kinds[header['class']]._from_archive(header, arrays)
+        grid._x = None
+        grid._y = None
+        grid._mask = None
+        grid.x_vert = _unarchive_array(arrays, 'x_vert')
+        grid.y_vert = _unarchive_array(arrays, 'y_vert')
+        grid._mask_rho = _unarchive_array(arrays, 'mask_rho')
+        for name in header['metrics']:
+            grid._cache[name] = _read_only(_unarchive_array(arrays, name))
+
+        grid.archive_header = header
+        return grid
+
+    @classmethod
+    def _from_archive(cls, header, arrays):
+        """ An empty grid of this class for :meth:`~load` to fill. """
+        # skip __init__, which would scan the vertices for NaNs
+        return CGrid.__new__(CGrid)
+
+    def _archive_state(self):
+        """ What :meth:`~save` stores besides the vertices and mask:
+        the attributes of the grid and extra named arrays. """
+        return None, []
+
 
 class CGrid_geo(CGrid):
     """Curvilinear Arakawa C-grid defined in geographic coordinates.
@@ -631,17 +2212,26 @@ class CGrid_geo(CGrid):
         dimensions.
     ellipse : str, optional (default = 'WGS84')
         The ellipsoid reference for ``lon`` and ``lat``,
+    haversine : bool, optional (default = False)
+        Compute great circle distances on a sphere with the haversine
+        formula instead of geodesics on ``ellipse``. Always the case
+        when pyproj isn't installed.
+    workers : int, optional
+        Number of threads the edge lengths are computed with, each
+        working on a chunk of rows. Only affects the speed, not the
+        results.
+
+    Notes
+    -----
+    The length of each cell edge is computed once and cached; ``dx``,
+    ``dy`` and everything derived from them (``pm``, ``pn``, ``dndx``,
+    ``dmde``), as well as ``area``, share those lengths.
 
     """
 
-    def __init__(self, lon, lat, proj, use_gcdist=True, ellipse='WGS84'):
-        try:
-            import pyproj  # noqa
-        except ImportError:
-            try:
-                from mpl_toolkits.basemap import pyproj  # noqa
-            except ImportError:
-                raise ImportError('pyproj or mpltoolkits-basemap required')
+    def __init__(self, lon, lat, proj, use_gcdist=True, ellipse='WGS84',
+                 haversine=False, workers=None):
+        pyproj = _import_pyproj()
 
         x, y = proj(lon, lat)
         self.lon_vert = lon
@@ -651,25 +2241,220 @@ class CGrid_geo(CGrid):
         self.use_gcdist = use_gcdist
         self.ellipse = ellipse
         self.proj = proj
-        self.geod = pyproj.Geod(ellps=self.ellipse)
+        self.geod = None if pyproj is None else pyproj.Geod(ellps=self.ellipse)
+        self.haversine = haversine or self.geod is None
+        # only how fast the edge lengths are computed, not what they are,
+        # so changing it keeps the cached metrics
+        self.workers = workers
 
         super().__init__(x, y)
 
-        self.lon_rho, self.lat_rho = self.proj(self.x_rho, self.y_rho,
-                                               inverse=True)
-        self.lon_u, self.lat_u = self.proj(self.x_u, self.y_u, inverse=True)
-        self.lon_v, self.lat_v = self.proj(self.x_v, self.y_v, inverse=True)
-        self.lon_psi, self.lat_psi = self.proj(self.x_psi, self.y_psi,
-                                               inverse=True)
+    def _with_vertices(self, x, y):
+        lon, lat = self.proj(numpy.ma.getdata(x), numpy.ma.getdata(y), inverse=True)
+        if numpy.ma.isMaskedArray(x):
+            lon = numpy.ma.MaskedArray(lon, mask=numpy.ma.getmaskarray(x))
+            lat = numpy.ma.MaskedArray(lat, mask=numpy.ma.getmaskarray(x))
+        return CGrid_geo(lon, lat, self.proj, use_gcdist=self.use_gcdist, ellipse=self.ellipse,
+                         haversine=self.haversine, workers=self.workers)
+
+    def _subset(self, verts, cells):
+        grid = CGrid_geo.__new__(CGrid_geo)
+        grid.lon_vert = self.lon_vert[verts]
+        grid.lat_vert = self.lat_vert[verts]
+        grid.use_gcdist = self.use_gcdist
+        grid.ellipse = self.ellipse
+        grid.proj = self.proj
+        grid.geod = self.geod
+        grid.haversine = self.haversine
+        grid.workers = self.workers
+        return super()._subset(verts, cells, grid)
+
+    @classmethod
+    def _from_archive(cls, header, arrays):
+        state = header['state']
+        grid = CGrid_geo.__new__(CGrid_geo)
+        grid.lon_vert = _unarchive_array(arrays, 'lon_vert')
+        grid.lat_vert = _unarchive_array(arrays, 'lat_vert')
+        grid.use_gcdist = state['use_gcdist']
+        grid.ellipse = state['ellipse']
+        grid.proj = _proj_from_srs(state['proj'])
+        pyproj = _import_pyproj()
+        grid.geod = None if pyproj is None else pyproj.Geod(ellps=grid.ellipse)
+        grid.haversine = state['haversine'] or grid.geod is None
+        grid.workers = state['workers']
+        return grid
+
+    def _archive_state(self):
+        state = {
+            'proj': _proj_to_srs(self.proj),
+            'use_gcdist': self.use_gcdist,
+            'ellipse': self.ellipse,
+            'haversine': self.haversine,
+            'workers': self.workers,
+        }
+        return state, [('lon_vert', self.lon_vert), ('lat_vert', self.lat_vert)]
+
+    @property
+    def lon_vert(self):
+        """ Longitude of the grid vertices. Replacing it drops all of
+        the cached metrics. """
+        return self._lon_vert
+
+    @lon_vert.setter
+    def lon_vert(self, value):
+        self._lon_vert = value
+        self._cache = {}
+
+    @property
+    def lat_vert(self):
+        """ Latitude of the grid vertices. Replacing it drops all of
+        the cached metrics. """
+        return self._lat_vert
+
+    @lat_vert.setter
+    def lat_vert(self, value):
+        self._lat_vert = value
+        self._cache = {}
+
+    @property
+    def use_gcdist(self):
+        """ Whether cell dimensions are great circle distances. Changing
+        it drops the cached metrics. """
+        return self._use_gcdist
+
+    @use_gcdist.setter
+    def use_gcdist(self, value):
+        self._use_gcdist = value
+        self._cache = {}
+
+    @property
+    def haversine(self):
+        """ Whether great circle distances are computed on a sphere.
+        Changing it drops the cached metrics. """
+        return self._haversine
+
+    @haversine.setter
+    def haversine(self, value):
+        self._haversine = value
+        self._cache = {}
+
+    def _distance(self, lon0, lat0, lon1, lat1):
+        if self.haversine:
+            return _haversine(lon0, lat0, lon1, lat1)
+        return self.geod.inv(lon0, lat0, lon1, lat1)[2]
+
+    def _distance_by_rows(self, lon0, lat0, lon1, lat1):
+        """ :meth:`~_distance` in chunks of rows, spread over
+        ``workers`` threads. """
+        nrows = lon0.shape[0]
+        if not self.workers or self.workers < 2 or nrows < 2:
+            return self._distance(lon0, lat0, lon1, lat1)
+
+        bounds = numpy.linspace(0, nrows, num=min(4 * self.workers, nrows) + 1).astype(int)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+            chunks = pool.map(
+                lambda rows: self._distance(*(a[slice(*rows)] for a in (lon0, lat0, lon1, lat1))),
+                zip(bounds[:-1], bounds[1:])
+            )
+            return numpy.concatenate(list(chunks))
+
+    @_cached
+    def _edge_lengths(self):
+        """
+        Great circle lengths of the cell edges along the xi- (rows of
+        vertices) and eta-directions (columns of vertices).
+        """
+        lon = numpy.asarray(numpy.ma.getdata(self.lon_vert), dtype='d')
+        lat = numpy.asarray(numpy.ma.getdata(self.lat_vert), dtype='d')
+        xi = self._distance_by_rows(lon[:, :-1], lat[:, :-1], lon[:, 1:], lat[:, 1:])
+        eta = self._distance_by_rows(lon[:-1, :], lat[:-1, :], lon[1:, :], lat[1:, :])
+
+        if numpy.ma.isMaskedArray(self.lon_vert) or numpy.ma.isMaskedArray(self.lat_vert):
+            mask = numpy.ma.getmaskarray(self.lon_vert) | numpy.ma.getmaskarray(self.lat_vert)
+            xi = numpy.ma.MaskedArray(xi, mask=mask[:, :-1] | mask[:, 1:])
+            eta = numpy.ma.MaskedArray(eta, mask=mask[:-1, :] | mask[1:, :])
+
+        return {'xi': xi, 'eta': eta}
+
+    @_cached
+    def _lonlat(self):
+        """
+        Longitude and latitude of the rho-, u-, v-, and psi-points, all
+        from a single inverse projection.
+        """
+        points = ['rho', 'u', 'v', 'psi']
+        xs = [getattr(self, 'x_' + point) for point in points]
+        ys = [getattr(self, 'y_' + point) for point in points]
+        lon, lat = self.proj(
+            numpy.concatenate([numpy.ma.getdata(x).ravel() for x in xs]),
+            numpy.concatenate([numpy.ma.getdata(y).ravel() for y in ys]),
+            inverse=True
+        )
+
+        lonlat = {}
+        start = 0
+        for point, x, y in zip(points, xs, ys):
+            stop = start + x.size
+            lon_point = numpy.asarray(lon[start:stop]).reshape(x.shape)
+            lat_point = numpy.asarray(lat[start:stop]).reshape(x.shape)
+            if numpy.ma.isMaskedArray(x) or numpy.ma.isMaskedArray(y):
+                mask = numpy.ma.getmaskarray(x) | numpy.ma.getmaskarray(y)
+                lon_point = numpy.ma.MaskedArray(lon_point, mask=mask)
+                lat_point = numpy.ma.MaskedArray(lat_point, mask=mask)
+            lonlat[point] = (lon_point, lat_point)
+            start = stop
+
+        return lonlat
+
+    @property
+    def lon_rho(self):
+        """ Longitude of the cell centroids """
+        return self._lonlat['rho'][0]
+
+    @property
+    def lat_rho(self):
+        """ Latitude of the cell centroids """
+        return self._lonlat['rho'][1]
+
+    @property
+    def lon_u(self):
+        """ Longitude of the u-points """
+        return self._lonlat['u'][0]
+
+    @property
+    def lat_u(self):
+        """ Latitude of the u-points """
+        return self._lonlat['u'][1]
+
+    @property
+    def lon_v(self):
+        """ Longitude of the v-points """
+        return self._lonlat['v'][0]
+
+    @property
+    def lat_v(self):
+        """ Latitude of the v-points """
+        return self._lonlat['v'][1]
 
-        # coriolis frequency
-        self.f = 2.0 * 7.29e-5 * numpy.cos(self.lat_rho * numpy.pi / 180.0)
+    @property
+    def lon_psi(self):
+        """ Longitude of the psi-points """
+        return self._lonlat['psi'][0]
 
     @property
+    def lat_psi(self):
+        """ Latitude of the psi-points """
+        return self._lonlat['psi'][1]
+
+    @_cached
+    def f(self):
+        """ Coriolis frequency at the cell centroids """
+        return 2.0 * 7.29e-5 * numpy.cos(self.lat_rho * numpy.pi / 180.0)
+
+    @_cached
     def dx(self):
         if self.use_gcdist:
-            az1, az2, dx = self.geod.inv(self.lon[:, 1:], self.lat[:, 1:],
-                                         self.lon[:, :-1], self.lat[:, :-1])
+            dx = self._edge_lengths['xi']
             return 0.5 * (dx[1:, :] + dx[:-1, :])
         else:
             x_temp = 0.5 * (self.x_vert[1:, :] + self.x_vert[:-1, :])
@@ -677,11 +2462,10 @@ class CGrid_geo(CGrid):
             dx = numpy.sqrt(numpy.diff(x_temp, axis=1)**2 + numpy.diff(y_temp, axis=1)**2)
             return dx
 
-    @property
+    @_cached
     def dy(self):
         if self.use_gcdist:
-            az1, ax2, dy = self.geod.inv(self.lon[1:, :], self.lat[1:, :],
-                                         self.lon[:-1, :], self.lat[:-1, :])
+            dy = self._edge_lengths['eta']
             return 0.5 * (dy[:, 1:] + dy[:, :-1])
         else:
             x_temp = 0.5 * (self.x_vert[:, 1:] + self.x_vert[:, :-1])
@@ -689,6 +2473,39 @@ class CGrid_geo(CGrid):
             dy = numpy.sqrt(numpy.diff(x_temp, axis=0)**2 + numpy.diff(y_temp, axis=0)**2)
             return dy
 
+    @_cached
+    def _diagonal_lengths(self):
+        """
+        Great circle lengths of the diagonals of the cells, from the
+        (j, i) to the (j + 1, i + 1) vertex.
+        """
+        lon = numpy.asarray(numpy.ma.getdata(self.lon_vert), dtype='d')
+        lat = numpy.asarray(numpy.ma.getdata(self.lat_vert), dtype='d')
+        return self._distance_by_rows(lon[:-1, :-1], lat[:-1, :-1], lon[1:, 1:], lat[1:, 1:])
+
+    @_cached
+    def area(self):
+        """
+        Area of each cell. With ``use_gcdist``, in square meters, from
+        the same great circle (or haversine) lengths as ``dx`` and
+        ``dy``: the sum of the two triangles on either side of a
+        diagonal. Otherwise, in projected units squared (see
+        :attr:`CGrid.area`).
+        """
+        if not self.use_gcdist:
+            return _quad_area(self.x_vert, self.y_vert)
+
+        xi, eta = self._edge_lengths['xi'], self._edge_lengths['eta']
+        diagonal = self._diagonal_lengths
+        area = (_triangle_area(numpy.ma.getdata(xi[:-1]), numpy.ma.getdata(eta[:, 1:]), diagonal) +
+                _triangle_area(numpy.ma.getdata(eta[:, :-1]), numpy.ma.getdata(xi[1:]), diagonal))
+
+        if numpy.ma.isMaskedArray(self.lon_vert) or numpy.ma.isMaskedArray(self.lat_vert):
+            mask = numpy.ma.getmaskarray(self.lon_vert) | numpy.ma.getmaskarray(self.lat_vert)
+            area = numpy.ma.MaskedArray(area, mask=mask[1:, 1:] | mask[1:, :-1] |
+                                        mask[:-1, 1:] | mask[:-1, :-1])
+        return area
+
     @property
     def lon(self):
         """Shorthand for lon_vert"""
@@ -761,13 +2578,39 @@ class Gridgen(CGrid):
         narrow in one dimension compared to another.
     checksimplepoly : bool, optional (default = True)
         Toggles a check to confirm that the boundary inputs form a valid
-        geometry.
+        geometry. The boundary is always checked in Python with
+        :func:`~validate_boundary` before gridgen-c is called; this
+        toggles its self-intersection test as well.
     verbose : bool, optional (default = True)
         Toggles the printing of console statements to track the progress
-        of the grid generation.
+        of the grid generation. These are captured and sent to the
+        ``pygridgen.grid`` logger (see :func:`~parse_gridgen_message`),
+        and the time spent in each stage is recorded in
+        ``timings['stages']``.
     autogen : bool, optional (default = True)
         Toggles the automatic generation of the grid. Set to False if
         you want to delay calling the ``generate_grid`` method.
+    simplify : float, optional
+        When provided, boundary vertices are removed with
+        :func:`~simplify_boundary` as long as the boundary moves by no
+        more than this distance (in projected units). Vertices with
+        nonzero ``beta`` and the ``ul_idx`` corner are always kept. The
+        number of removed vertices is recorded in ``simplification``,
+        and the time spent simplifying and generating in ``timings``.
+    solver_state : dict-like, optional
+        The ``solver_state`` of an earlier grid with the same boundary
+        (or the result of ``numpy.load`` on a file written with
+        ``numpy.savez(path, **grid.solver_state)``). The sigmas and the
+        rectangularized domain are taken from it instead of being
+        recomputed by gridgen-c.
+    engine : {'gridgen', 'numpy'}, optional (default = 'gridgen')
+        ``'numpy'`` generates the grid without gridgen-c, for boundaries
+        with exactly four corners (four ``beta`` values of 1 and no
+        negative ones): the sides are interpolated into the domain
+        (transfinite interpolation by arc length) and the result is
+        smoothed with :meth:`~CGrid.smooth`'s Winslow solver, coarse to
+        fine. ``focus`` is applied as with gridgen. The grid is smooth
+        but, unlike gridgen's, not conformal.
 
     Examples
     --------
@@ -798,32 +2641,8 @@ class Gridgen(CGrid):
     def __init__(self, xbry, ybry, beta, shape, ul_idx=0, focus=None,
                  proj=None, nnodes=14, precision=1.0e-12, nppe=3,
                  newton=True, thin=True, checksimplepoly=True,
-                 verbose=False, autogen=True):
-
-        # find the gridgen-c shared library
-        libgridgen_paths = [
-            ('libgridgen.so', os.path.join(sys.prefix, 'lib')),
-            ('libgridgen', os.path.join(sys.prefix, 'lib')),
-            ('libgridgen.so', '/usr/local/lib'),
-            ('libgridgen', '/usr/local/lib'),
-        ]
-
-        for name, path in libgridgen_paths:
-            try:
-                self._libgridgen = numpy.ctypeslib.load_library(name, path)
-                break
-            except OSError:
-                pass
-            else:
-                raise OSError('Failed to load libgridgen.')
-
-        # initialize/set types of critical variables
-        self._libgridgen.gridgen_generategrid2.restype = ctypes.POINTER(ctypes.c_void_p)
-        self._libgridgen.gridnodes_getx.restype = ctypes.POINTER(ctypes.POINTER(ctypes.c_double))
-        self._libgridgen.gridnodes_gety.restype = ctypes.POINTER(ctypes.POINTER(ctypes.c_double))
-        self._libgridgen.gridnodes_getnce1.restype = ctypes.c_int
-        self._libgridgen.gridnodes_getnce2.restype = ctypes.c_int
-        self._libgridgen.gridmap_build.restype = ctypes.c_void_p
+                 verbose=False, autogen=True, simplify=None, solver_state=None,
+                 engine='gridgen'):
 
         # store the boundary, reproject if possible
         self.xbry = numpy.asarray(xbry, dtype='d')
@@ -840,6 +2659,10 @@ class Gridgen(CGrid):
         # properties
         self._sigmas = None
         self._nsigmas = None
+        self._nrect = None
+        self._xrect = None
+        self._yrect = None
+        self._solver_buffers = None
         self._ny = shape[0]
         self._nx = shape[1]
         self._focus = focus
@@ -853,6 +2676,31 @@ class Gridgen(CGrid):
         self.thin = thin
         self.checksimplepoly = checksimplepoly
         self.verbose = verbose
+        self.timings = {}
+
+        if engine not in ('gridgen', 'numpy'):
+            raise ValueError(f"engine must be 'gridgen' or 'numpy', not {engine!r}")
+        self.engine = engine
+
+        # drop boundary vertices that don't matter at this tolerance
+        self.simplification = None
+        if simplify is not None:
+            tic = time.perf_counter()
+            nbry = len(self.xbry)
+            self.xbry, self.ybry, self.beta, self.ul_idx, kept = simplify_boundary(
+                self.xbry, self.ybry, self.beta, simplify, ul_idx=self.ul_idx
+            )
+            self.timings['simplify'] = time.perf_counter() - tic
+            self.simplification = {
+                'tolerance': simplify,
+                'original': nbry,
+                'retained': kept.size,
+                'removed': nbry - kept.size,
+            }
+
+        # reuse the conformal map of an earlier solve
+        if solver_state is not None:
+            self._seed_solver_state(solver_state)
 
         # initialize the gridnodes object
         self._gn = None
@@ -863,7 +2711,57 @@ class Gridgen(CGrid):
 
     def __del__(self):
         """delete gridnode object upon deletion"""
-        self._libgridgen.gridnodes_destroy(self._gn)
+        if getattr(self, '_gn', None) is not None:
+            self._libgridgen.gridnodes_destroy(self._gn)
+
+    def _init_from_spec(self, spec, proj, **kwargs):
+        """ Run __init__ with the arguments of a spec from
+        :meth:`~to_spec`, whose boundary is already projected and
+        simplified, and then attach ``proj``. """
+        spec = dict(spec)
+        focus = spec.pop('focus')
+        spec.pop('proj')
+        self.__init__(focus=Focus.from_spec(focus) if focus else None, autogen=False, **spec, **kwargs)
+        self.proj = proj
+
+    @classmethod
+    def _from_archive(cls, header, arrays):
+        grid = Gridgen.__new__(Gridgen)
+        grid._init_from_spec(header['spec'], _proj_from_srs(header['spec']['proj']))
+        return grid
+
+    def __getstate__(self):
+        """ Pickle the spec, nodes, mask and solver state, but none of
+        the native handles. """
+        solver_state = self.solver_state
+        if solver_state is not None:
+            solver_state = {key: numpy.array(value) for key, value in solver_state.items()}
+
+        return {
+            'spec': self.to_spec(),
+            'x': getattr(self, 'x_vert', None),
+            'y': getattr(self, 'y_vert', None),
+            'mask_rho': getattr(self, '_mask_rho', None),
+            'solver_state': solver_state,
+            'verbose': self.verbose,
+            'timings': self.timings,
+            'simplification': self.simplification,
+        }
+
+    def __setstate__(self, state):
+        self._init_from_spec(state['spec'], state['spec']['proj'], verbose=state['verbose'],
+                             solver_state=state['solver_state'])
+        self.timings = state['timings']
+        self.simplification = state['simplification']
+
+        if state['x'] is not None:
+            super().__init__(state['x'], state['y'])
+            self._mask_rho = state['mask_rho']
+
+    @property
+    def _libgridgen(self):
+        """ The gridgen-c shared library, loaded on first use. """
+        return _load_libgridgen()
 
     @property
     def sigmas(self):
@@ -884,6 +2782,72 @@ class Gridgen(CGrid):
     def nsigmas(self, value):
         self._nsigmas = value
 
+    @property
+    def xrect(self):
+        """ x-coordinates of the vertices of the rectangularized domain
+        (a view into gridgen-c's memory), or None before the first solve.
+        """
+        return _double_array(self._xrect, self._nrect)
+
+    @property
+    def yrect(self):
+        """ y-coordinates of the vertices of the rectangularized domain
+        (a view into gridgen-c's memory), or None before the first solve.
+        """
+        return _double_array(self._yrect, self._nrect)
+
+    @property
+    def solver_state(self):
+        """
+        The products of the conformal mapping that can be reused by a
+        grid with the same boundary, as a dictionary of numpy arrays:
+        ``sigmas``, ``xrect``, ``yrect`` and the boundary they belong to
+        (``xbry``, ``ybry``, ``beta``, ``ul_idx``). None before the first
+        solve. Save it with ``numpy.savez(path, **grid.solver_state)``
+        and pass it back through the ``solver_state`` argument.
+        """
+        sigmas = _double_array(self._sigmas, self._nsigmas)
+        if sigmas is None:
+            return None
+
+        empty = numpy.empty(0)
+        return {
+            'sigmas': sigmas,
+            'xrect': empty if self.xrect is None else self.xrect,
+            'yrect': empty if self.yrect is None else self.yrect,
+            'xbry': self.xbry,
+            'ybry': self.ybry,
+            'beta': self.beta,
+            'ul_idx': numpy.array(self.ul_idx),
+        }
+
+    def _seed_solver_state(self, state):
+        """
+        Point the sigmas and rectangularized domain at copies of the
+        arrays in ``state`` so gridgen-c skips computing them.
+        """
+        nbry = self.xbry.size
+        for key, value in [('xbry', self.xbry), ('ybry', self.ybry), ('beta', self.beta)]:
+            saved = numpy.asarray(state[key], dtype='d')
+            if key == 'beta' and saved.size <= nbry:
+                saved, value = _full_beta(saved, nbry), _full_beta(value, nbry)
+            if saved.shape != value.shape or not numpy.allclose(saved, value):
+                raise ValueError(f'solver_state was computed for a different boundary ({key} differs)')
+        if int(state['ul_idx']) != self.ul_idx:
+            raise ValueError('solver_state was computed for a different boundary (ul_idx differs)')
+
+        # gridgen-c reads straight from these buffers, so keep them alive
+        self._solver_buffers = {
+            key: numpy.ascontiguousarray(state[key], dtype='d').copy()
+            for key in ['sigmas', 'xrect', 'yrect']
+        }
+        self.nsigmas = ctypes.c_int(self._solver_buffers['sigmas'].size)
+        self.sigmas = ctypes.c_void_p(self._solver_buffers['sigmas'].ctypes.data)
+        if self._solver_buffers['xrect'].size > 0:
+            self._nrect = ctypes.c_int(self._solver_buffers['xrect'].size)
+            self._xrect = ctypes.c_void_p(self._solver_buffers['xrect'].ctypes.data)
+            self._yrect = ctypes.c_void_p(self._solver_buffers['yrect'].ctypes.data)
+
     @property
     def nx(self):
         """ Number of nodes in the x-direction (columns). """
@@ -916,20 +2880,123 @@ class Gridgen(CGrid):
     def focus(self, value):
         self._focus = value
 
-    def generate_grid(self):
+    def generate_grid(self, timeout=None, progress=None):
         """
         The business end of this whole thing. Collects all of the
         inputs, passes them to the gridgen-c code, and returns arrays
         of node coordinates. Unless ``autogen`` was set to False, this
         happens when the object is instantiated.
 
+        With a ``timeout`` or a ``progress`` callback, gridgen-c runs in
+        a supervised child process instead, so that it can be stopped
+        at any time. Everything gridgen-c allocated goes away with the
+        process.
+
         Parameters
         ----------
-        None
+        timeout : float, optional
+            Seconds to wait for the grid before giving up with a
+            ``TimeoutError``.
+        progress : callable, optional
+            Called with a dictionary for every message gridgen-c prints
+            in verbose mode (see :func:`~parse_gridgen_message`) plus the
+            ``elapsed`` seconds. Returning False cancels the generation
+            with a ``RuntimeError``.
 
         """
+
         if self._gn is not None:
             self._libgridgen.gridnodes_destroy(self._gn)
+            self._gn = None
+
+        tic = time.perf_counter()
+        if timeout is None and progress is None:
+            if self.verbose:
+                with log_native_output(logger, parse_gridgen_message) as native:
+                    self._gn, x, y = self._run_gridgen(self.ny, self.nx)
+                self.timings['stages'] = native.timings
+            else:
+                self._gn, x, y = self._run_gridgen(self.ny, self.nx)
+                self.timings.pop('stages', None)
+            self.timings['generate'] = time.perf_counter() - tic
+            super().__init__(x, y)
+            return
+
+        spec = self.to_spec()
+        spec.update(proj=None, verbose=self.verbose or progress is not None, autogen=True)
+        spec['solver_state'] = self.solver_state
+
+        context = multiprocessing.get_context()
+        receiver, sender = context.Pipe(duplex=False)
+        worker = context.Process(
+            target=_generate_worker, args=(spec, sender, spec['verbose']), daemon=True
+        )
+        native = NativeLog(logger, parse_gridgen_message)
+        worker.start()
+        sender.close()
+
+        try:
+            while True:
+                wait = None if timeout is None else max(0, tic + timeout - time.perf_counter())
+                if not receiver.poll(wait):
+                    raise TimeoutError(f'the grid was not generated within {timeout} seconds')
+
+                try:
+                    result = receiver.recv()
+                except EOFError:
+                    worker.join()
+                    raise RuntimeError(f'gridgen exited with code {worker.exitcode}')
+
+                if result[0] == 'progress':
+                    info = native(result[1])
+                    info['elapsed'] = time.perf_counter() - tic
+                    if progress is not None and progress(info) is False:
+                        raise RuntimeError('grid generation was cancelled')
+                elif result[0] == 'error':
+                    raise RuntimeError(f'grid generation failed: {result[1]}')
+                else:
+                    break
+        finally:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+            receiver.close()
+
+        _, x, y, state = result
+        self._adopt_solution(x, y, state)
+        if spec['verbose']:
+            self.timings['stages'] = native.close()
+        else:
+            self.timings.pop('stages', None)
+        self.timings['generate'] = time.perf_counter() - tic
+
+    def _adopt_solution(self, x, y, state):
+        """
+        Take the nodes and solver state (if any) of a grid generated in
+        another process.
+        """
+        if state is not None:
+            self._seed_solver_state(state)
+        if numpy.any(numpy.isnan(x)) or numpy.any(numpy.isnan(y)):
+            x = numpy.ma.masked_where(numpy.isnan(x), x)
+            y = numpy.ma.masked_where(numpy.isnan(y), y)
+
+        super().__init__(x, y)
+
+    def _run_gridgen(self, ny, nx):
+        """
+        Call gridgen-c for a grid of shape ``(ny, nx)``, reusing (or
+        storing) the sigmas of the conformal map. Returns the gridnodes
+        pointer and the (possibly masked) node coordinates.
+        """
+
+        # fail fast on bad boundaries, before gridgen-c does any work
+        validate_boundary(self.xbry, self.ybry, self.beta, self.ul_idx,
+                          check_intersections=self.checksimplepoly)
+
+        if self.engine == 'numpy':
+            x, y = _numpy_gridgen(self.xbry, self.ybry, self.beta, self.ul_idx, ny, nx, self.focus)
+            return None, x, y
 
         # number of boundary points
         nbry = len(self.xbry)
@@ -940,9 +3007,10 @@ class Gridgen(CGrid):
             self.sigmas = ctypes.c_void_p(0)
 
         # rectangularized domain
-        nrect = ctypes.c_int(0)
-        xrect = ctypes.c_void_p(0)
-        yrect = ctypes.c_void_p(0)
+        if self._nrect is None:
+            self._nrect = ctypes.c_int(0)
+            self._xrect = ctypes.c_void_p(0)
+            self._yrect = ctypes.c_void_p(0)
 
         # focus the grid if necessary
         if self.focus is None:
@@ -950,21 +3018,21 @@ class Gridgen(CGrid):
             xgrid = ctypes.POINTER(ctypes.c_double)()
             ygrid = ctypes.POINTER(ctypes.c_double)()
         else:
-            y, x = numpy.mgrid[0:1:self.ny * 1j, 0:1:self.nx * 1j]
+            y, x = numpy.mgrid[0:1:ny * 1j, 0:1:nx * 1j]
             xgrid, ygrid = self.focus(x, y)
             ngrid = ctypes.c_int(xgrid.size)
-            xgrid = (ctypes.c_double * xgrid.size)(*xgrid.flatten())
-            ygrid = (ctypes.c_double * ygrid.size)(*ygrid.flatten())
+            xgrid = numpy.ctypeslib.as_ctypes(numpy.ascontiguousarray(xgrid, dtype='d').ravel())
+            ygrid = numpy.ctypeslib.as_ctypes(numpy.ascontiguousarray(ygrid, dtype='d').ravel())
 
         # call the C-code to make make the grid
-        self._gn = self._libgridgen.gridgen_generategrid2(
+        gn = self._libgridgen.gridgen_generategrid2(
             ctypes.c_int(nbry),
             (ctypes.c_double * nbry)(*self.xbry),
             (ctypes.c_double * nbry)(*self.ybry),
             (ctypes.c_double * nbry)(*self.beta),
             ctypes.c_int(self.ul_idx),
-            ctypes.c_int(self.nx),
-            ctypes.c_int(self.ny),
+            ctypes.c_int(nx),
+            ctypes.c_int(ny),
             ngrid,
             xgrid,
             ygrid,
@@ -977,27 +3045,189 @@ class Gridgen(CGrid):
             ctypes.c_int(self.verbose),
             ctypes.byref(self.nsigmas),
             ctypes.byref(self.sigmas),
-            ctypes.byref(nrect),
-            ctypes.byref(xrect),
-            ctypes.byref(yrect)
+            ctypes.byref(self._nrect),
+            ctypes.byref(self._xrect),
+            ctypes.byref(self._yrect)
         )
 
-        # x-positions
-        x = self._libgridgen.gridnodes_getx(self._gn)
-        x = numpy.asarray([x[0][i] for i in range(self.ny * self.nx)])
-        x.shape = (self.ny, self.nx)
-
-        # y-positions
-        y = self._libgridgen.gridnodes_gety(self._gn)
-        y = numpy.asarray([y[0][i] for i in range(self.ny * self.nx)])
-        y.shape = (self.ny, self.nx)
+        # x- and y-positions, copied out of the gridnodes object
+        x = self._libgridgen.gridnodes_getx(gn)
+        x = numpy.ctypeslib.as_array(x[0], shape=(ny, nx)).copy()
+        y = self._libgridgen.gridnodes_gety(gn)
+        y = numpy.ctypeslib.as_array(y[0], shape=(ny, nx)).copy()
 
         # mask out invalid values
         if numpy.any(numpy.isnan(x)) or numpy.any(numpy.isnan(y)):
             x = numpy.ma.masked_where(numpy.isnan(x), x)
             y = numpy.ma.masked_where(numpy.isnan(y), y)
 
-        super().__init__(x, y)
+        return gn, x, y
+
+    def generate_robust(self, configs=None, max_workers=None, max_orthogonality=None):
+        """
+        Race several solver configurations in parallel processes and
+        keep the first grid that converges.
+
+        Each configuration overrides some of the solver parameters
+        (``nnodes``, ``precision``, ``nppe``, ``newton``, ``thin``,
+        ``checksimplepoly``) of this grid. As soon as one of them
+        produces a grid whose orthogonality error is acceptable, the
+        other processes are terminated, the winning parameters are set
+        on this object, and its nodes and solver state are taken from
+        that run.
+
+        Parameters
+        ----------
+        configs : sequence of dicts, optional
+            The solver parameters to try, in order of preference. By
+            default, the current parameters are raced against a handful
+            of common fallbacks (simple iterations instead of
+            Gauss-Newton, more nodes, a relaxed precision, no thinning).
+        max_workers : int, optional
+            The number of configurations to run at once. Defaults to the
+            number of configurations or CPUs, whichever is smaller.
+        max_orthogonality : float, optional
+            The largest orthogonality error (in radians) tolerated in any
+            cell. By default, any grid gridgen-c returns without error is
+            accepted.
+
+        Returns
+        -------
+        self : :class:`~Gridgen`
+
+        Raises
+        ------
+        RuntimeError
+            When none of the configurations produce an acceptable grid.
+
+        """
+
+        if configs is None:
+            configs = [{}] + _ROBUST_CONFIGS
+        configs = [dict(config) for config in configs]
+        for config in configs:
+            unknown = set(config) - set(_SOLVER_PARAMETERS)
+            if unknown:
+                raise ValueError(f'unknown solver parameters: {sorted(unknown)}')
+
+        if max_workers is None:
+            max_workers = min(len(configs), os.cpu_count() or 1)
+
+        # the boundary is already projected (and simplified)
+        spec = self.to_spec()
+        spec.update(proj=None, verbose=False, autogen=True)
+
+        context = multiprocessing.get_context()
+        pending = list(enumerate(configs))
+        running = {}
+        failures = {}
+        winner = None
+
+        tic = time.perf_counter()
+        try:
+            while winner is None and (pending or running):
+                while pending and len(running) < max_workers:
+                    idx, config = pending.pop(0)
+                    receiver, sender = context.Pipe(duplex=False)
+                    worker = context.Process(
+                        target=_generate_worker, args=({**spec, **config}, sender), daemon=True
+                    )
+                    worker.start()
+                    sender.close()
+                    running[receiver] = (idx, worker)
+
+                for receiver in multiprocessing.connection.wait(list(running)):
+                    idx, worker = running.pop(receiver)
+                    try:
+                        result = receiver.recv()
+                    except EOFError:
+                        worker.join()
+                        result = ('error', f'the solver exited with code {worker.exitcode}')
+                    receiver.close()
+                    worker.join()
+
+                    if result[0] == 'error':
+                        failures[idx] = result[1]
+                        continue
+
+                    _, x, y, state = result
+                    error = _max_orthogonality(CGrid(x, y))
+                    if not numpy.isfinite(error):
+                        failures[idx] = 'no valid cells'
+                    elif max_orthogonality is not None and error > max_orthogonality:
+                        failures[idx] = f'orthogonality error of {error:g} radians'
+                    else:
+                        winner = (idx, x, y, state)
+                        break
+        finally:
+            for receiver, (idx, worker) in running.items():
+                worker.terminate()
+                worker.join()
+                receiver.close()
+
+        if winner is None:
+            details = '; '.join(f'{configs[idx]}: {failures[idx]}' for idx in sorted(failures))
+            raise RuntimeError(f'none of the solver configurations produced a grid ({details})')
+
+        idx, x, y, state = winner
+        for key, value in configs[idx].items():
+            setattr(self, key, value)
+
+        if self._gn is not None:
+            self._libgridgen.gridnodes_destroy(self._gn)
+            self._gn = None
+
+        self._adopt_solution(x, y, state)
+        self.timings['generate'] = time.perf_counter() - tic
+        return self
+
+    def pyramid(self, levels=(1, 2, 4, 8), subsample=True):
+        """
+        Generate the same domain at several resolutions.
+
+        Level ``r`` has ``r`` times as many cells in each direction as
+        the grid's own ``shape``, i.e. ``((ny - 1) * r + 1, (nx - 1) * r
+        + 1)`` nodes, so the nodes of a coarse level coincide with every
+        ``r``-th node of a finer one. All levels share the sigmas of a
+        single boundary solve.
+
+        Parameters
+        ----------
+        levels : sequence of ints, optional (default = (1, 2, 4, 8))
+            Refinement factors relative to ``shape``.
+        subsample : bool, optional (default = True)
+            When True, levels whose factor divides the finest factor are
+            taken from the finest level's nodes (as views) instead of
+            being generated.
+
+        Returns
+        -------
+        grids : list of :class:`~CGrid`
+            One grid per entry of ``levels``, in the same order.
+
+        """
+
+        levels = [int(r) for r in levels]
+        if min(levels) < 1:
+            raise ValueError('levels must be positive integers')
+
+        def shape(r):
+            return ((self.ny - 1) * r + 1, (self.nx - 1) * r + 1)
+
+        finest = max(levels)
+        nodes = {}
+        for r in sorted(set(levels), reverse=True):
+            if subsample and r != finest and finest % r == 0:
+                step = finest // r
+                x, y = nodes[finest]
+                nodes[r] = (x[::step, ::step], y[::step, ::step])
+            else:
+                gn, x, y = self._run_gridgen(*shape(r))
+                if gn is not None:
+                    self._libgridgen.gridnodes_destroy(gn)
+                nodes[r] = (x, y)
+
+        return [CGrid(*nodes[r]) for r in levels]
 
     def to_spec(self):
         """ Export the grid-defining parameters into a JSON-like structure """
@@ -1007,7 +3237,8 @@ class Gridgen(CGrid):
                        'ul_idx': self.ul_idx, 'proj': self.proj,
                        'nnodes': self.nnodes, 'precision': self.precision,
                        'nppe': self.nppe, 'newton': self.newton,
-                       'thin': self.thin, 'checksimplepoly': self.checksimplepoly}
+                       'thin': self.thin, 'checksimplepoly': self.checksimplepoly,
+                       'engine': self.engine}
 
         return output_dict
 
@@ -1018,6 +3249,408 @@ class Gridgen(CGrid):
         focus = Focus.from_spec(focus_spec) if focus_spec else None
         return cls(focus=focus, **attributes)
 
+    @classmethod
+    def estimate_resolution(cls, spec, coarsen=None):
+        """
+        Predict cell-size statistics of a grid without generating it.
+
+        By default, the boundary is snapped onto a rectilinear polygon
+        (each edge keeps its length and turns as dictated by ``beta``)
+        that stands in for gridgen's rectangularized domain. The focused
+        node distribution is laid out on that polygon and scaled to the
+        area of the real domain. This only takes a few milliseconds, but
+        is an approximation of the conformal map, so expect errors of
+        tens of percent near strongly curved or narrow parts of the
+        boundary.
+
+        Parameters
+        ----------
+        spec : dict
+            Grid definition as returned by :meth:`~to_spec`. The
+            ``focus`` entry may be either a spec or a :class:`~Focus`.
+            As in :meth:`~to_spec`, ``xbry`` and ``ybry`` are taken to
+            be projected already, unless ``'geographic'`` is True: the
+            boundary is then lon/lat and projected with ``proj``.
+        coarsen : int, optional
+            When provided, gridgen is run on a grid that is ``coarsen``
+            times coarser in each direction and its cell sizes are
+            scaled back to the requested ``shape``. This is slower but
+            much more accurate than the default estimate.
+
+        Returns
+        -------
+        estimate : dict
+            ``shape``, total ``nodes``, the (estimated) number of
+            ``wet_nodes`` and ``wet_cells`` inside the boundary, and the
+            ``min``, ``median`` and ``max`` of ``dx`` and ``dy`` over
+            those cells.
+
+        """
+
+        spec = dict(spec)
+        geographic = spec.pop('geographic', False)
+        proj = spec.pop('proj', None)
+        if geographic and proj is None:
+            raise ValueError('a geographic boundary needs a `proj`')
+        elif not geographic:
+            proj = None
+
+        ny, nx = spec['shape']
+        focus = spec.get('focus')
+        if focus is not None and not isinstance(focus, Focus):
+            focus = Focus.from_spec(focus)
+
+        if coarsen:
+            cshape = tuple(max(3, int(numpy.ceil((n - 1) / coarsen)) + 1) for n in (ny, nx))
+            spec.pop('focus', None)
+            spec.update(shape=cshape, proj=proj, verbose=False, autogen=True)
+            grid = cls(focus=focus, **spec)
+            dx = grid.dx * (cshape[1] - 1) / (nx - 1)
+            dy = grid.dy * (cshape[0] - 1) / (ny - 1)
+            wet_cells = numpy.bool_(grid.mask_rho) & ~numpy.ma.getmaskarray(dx)
+            wet_fraction = numpy.count_nonzero(~numpy.ma.getmaskarray(grid.x)) / grid.x.size
+            wet_nodes = int(round(wet_fraction * ny * nx))
+            wet_cell_count = int(round(wet_cells.mean() * (ny - 1) * (nx - 1)))
+        else:
+            xbry = numpy.asarray(spec['xbry'], dtype='d')
+            ybry = numpy.asarray(spec['ybry'], dtype='d')
+            if proj is not None:
+                xbry, ybry = proj(xbry, ybry)
+
+            i, j = _rectangularize(xbry, ybry, spec['beta'], spec.get('ul_idx', 0))
+            scale = numpy.sqrt(abs(_polygon_area(xbry, ybry) / _polygon_area(i, j)))
+
+            y, x = numpy.mgrid[0:1:ny * 1j, 0:1:nx * 1j]
+            if focus is not None:
+                x, y = focus(x, y)
+
+            grid = CGrid(scale * (i.min() + x * numpy.ptp(i)),
+                         scale * (j.min() + y * numpy.ptp(j)))
+            inside = Path(numpy.column_stack([scale * i, scale * j])).contains_points(
+                numpy.column_stack([grid.x_rho.ravel(), grid.y_rho.ravel()])
+            )
+            wet_cells = inside.reshape(grid.x_rho.shape)
+            wet_vert = numpy.zeros(grid.x.shape, dtype=bool)
+            for rows, cols in [(slice(1, None), slice(1, None)), (slice(1, None), slice(None, -1)),
+                               (slice(None, -1), slice(1, None)), (slice(None, -1), slice(None, -1))]:
+                wet_vert[rows, cols] |= wet_cells
+
+            dx, dy = grid.dx, grid.dy
+            wet_nodes = int(wet_vert.sum())
+            wet_cell_count = int(wet_cells.sum())
+
+        if not wet_cells.any():
+            raise ValueError('no cells fall inside the boundary at this shape')
+
+        return {
+            'shape': (ny, nx),
+            'nodes': ny * nx,
+            'wet_nodes': wet_nodes,
+            'wet_cells': wet_cell_count,
+            'dx': _summarize(numpy.ma.masked_where(~wet_cells, dx)),
+            'dy': _summarize(numpy.ma.masked_where(~wet_cells, dy)),
+        }
+
+    @classmethod
+    def for_resolution(cls, xbry, ybry, beta, target_dx, target_dy=None,
+                       max_nodes=None, stat='median', coarsen=4, **kwargs):
+        """
+        Create a grid whose shape is chosen to meet a target resolution.
+
+        The shape is first guessed with :meth:`~estimate_resolution`.
+        A grid ``coarsen`` times coarser than that guess is then
+        generated, and since cell sizes scale with the inverse of the
+        number of cells, its measured ``dx`` and ``dy`` are extrapolated
+        to the final shape. The sigmas of the conformal map are kept
+        between the two generations, so only the coarse grid pays for
+        solving the boundary.
+
+        Parameters
+        ----------
+        xbry, ybry, beta : array-like
+            The boundary, as in :class:`~Gridgen`.
+        target_dx, target_dy : float
+            The desired cell sizes. ``target_dy`` defaults to
+            ``target_dx``.
+        max_nodes : int, optional
+            Upper limit on the total number of nodes. When the target
+            would exceed it, both dimensions are reduced proportionally
+            and a warning is issued.
+        stat : str, optional (default = 'median')
+            Statistic of the cell sizes that must meet the target:
+            'min', 'median', or 'max'.
+        coarsen : int, optional (default = 4)
+            How much coarser the trial grid is than the estimated shape.
+        **kwargs
+            Other keyword arguments passed to :class:`~Gridgen`.
+
+        Returns
+        -------
+        grid : Gridgen
+
+        """
+
+        if stat not in ('min', 'median', 'max'):
+            raise ValueError("`stat` must be 'min', 'median', or 'max'")
+
+        if target_dy is None:
+            target_dy = target_dx
+
+        kwargs.pop('shape', None)
+        kwargs.pop('autogen', None)
+        focus = kwargs.get('focus')
+        probe = (21, 21)
+        est = cls.estimate_resolution({
+            'xbry': xbry, 'ybry': ybry, 'beta': beta, 'shape': probe,
+            'ul_idx': kwargs.get('ul_idx', 0), 'proj': kwargs.get('proj'),
+            'geographic': kwargs.get('proj') is not None, 'focus': focus,
+        })
+
+        def n_needed(n, size, target):
+            return max(3, int(numpy.ceil((n - 1) * size / target)) + 1)
+
+        guess = (n_needed(probe[0], est['dy'][stat], target_dy),
+                 n_needed(probe[1], est['dx'][stat], target_dx))
+        cshape = tuple(min(n, max(11, int(numpy.ceil((n - 1) / coarsen)) + 1)) for n in guess)
+
+        grid = cls(xbry, ybry, beta, cshape, autogen=True, **kwargs)
+        ny = n_needed(cshape[0], _summarize(grid.dy)[stat], target_dy)
+        nx = n_needed(cshape[1], _summarize(grid.dx)[stat], target_dx)
+
+        if max_nodes is not None and ny * nx > max_nodes:
+            factor = numpy.sqrt(max_nodes / (ny * nx))
+            ny = max(3, int(ny * factor))
+            nx = max(3, int(nx * factor))
+            warnings.warn(
+                f"target resolution needs more than {max_nodes} nodes, using shape {(ny, nx)}"
+            )
+
+        if (ny, nx) != grid.shape:
+            grid.ny = ny
+            grid.nx = nx
+            grid.generate_grid()
+        return grid
+
+
+_SOLVER_PARAMETERS = ('nnodes', 'precision', 'nppe', 'newton', 'thin', 'checksimplepoly')
+
+_ROBUST_CONFIGS = [
+    {'newton': False},
+    {'nnodes': 20},
+    {'precision': 1.0e-8},
+    {'thin': False},
+]
+
+
+# the (unindented) headers gridgen-c prints in verbose mode as it starts
+# each stage; the details of a stage are indented below its header
+_GRIDGEN_STAGES = {
+    'triangulating:': 'triangulation',
+    'calculating sigmas:': 'sigmas',
+    'calculating image vertices:': 'rectangle',
+    'generating grid:': 'grid',
+}
+
+# a step of the sigma solver, e.g. "  iteration 3: error = 1.535e-04"
+_GRIDGEN_ITERATION = re.compile(r'iteration (\d+): error = ([-+]?\d*\.?\d+(?:e[-+]?\d+)?)')
+
+
+def _generate_worker(spec, conn, capture=False):
+    """ Generate a grid from ``spec`` in a child process and send its
+    nodes and solver state (or the error) through ``conn``. With
+    ``capture``, gridgen-c's messages are sent along as they come. """
+    try:
+        if capture:
+            with capture_fd(lambda line: conn.send(('progress', line))):
+                grid = Gridgen.from_spec(spec)
+        else:
+            grid = Gridgen.from_spec(spec)
+        x = numpy.ma.filled(grid.x, numpy.nan)
+        y = numpy.ma.filled(grid.y, numpy.nan)
+        # the numpy engine has no solver state
+        state = grid.solver_state
+        if state is not None:
+            state = {key: numpy.array(value) for key, value in state.items()}
+        conn.send(('ok', x, y, state))
+    except Exception as e:
+        conn.send(('error', repr(e)))
+    finally:
+        conn.close()
+
+
+def parse_gridgen_message(line):
+    """
+    Make sense of a line gridgen-c printed in verbose mode.
+
+    Parameters
+    ----------
+    line : str
+
+    Returns
+    -------
+    info : dict
+        ``message`` (the stripped line), ``stage`` (one of
+        'triangulation', 'sigmas', 'rectangle' or 'grid' when the line
+        is the header gridgen-c prints as it starts that stage, and
+        None for any other line), and ``iteration`` and ``error`` when
+        the line reports a step of the sigma solver.
+
+    Examples
+    --------
+    >>> info = parse_gridgen_message('  iteration 3: error = 1.5e-04')
+    >>> info['stage'], info['iteration'], info['error']
+    ('sigmas', 3, 0.00015)
+
+    """
+
+    message = line.strip()
+    info = {'message': message, 'stage': _GRIDGEN_STAGES.get(message)}
+
+    iteration = _GRIDGEN_ITERATION.fullmatch(message)
+    if iteration is not None:
+        info['stage'] = 'sigmas'
+        info['iteration'] = int(iteration.group(1))
+        info['error'] = float(iteration.group(2))
+
+    return info
+
+
+def _max_orthogonality(grid):
+    """ Largest absolute orthogonality error of any valid cell (NaN if
+    there are none). """
+    angles = numpy.abs(numpy.ma.filled(grid.orthogonality, numpy.nan))
+    if numpy.all(numpy.isnan(angles)):
+        return numpy.nan
+    return float(numpy.nanmax(angles))
+
+
+# (sweeps, relaxation) of the Winslow smoother on the coarsest level of
+# the numpy engine, and on each of the finer ones
+_NUMPY_ENGINE_SMOOTHING = ((1000, 1.5), (10, 1.0))
+_NUMPY_ENGINE_COARSEST = 33
+
+
+def _boundary_sides(xbry, ybry, beta, ul_idx=0):
+    """
+    Split a boundary with four corners into the four sides of the grid,
+    each as a polyline ``(x, y, s)`` with normalized arc lengths ``s``
+    running in the direction of increasing row or column index.
+    """
+    x = numpy.asarray(xbry, dtype='d')
+    y = numpy.asarray(ybry, dtype='d')
+    b = _full_beta(beta, x.size)
+
+    corners = numpy.flatnonzero(b != 0)
+    if corners.size != 4 or not numpy.allclose(b[corners], 1.0):
+        raise ValueError('the numpy engine only supports boundaries with four corners '
+                         '(four beta values of 1 and no negative ones)')
+
+    # going counter-clockwise from the upper left corner (the first one
+    # at or after ul_idx), as in gridgen
+    corners = numpy.roll(corners, -numpy.searchsorted(corners, ul_idx))
+
+    def polyline(start, stop):
+        stop = stop + x.size if stop <= start else stop
+        index = numpy.arange(start, stop + 1) % x.size
+        s = numpy.concatenate([[0.0], numpy.cumsum(numpy.hypot(numpy.diff(x[index]),
+                                                               numpy.diff(y[index])))])
+        if s[-1] == 0:
+            raise ValueError('the boundary has a side of zero length')
+        return x[index], y[index], s / s[-1]
+
+    def reverse(side):
+        x, y, s = side
+        return x[::-1], y[::-1], 1.0 - s[::-1]
+
+    c0, c1, c2, c3 = corners
+    return {
+        'left': reverse(polyline(c0, c1)),
+        'bottom': polyline(c1, c2),
+        'right': polyline(c2, c3),
+        'top': reverse(polyline(c3, c0)),
+    }
+
+
+def _side_point(side, t):
+    x, y, s = side
+    return numpy.interp(t, s, x), numpy.interp(t, s, y)
+
+
+def _tfi(sides, u, v):
+    """
+    Transfinite interpolation of the boundary ``sides`` at the
+    normalized column (``u``) and row (``v``) positions.
+    """
+    bottom, top = _side_point(sides['bottom'], u), _side_point(sides['top'], u)
+    left, right = _side_point(sides['left'], v), _side_point(sides['right'], v)
+    out = []
+    for k in range(2):
+        p00, p10 = sides['bottom'][k][[0, -1]]
+        p01, p11 = sides['top'][k][[0, -1]]
+        out.append(
+            (1 - v) * bottom[k] + v * top[k] + (1 - u) * left[k] + u * right[k]
+            - ((1 - u) * (1 - v) * p00 + u * (1 - v) * p10 + (1 - u) * v * p01 + u * v * p11)
+        )
+    return out
+
+
+def _bilinear(a, u, v):
+    """ Bilinear interpolation of the array ``a`` at the normalized
+    column (``u``) and row (``v``) positions. """
+    fi = numpy.asarray(u) * (a.shape[1] - 1)
+    fj = numpy.asarray(v) * (a.shape[0] - 1)
+    i = numpy.clip(numpy.floor(fi).astype(int), 0, a.shape[1] - 2)
+    j = numpy.clip(numpy.floor(fj).astype(int), 0, a.shape[0] - 2)
+    wi, wj = fi - i, fj - j
+    return ((a[j, i] * (1 - wi) + a[j, i + 1] * wi) * (1 - wj)
+            + (a[j + 1, i] * (1 - wi) + a[j + 1, i + 1] * wi) * wj)
+
+
+def _elliptic_map(sides, ny, nx):
+    """
+    Nodes of a ``(ny, nx)`` Winslow grid of the ``sides``, started from
+    transfinite interpolation corrected by the grid of the next coarser
+    level.
+    """
+    u = numpy.linspace(0, 1, nx)[None, :]
+    v = numpy.linspace(0, 1, ny)[:, None]
+    x, y = _tfi(sides, u, v)
+
+    coarse = max(ny, nx) > _NUMPY_ENGINE_COARSEST and min(ny, nx) > 2
+    if coarse:
+        cy, cx = (ny + 1) // 2, (nx + 1) // 2
+        xc, yc = _elliptic_map(sides, cy, cx)
+        tx, ty = _tfi(sides, numpy.linspace(0, 1, cx)[None, :], numpy.linspace(0, 1, cy)[:, None])
+        x = x + _bilinear(xc - tx, u, v)
+        y = y + _bilinear(yc - ty, u, v)
+
+    sweeps, relaxation = _NUMPY_ENGINE_SMOOTHING[coarse]
+    grid = CGrid(x, y).smooth('winslow', iterations=sweeps, tol=1e-10, relaxation=relaxation)
+    return numpy.asarray(grid.x_vert), numpy.asarray(grid.y_vert)
+
+
+def _numpy_gridgen(xbry, ybry, beta, ul_idx, ny, nx, focus=None):
+    """
+    Grid a four-corner boundary without gridgen-c: arc-length
+    transfinite interpolation, elliptic (Winslow) smoothing and, like
+    gridgen, the focus applied to the positions the map is sampled at.
+    """
+    sides = _boundary_sides(xbry, ybry, beta, ul_idx)
+    x, y = _elliptic_map(sides, ny, nx)
+    if focus is None:
+        return x, y
+
+    v, u = numpy.mgrid[0:1:ny * 1j, 0:1:nx * 1j]
+    u, v = focus(u, v)
+    x, y = _bilinear(x, u, v), _bilinear(y, u, v)
+
+    # boundary nodes go on the boundary itself, not its chords
+    x[0], y[0] = _side_point(sides['bottom'], u[0])
+    x[-1], y[-1] = _side_point(sides['top'], u[-1])
+    x[:, 0], y[:, 0] = _side_point(sides['left'], v[:, 0])
+    x[:, -1], y[:, -1] = _side_point(sides['right'], v[:, -1])
+    return x, y
+
 
 def rho_to_vert(xr, yr, pm, pn, ang):  # pragma: no cover
     """ Possibly converts centroids to nodes """
@@ -0,0 +1,184 @@
+"""Streaming export of grids to ROMS grid files."""
+
+import os
+
+import numpy
+from numpy.lib.format import open_memmap
+
+try:
+    import netCDF4
+except ImportError:
+    netCDF4 = None
+
+from .grid import CGrid_geo
+from .utils import requires
+
+
+# (name, point, long name)
+_VARIABLES = [
+    ('x_rho', 'rho', 'x-locations of RHO-points'),
+    ('y_rho', 'rho', 'y-locations of RHO-points'),
+    ('x_u', 'u', 'x-locations of U-points'),
+    ('y_u', 'u', 'y-locations of U-points'),
+    ('x_v', 'v', 'x-locations of V-points'),
+    ('y_v', 'v', 'y-locations of V-points'),
+    ('x_psi', 'psi', 'x-locations of PSI-points'),
+    ('y_psi', 'psi', 'y-locations of PSI-points'),
+    ('pm', 'rho', 'curvilinear coordinate metric in XI'),
+    ('pn', 'rho', 'curvilinear coordinate metric in ETA'),
+    ('dndx', 'rho', 'xi derivative of inverse metric factor pn'),
+    ('dmde', 'rho', 'eta derivative of inverse metric factor pm'),
+    ('angle', 'rho', 'angle between XI-axis and EAST'),
+    ('f', 'rho', 'Coriolis parameter at RHO-points'),
+    ('mask_rho', 'rho', 'mask on RHO-points'),
+    ('mask_u', 'u', 'mask on U-points'),
+    ('mask_v', 'v', 'mask on V-points'),
+    ('mask_psi', 'psi', 'mask on PSI-points'),
+]
+
+_GEO_VARIABLES = [
+    (f'{coord}_{point}', point, f'{name} of {point.upper()}-points')
+    for point in ['rho', 'u', 'v', 'psi']
+    for coord, name in [('lon', 'longitude'), ('lat', 'latitude')]
+]
+
+
+def _subgrid(grid, v0, v1):
+    """
+    The rows ``v0:v1`` of the vertices of ``grid`` as a grid of their
+    own, masked like the matching rows of the parent's ``mask_rho``.
+    """
+    return grid.subset(v0, v1 - 1)
+
+
+def _value(sub, name, f):
+    if name == 'angle':
+        return sub.angle_rho
+    if name == 'f' and not isinstance(sub, CGrid_geo):
+        return numpy.full(sub.x_rho.shape, f, dtype='d')
+    return getattr(sub, name)
+
+
+@requires(netCDF4, 'netCDF4')
+def _create_netcdf(path, variables, shapes, tile_rows, spherical):
+    dataset = netCDF4.Dataset(path, 'w')
+    dataset.type = 'ROMS grid file'
+    dataset.history = 'created by pygridgen'
+
+    for point, (neta, nxi) in shapes.items():
+        dataset.createDimension(f'eta_{point}', neta)
+        dataset.createDimension(f'xi_{point}', nxi)
+
+    spherical_var = dataset.createVariable('spherical', 'S1')
+    spherical_var.long_name = 'grid type logical switch'
+    spherical_var[...] = 'T' if spherical else 'F'
+
+    out = {}
+    for name, point, long_name in variables:
+        neta, nxi = shapes[point]
+        var = dataset.createVariable(
+            name, 'f8', (f'eta_{point}', f'xi_{point}'), zlib=True,
+            chunksizes=(max(1, min(tile_rows, neta)), max(1, nxi)),
+            fill_value=None if name.startswith('mask') else 1.0e37
+        )
+        var.long_name = long_name
+        out[name] = var
+
+    return out, dataset.close
+
+
+def _create_npy(path, variables, shapes):
+    os.makedirs(path, exist_ok=True)
+    out = {
+        name: open_memmap(os.path.join(path, name + '.npy'), mode='w+', dtype='d',
+                          shape=shapes[point])
+        for name, point, _ in variables
+    }
+
+    def close():
+        for array in out.values():
+            array.flush()
+
+    return out, close
+
+
+def write_grid(grid, path, tile_rows=256, backend=None, f=0.0):
+    """
+    Write a grid to disk in the layout of a ROMS grid file, one tile of
+    rows at a time.
+
+    Every variable is computed from the properties of a small subgrid
+    (a tile of ``tile_rows`` rows of cells plus a row of halo on either
+    side) and written into the output before the next tile is touched,
+    so at most one tile is held in memory.
+
+    Parameters
+    ----------
+    grid : :class:`~pygridgen.grid.CGrid` or :class:`~pygridgen.grid.CGrid_geo`
+        The grid to export. Geographic grids also get the longitude and
+        latitude of each point.
+    path : str or path-like
+        The NetCDF file (or directory of ``.npy`` files) to write.
+    tile_rows : int, optional (default = 256)
+        Rows of cells per tile. Also the chunk size of the NetCDF
+        variables.
+    backend : {'netcdf', 'npy'}, optional
+        NetCDF (requires ``netCDF4``) or a directory with one ``.npy``
+        file per variable. Defaults to NetCDF when ``netCDF4`` is
+        installed.
+    f : float, optional (default = 0)
+        Coriolis parameter of Cartesian grids. Geographic grids use
+        their own ``f``.
+
+    Returns
+    -------
+    path : str
+
+    """
+
+    if backend is None:
+        backend = 'npy' if netCDF4 is None else 'netcdf'
+
+    geographic = isinstance(grid, CGrid_geo)
+    variables = _VARIABLES + (_GEO_VARIABLES if geographic else [])
+
+    nrho, ncol = (n - 1 for n in grid.x_vert.shape)
+    shapes = {
+        'rho': (nrho, ncol),
+        'u': (nrho, ncol - 1),
+        'v': (nrho - 1, ncol),
+        'psi': (nrho - 1, ncol - 1),
+    }
+
+    path = os.fspath(path)
+    if backend == 'netcdf':
+        out, close = _create_netcdf(path, variables, shapes, tile_rows, geographic)
+    elif backend == 'npy':
+        out, close = _create_npy(path, variables, shapes)
+    else:
+        raise ValueError(f"backend must be 'netcdf' or 'npy', not {backend!r}")
+
+    try:
+        for r0 in range(0, nrho, tile_rows):
+            r1 = min(r0 + tile_rows, nrho)
+
+            # one row of halo on either side, for the centered differences
+            v0 = max(r0 - 1, 0)
+            v1 = min(r1 + 1, nrho) + 1
+            sub = _subgrid(grid, v0, v1)
+            offset = r0 - v0
+
+            for name, point, _ in variables:
+                # v- and psi-points sit between rows of cells
+                stop = r1 if point in ('rho', 'u') else min(r1, nrho - 1)
+                if stop <= r0:
+                    continue
+
+                value = _value(sub, name, f)[offset:offset + stop - r0]
+                if backend == 'npy':
+                    value = numpy.ma.filled(value, numpy.nan)
+                out[name][r0:stop] = value
+    finally:
+        close()
+
+    return path
@@ -68,6 +68,11 @@ typedef struct {
     int npoints;
     point** points;
     double** std;
+
+    int nfit;                   /* number of points in the fit */
+    point** fit;                /* points in the fit, kept for csa_refit() */
+    double** op;                /* least squares operator -- spline
+                                 * coefficients = op^T * z [nfit][10] */
 } triangle;
 
 struct square {
@@ -136,6 +141,9 @@ struct csa {
                                  * value, the higher degree of the locally
                                  * fitted spline (recommended 80 < k < 200) */
     int nppc;                   /* average number of points per cell */
+    int refit;                  /* flag -- whether to keep the least squares
+                                 * operators of primary triangles for
+                                 * csa_refit() */
 };
 
 static void quit(char* format, ...)
@@ -219,6 +227,10 @@ static triangle* triangle_create(square* s)
     t->nallocated = 0;
     t->npoints = 0;
 
+    t->nfit = 0;
+    t->fit = NULL;
+    t->op = NULL;
+
     return t;
 }
 
@@ -250,6 +262,10 @@ static void triangle_destroy(triangle* t)
         free(t->points);
     if (t->std != NULL)
         free(t->std);
+    if (t->fit != NULL)
+        free(t->fit);
+    if (t->op != NULL)
+        free2d(t->op);
     free(t);
 }
 
@@ -384,6 +400,7 @@ csa* csa_create()
     a->npmax = NPMAX_DEF;
     a->k = K_DEF;
     a->nppc = NPPC_DEF;
+    a->refit = 0;
 
     svd_verbose = (csa_verbose > 1) ? 1 : 0;
 
@@ -839,6 +856,85 @@ static int n2q(int n)
  *   ---------------------
  */
 
+/* Least squares fitting of the triangle's data by A * b. With a->refit set,
+ * also keeps the operator giving b from z in t->op.
+ */
+static void triangle_lsq(csa* a, triangle* t, double** A, int ni, double* z, double* std, double* w, double* b)
+{
+    int npoints = t->npoints;
+    int i, j;
+
+    if (!a->refit) {
+        svd_lsq(A, ni, npoints, z, std, w, b);
+        return;
+    }
+
+    if (t->op != NULL)
+        free2d(t->op);
+    t->op = alloc2d(10, npoints, sizeof(double));
+    svd_lsqop(A, ni, npoints, std, w, t->op);
+
+    for (i = 0; i < ni; ++i) {
+        b[i] = 0.0;
+        for (j = 0; j < npoints; ++j)
+            b[i] += t->op[j][i] * z[j];
+    }
+}
+
+/* Raises the degree of the Bezier coefficients b1 of a spline of order q
+ * (0 to 2) to 3.
+ */
+static void raisedegree(int q, double b1[], double b[])
+{
+    if (q == 2) {
+        b[0] = b1[0];
+        b[1] = (b1[0] + 2.0 * b1[1]) / 3.0;
+        b[2] = (b1[0] + 2.0 * b1[2]) / 3.0;
+        b[3] = (b1[3] + 2.0 * b1[1]) / 3.0;
+        b[4] = (b1[1] + b1[2] + b1[4]) / 3.0;
+        b[5] = (b1[5] + 2.0 * b1[2]) / 3.0;
+        b[6] = b1[3];
+        b[7] = (b1[3] + 2.0 * b1[4]) / 3.0;
+        b[8] = (b1[5] + 2.0 * b1[4]) / 3.0;
+        b[9] = b1[5];
+    } else if (q == 1) {
+        b[0] = b1[0];
+        b[1] = (2.0 * b1[0] + b1[1]) / 3.0;
+        b[2] = (2.0 * b1[0] + b1[2]) / 3.0;
+        b[3] = (2.0 * b1[1] + b1[0]) / 3.0;
+        b[4] = (b1[0] + b1[1] + b1[2]) / 3.0;
+        b[5] = (2.0 * b1[2] + b1[0]) / 3.0;
+        b[6] = b1[1];
+        b[7] = (2.0 * b1[1] + b1[2]) / 3.0;
+        b[8] = (2.0 * b1[2] + b1[1]) / 3.0;
+        b[9] = b1[2];
+    } else {
+        int i;
+
+        for (i = 0; i < 10; ++i)
+            b[i] = b1[0];
+    }
+}
+
+/* Sets the coefficients of the primary triangle of a square from the Bezier
+ * coefficients b of the fitted spline.
+ */
+static void square_setprimarycoeffs(square* s, double b[])
+{
+    double* coeffs = s->coeffs;
+
+    coeffs[12] = b[0];
+    coeffs[9] = b[1];
+    coeffs[6] = b[3];
+    coeffs[3] = b[6];
+    coeffs[2] = b[7];
+    coeffs[1] = b[8];
+    coeffs[0] = b[9];
+    coeffs[4] = b[5];
+    coeffs[8] = b[2];
+    coeffs[5] = b[4];
+}
+
 static void csa_findprimarycoeffstriangle(csa* a, triangle* t)
 {
     square* s = t->parent;
@@ -907,7 +1003,7 @@ static void csa_findprimarycoeffstriangle(csa* a, triangle* t)
                 aii[4] = bc[0] * bc[1] * bc[2] * 6.0;
             }
 
-            svd_lsq(A, 10, npoints, z, std, w, b);
+            triangle_lsq(a, t, A, 10, z, std, w, b);
 
             wmin = w[0];
             wmax = w[0];
@@ -944,7 +1040,7 @@ static void csa_findprimarycoeffstriangle(csa* a, triangle* t)
                 aii[5] = bc[2] * bc[2];
             }
 
-            svd_lsq(A, 6, npoints, z, std, w, b1);
+            triangle_lsq(a, t, A, 6, z, std, w, b1);
 
             wmin = w[0];
             wmax = w[0];
@@ -958,16 +1054,7 @@ static void csa_findprimarycoeffstriangle(csa* a, triangle* t)
                 ok = 0;
             else {              /* degree raising */
                 ok = 1;
-                b[0] = b1[0];
-                b[1] = (b1[0] + 2.0 * b1[1]) / 3.0;
-                b[2] = (b1[0] + 2.0 * b1[2]) / 3.0;
-                b[3] = (b1[3] + 2.0 * b1[1]) / 3.0;
-                b[4] = (b1[1] + b1[2] + b1[4]) / 3.0;
-                b[5] = (b1[5] + 2.0 * b1[2]) / 3.0;
-                b[6] = b1[3];
-                b[7] = (b1[3] + 2.0 * b1[4]) / 3.0;
-                b[8] = (b1[5] + 2.0 * b1[4]) / 3.0;
-                b[9] = b1[5];
+                raisedegree(2, b1, b);
             }
 
             free2d(A);
@@ -986,7 +1073,7 @@ static void csa_findprimarycoeffstriangle(csa* a, triangle* t)
                 aii[2] = bc[2];
             }
 
-            svd_lsq(A, 3, npoints, z, std, w, b1);
+            triangle_lsq(a, t, A, 3, z, std, w, b1);
 
             wmin = w[0];
             wmax = w[0];
@@ -1000,16 +1087,7 @@ static void csa_findprimarycoeffstriangle(csa* a, triangle* t)
                 ok = 0;
             else {              /* degree raising */
                 ok = 1;
-                b[0] = b1[0];
-                b[1] = (2.0 * b1[0] + b1[1]) / 3.0;
-                b[2] = (2.0 * b1[0] + b1[2]) / 3.0;
-                b[3] = (2.0 * b1[1] + b1[0]) / 3.0;
-                b[4] = (b1[0] + b1[1] + b1[2]) / 3.0;
-                b[5] = (2.0 * b1[2] + b1[0]) / 3.0;
-                b[6] = b1[1];
-                b[7] = (2.0 * b1[1] + b1[2]) / 3.0;
-                b[8] = (2.0 * b1[2] + b1[1]) / 3.0;
-                b[9] = b1[2];
+                raisedegree(1, b1, b);
             }
 
             free2d(A);
@@ -1020,19 +1098,10 @@ static void csa_findprimarycoeffstriangle(csa* a, triangle* t)
             for (ii = 0; ii < npoints; ++ii)
                 A[ii][0] = 1.0;
 
-            svd_lsq(A, 1, npoints, z, std, w, b1);
+            triangle_lsq(a, t, A, 1, z, std, w, b1);
 
             ok = 1;
-            b[0] = b1[0];
-            b[1] = b1[0];
-            b[2] = b1[0];
-            b[3] = b1[0];
-            b[4] = b1[0];
-            b[5] = b1[0];
-            b[6] = b1[0];
-            b[7] = b1[0];
-            b[8] = b1[0];
-            b[9] = b1[0];
+            raisedegree(0, b1, b);
 
             free2d(A);
         }
@@ -1041,26 +1110,30 @@ static void csa_findprimarycoeffstriangle(csa* a, triangle* t)
     a->norder[q]++;
     s->order = q;
 
-    {
-        square* s = t->parent;
-        double* coeffs = s->coeffs;
-
-        coeffs[12] = b[0];
-        coeffs[9] = b[1];
-        coeffs[6] = b[3];
-        coeffs[3] = b[6];
-        coeffs[2] = b[7];
-        coeffs[1] = b[8];
-        coeffs[0] = b[9];
-        coeffs[4] = b[5];
-        coeffs[8] = b[2];
-        coeffs[5] = b[4];
-    }
+    square_setprimarycoeffs(s, b);
 
     free(z);
     if (std != NULL)
         free(std);
 
+    if (a->refit) {
+        /*
+         * keep the operator (of the raised degree) and the points it
+         * applies to
+         */
+        if (q < 3) {
+            for (ii = 0; ii < npoints; ++ii) {
+                raisedegree(q, t->op[ii], b);
+                memcpy(t->op[ii], b, 10 * sizeof(double));
+            }
+        }
+        t->nfit = npoints;
+        t->fit = t->points;
+        t->points = NULL;
+        t->npoints = 0;
+        t->nallocated = 0;
+    }
+
     if (t->points != NULL) {
         free(t->points);
         t->points = NULL;
@@ -1313,6 +1386,50 @@ void csa_calculatespline(csa* a)
     csa_sethascoeffsflag(a);
 }
 
+/* Recalculates the spline after the z values of the input points changed.
+ * Reuses the squares, the data attached to the primary triangles, and their
+ * least squares operators, so it requires csa_setrefit(a, 1) before
+ * csa_calculatespline().
+ */
+void csa_refit(csa* a)
+{
+    int i, j, ii;
+
+    if (!a->refit || a->squares == NULL)
+        quit("csa_refit(): no spline calculated with csa_setrefit(a, 1)\n");
+
+    for (j = 0; j < a->nj; ++j) {
+        for (i = 0; i < a->ni; ++i) {
+            square* s = a->squares[j][i];
+
+            for (ii = 0; ii < 4; ++ii)
+                s->hascoeffs[ii] = 0;
+            for (ii = 0; ii < 25; ++ii)
+                s->coeffs[ii] = NaN;
+        }
+    }
+
+    for (ii = 0; ii < a->npt; ++ii) {
+        triangle* t = a->pt[ii];
+        double b[10];
+        int k;
+
+        for (k = 0; k < 10; ++k)
+            b[k] = 0.0;
+        for (i = 0; i < t->nfit; ++i) {
+            double z = t->fit[i]->z;
+            double* op = t->op[i];
+
+            for (k = 0; k < 10; ++k)
+                b[k] += op[k] * z;
+        }
+        square_setprimarycoeffs(t->parent, b);
+    }
+
+    csa_findsecondarycoeffs(a);
+    csa_sethascoeffsflag(a);
+}
+
 void csa_approximatepoint(csa* a, point* p)
 {
     double h = a->h;
@@ -1415,6 +1532,11 @@ void csa_setnppc(csa* a, int nppc)
     a->nppc = nppc;
 }
 
+void csa_setrefit(csa* a, int refit)
+{
+    a->refit = refit;
+}
+
 /** Approximates data in given locations. Specially for Rob. Allocates the
  ** output array - needs to be cleaned up by the calling code.
  * @param nin - number of input data points
@@ -39,11 +39,13 @@ void csa_addstd(csa* a, int n, double variance[]);
 void csa_calculatespline(csa* a);
 void csa_approximatepoint(csa* a, point* p);
 void csa_approximatepoints(csa* a, int n, point* points);
+void csa_refit(csa* a);
 
 void csa_setnpmin(csa* a, int npmin);
 void csa_setnpmax(csa* a, int npmax);
 void csa_setk(csa* a, int k);
 void csa_setnppc(csa* a, int nppc);
+void csa_setrefit(csa* a, int refit);
 
 double* csa_approximatepoints2(int nin, double xin[], double yin[], double zin[], double sigma[], int nout, double xout[], double yout[], int npmin, int npmax, int k, int nppc);
 
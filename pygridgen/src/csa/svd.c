@@ -634,6 +634,65 @@ void svd_lsq(double** A, int ni, int nj, double* z, double* std, double* w, doub
     free2d(V);
 }
 
+/** Least squares fitting operator via singular value decomposition.
+ *
+ * Same as svd_lsq(), but returns the matrix that maps the right-hand side
+ * of the system (1) to its solution, so that the system can be solved for
+ * any z without repeating the decomposition:
+ *
+ * sol[i] = sum_j op[j][i] * z[j]
+ *
+ * @param A Matrix A of the system (1) [0..nj-1][0..ni-1]
+ * @param ni Number of columns
+ * @param nj Number of rows
+ * @param std Vector of standard deviations for each row [0..nj-1] or NULL
+ * @param w Singular values of the modified matrix A' = S^(-1/2) * A [0..nj-1]
+ * @param op Output operator [0..nj-1][0..ni-1]
+ *
+ * Note: `A' gets overwritten during call to svd_lsqop().
+ */
+void svd_lsqop(double** A, int ni, int nj, double* std, double* w, double** op)
+{
+    double** V = alloc2d(ni, ni, sizeof(double));
+    int nijmin = (ni < nj) ? ni : nj;
+    int i, j, ii;
+
+    if (std != NULL)
+        for (j = 0; j < nj; ++j)
+            for (i = 0; i < ni; ++i)
+                A[j][i] /= std[j];
+
+    svd(A, ni, nj, w, V);
+
+    /*
+     * V * W^-1
+     */
+    for (j = 0; j < ni; ++j)
+        for (i = 0; i < nijmin; ++i)
+            if (w[i] != 0.0)
+                V[j][i] /= w[i];
+            else
+                V[j][i] = 0.0;
+
+    /*
+     * (V * W^-1 * U^T) * S^(-1/2)
+     */
+    for (j = 0; j < nj; ++j) {
+        double* a = A[j];
+
+        for (i = 0; i < ni; ++i) {
+            double* v = V[i];
+            double b = 0.0;
+
+            for (ii = 0; ii < nijmin; ++ii)
+                b += v[ii] * a[ii];
+            op[j][i] = (std != NULL) ? b / std[j] : b;
+        }
+    }
+
+    free2d(V);
+}
+
 #if defined(SVD_TEST)
 
 static void usage()
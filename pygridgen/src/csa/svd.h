@@ -100,4 +100,20 @@ void svd_sort(double** A, int n, int m, double* w, double** V);
  */
 void svd_lsq(double** A, int ni, int nj, double* z, double* std, double* w, double* sol);
 
+/** Least squares fitting operator via singular value decomposition.
+ *
+ * Same as svd_lsq(), but returns the matrix that maps z to the solution:
+ * sol[i] = sum_j op[j][i] * z[j].
+ *
+ * @param A Matrix A of the system (1) [0..nj-1][0..ni-1]
+ * @param ni Number of columns
+ * @param nj Number of rows
+ * @param std Vector of standard deviations for each row [0..nj-1] or NULL
+ * @param w Singular values of the modified matrix A' = S^(-1/2) * A [0..nj-1]
+ * @param op Output operator [0..nj-1][0..ni-1]
+ *
+ * Note: A gets overwritten during call to svd_lsqop().
+ */
+void svd_lsqop(double** A, int ni, int nj, double* std, double* w, double** op);
+
 #endif
@@ -65,3 +65,190 @@ def test_CSA_zin_property(base_csa, xy_out):
                False, False, False, False, False, False]]
     )
     nptest.assert_array_almost_equal(result, expected, decimal=4)
+
+
+def test_csa_verbose_logging(caplog):
+    numpy.random.seed(0)
+    x, y = numpy.random.randn(2, 500)
+    interp = csa.CSA(x, y, numpy.sin(x) * y, verbose=True)
+    with caplog.at_level('INFO', logger='pygridgen.csa'):
+        zout = interp(*numpy.mgrid[-1:1:5j, -1:1:5j])
+
+    stages = [record.stage for record in caplog.records]
+    assert stages[0] == 'squarize'
+    assert {'squarize', 'primary', 'secondary', 'check'} == set(interp.timings['stages'])
+    orders = {r.native['order']: r.native['sets'] for r in caplog.records if 'order' in r.native}
+    assert sorted(orders) == [0, 1, 2, 3]
+
+    interp.verbose = False
+    nptest.assert_array_almost_equal(interp(*numpy.mgrid[-1:1:5j, -1:1:5j]), zout)
+    assert 'stages' not in interp.timings
+
+
+def test_parse_csa_message():
+    info = csa.parse_csa_message('  21 x 25 squares')
+    assert info['stage'] is None
+    assert info['squares'] == (21, 25)
+    assert csa.parse_csa_message('squarizing:')['stage'] == 'squarize'
+
+
+def test_csa_sample_grid(base_csa):
+    from pygridgen.grid import CGrid
+    y, x = numpy.mgrid[-1.5:1.5:8j, -1.5:1.5:9j]
+    grid = CGrid(x, y)
+    grid.mask_rho[:3, :4] = 0
+
+    zout = grid.sample(base_csa)
+    full = base_csa(grid.x_rho, grid.y_rho)
+    nptest.assert_array_almost_equal(zout[3:], full[3:])
+    assert zout.mask[:3, :4].all()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 7, 65536])
+def test_csa_chunked(base_csa, chunk_size):
+    xout, yout = numpy.mgrid[-2:2:9j, -2:2:11j]
+    expected = base_csa(xout, yout)
+    result = base_csa(xout, yout, chunk_size=chunk_size)
+    nptest.assert_array_almost_equal(result, expected)
+    nptest.assert_array_equal(result.mask, expected.mask)
+
+    out = numpy.zeros(xout.shape)
+    result = base_csa(xout, yout, chunk_size=chunk_size, out=out)
+    assert numpy.shares_memory(result, out)
+    nptest.assert_array_equal(result.mask, expected.mask)
+    nptest.assert_array_almost_equal(out, expected.filled(numpy.nan))
+
+    pieces = list(base_csa.iter_evaluate(xout, yout, chunk_size=chunk_size))
+    assert all(len(z) <= chunk_size for _, z in pieces)
+    nptest.assert_array_almost_equal(
+        numpy.concatenate([z for _, z in pieces]), expected.filled(numpy.nan).ravel()
+    )
+
+
+def test_csa_timings():
+    numpy.random.seed(0)
+    x, y = numpy.random.randn(2, 5000)
+    interp = csa.CSA(x, y, numpy.sin(x) * y)
+    interp(numpy.zeros(1), numpy.zeros(1))
+    assert interp.timings['approximate'] < 0.5 * interp.timings['spline']
+
+
+def test_csa_chunked_memmap(base_csa, tmp_path):
+    xout, yout = numpy.mgrid[-2:2:9j, -2:2:11j]
+    out = numpy.lib.format.open_memmap(tmp_path / 'z.npy', mode='w+', dtype='d',
+                                       shape=xout.shape)
+    base_csa(xout, yout, chunk_size=10, out=out)
+    out.flush()
+    nptest.assert_array_almost_equal(numpy.load(tmp_path / 'z.npy'),
+                                     base_csa(xout, yout).filled(numpy.nan))
+
+
+def test_csa_chunked_errors(base_csa):
+    xout, yout = numpy.mgrid[-2:2:9j, -2:2:11j]
+    with pytest.raises(ValueError):
+        base_csa(xout, yout, out=numpy.empty((11, 9)))
+    with pytest.raises(ValueError):
+        base_csa(xout, yout, out=numpy.empty((9, 22))[:, ::2])
+    with pytest.raises(ValueError):
+        base_csa(xout, yout, chunk_size=0)
+
+
+def test_csa_spline_reused(base_csa, xy_out):
+    base_csa(*xy_out)
+    base_csa.timings.clear()
+    base_csa(*xy_out)
+    assert 'spline' not in base_csa.timings
+
+    base_csa.k = 70
+    base_csa(*xy_out)
+    assert 'spline' in base_csa.timings
+
+
+def _points():
+    numpy.random.seed(0)
+    x, y = numpy.random.randn(2, 500)
+    return numpy.column_stack([x, y, numpy.sin(x) * y])
+
+
+@pytest.mark.parametrize('as_tuples', [True, False])
+def test_csa_from_chunks(as_tuples):
+    points = _points()
+    xout, yout = numpy.mgrid[-1:1:5j, -1:1:7j]
+    expected = csa.CSA(*points.T)(xout, yout)
+
+    chunks = [points[i:i + 64] for i in range(0, len(points), 64)]
+    if as_tuples:
+        chunks = [tuple(chunk.T) for chunk in chunks]
+    interp = csa.CSA.from_chunks(iter(chunks))
+    nptest.assert_array_almost_equal(interp(xout, yout), expected)
+    nptest.assert_array_equal(interp.xin, points[:, 0])
+    nptest.assert_array_equal(interp.zin, points[:, 2])
+
+    interp.zin = numpy.cos(points[:, 0])
+    nptest.assert_array_almost_equal(
+        interp(xout, yout), csa.CSA(points[:, 0], points[:, 1], numpy.cos(points[:, 0]))(xout, yout)
+    )
+
+
+def test_csa_from_chunks_binned():
+    points = _points()
+    chunks = [points[:300], points[200:]]
+    interp = csa.CSA.from_chunks(chunks, bin_size=0)
+    assert interp.xin.size == 500
+    nptest.assert_array_almost_equal(numpy.sort(interp.zin), numpy.sort(points[:, 2]))
+
+    interp = csa.CSA.from_chunks(chunks, bin_size=0.5)
+    keys = numpy.unique(numpy.floor(points[:, :2] / 0.5), axis=0)
+    assert interp.xin.size == len(keys)
+    assert numpy.isfinite(interp(*numpy.mgrid[-1:1:5j, -1:1:5j])).all()
+
+    with pytest.raises(ValueError):
+        csa.CSA.from_chunks([])
+    with pytest.raises(ValueError):
+        csa.CSA.from_chunks([numpy.zeros((4, 2))])
+
+
+@pytest.mark.parametrize('suffix', ['.npy', '.bin'])
+def test_csa_from_memmap(tmp_path, suffix):
+    points = _points()
+    path = tmp_path / ('points' + suffix)
+    if suffix == '.npy':
+        numpy.save(path, points)
+    else:
+        points.tofile(path)
+
+    xout, yout = numpy.mgrid[-1:1:5j, -1:1:7j]
+    interp = csa.CSA.from_memmap(path, chunk_size=100)
+    assert len(interp._points) == 5
+    nptest.assert_array_almost_equal(interp(xout, yout), csa.CSA(*points.T)(xout, yout))
+
+    points.astype('f').tofile(tmp_path / 'points.f32')
+    interp = csa.CSA.from_memmap(tmp_path / 'points.f32', dtype='f', chunk_size=100)
+    nptest.assert_array_almost_equal(interp.xin, points[:, 0], decimal=5)
+
+
+@pytest.mark.parametrize('refit', [False, True])
+@pytest.mark.parametrize('sigma', [None, 0.1])
+def test_csa_refit(sigma, refit):
+    numpy.random.seed(0)
+    x, y = numpy.random.randn(2, 500)
+    xout, yout = numpy.mgrid[-1.5:1.5:9j, -1.5:1.5:11j]
+    interp = csa.CSA(x, y, numpy.sin(x) * y, sigma=sigma, refit=refit)
+    interp(xout, yout)
+    assert 'spline' in interp.timings and 'refit' not in interp.timings
+
+    # only refit when asked for (and the library can)
+    refit = refit and csa.CSA._refit
+    for zin in [numpy.cos(x + y**2), x * y]:
+        interp.zin = zin
+        result = interp(xout, yout)
+        assert ('refit' in interp.timings) is refit
+        assert ('spline' in interp.timings) is not refit
+        expected = csa.CSA(x, y, zin, sigma=sigma)(xout, yout)
+        nptest.assert_array_almost_equal(result, expected)
+        nptest.assert_array_equal(result.mask, expected.mask)
+
+    # other changes compute the spline from scratch
+    interp.k = 70
+    interp(xout, yout)
+    assert 'spline' in interp.timings and 'refit' not in interp.timings
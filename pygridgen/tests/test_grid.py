@@ -636,3 +636,881 @@ def test_gridgen_spec_valid_json(simple_grid):
     # testing - using almost equal due to rounding issues with floats
     numpy.testing.assert_array_almost_equal(simple_grid.x, grid2.x)
     numpy.testing.assert_array_almost_equal(simple_grid.y, grid2.y)
+
+
+def test_estimate_resolution_rectangle():
+    spec = {'xbry': [0, 10, 10, 0], 'ybry': [0, 0, 5, 5],
+            'beta': [1, 1, 1, 1], 'shape': (11, 6)}
+    est = pygridgen.Gridgen.estimate_resolution(spec)
+    assert est['shape'] == (11, 6)
+    assert est['nodes'] == 66
+    assert est['wet_cells'] == 50
+    for stat in ['min', 'median', 'max']:
+        nptest.assert_almost_equal(est['dx'][stat], 1.0)
+        nptest.assert_almost_equal(est['dy'][stat], 1.0)
+
+
+def test_estimate_resolution_projected():
+    def proj(x, y, inverse=False):
+        return numpy.asarray(x) * 2e3, numpy.asarray(y) * 1e3
+
+    lonlat = {'xbry': [0, 10, 10, 0], 'ybry': [0, 0, 5, 5],
+              'beta': [1, 1, 1, 1], 'shape': (11, 6), 'proj': proj}
+    x, y = proj(lonlat['xbry'], lonlat['ybry'])
+    projected = dict(lonlat, xbry=x.tolist(), ybry=y.tolist())
+
+    # to_spec's boundary is already projected
+    est = pygridgen.Gridgen.estimate_resolution(projected)
+    nptest.assert_almost_equal(est['dx']['median'], 1e3)
+    nptest.assert_almost_equal(est['dy']['median'], 2e3)
+
+    geo = pygridgen.Gridgen.estimate_resolution(dict(lonlat, geographic=True))
+    for key in ['dx', 'dy']:
+        nptest.assert_almost_equal(geo[key]['median'], est[key]['median'])
+
+    with pytest.raises(ValueError):
+        pygridgen.Gridgen.estimate_resolution(dict(lonlat, proj=None, geographic=True))
+
+
+def test_estimate_resolution_focus():
+    spec = {'xbry': [0, 10, 10, 0], 'ybry': [0, 0, 5, 5],
+            'beta': [1, 1, 1, 1], 'shape': (11, 6),
+            'focus': [{'pos': 0.5, 'axis': 'x', 'factor': 4, 'extent': 0.2}]}
+    est = pygridgen.Gridgen.estimate_resolution(spec)
+    assert est['dx']['min'] < 1.0 < est['dx']['max']
+    nptest.assert_almost_equal(est['dy']['median'], 1.0)
+
+
+@pytest.mark.parametrize('coarsen', [None, 2])
+def test_estimate_resolution_vs_grid(simple_grid, coarsen):
+    est = pygridgen.Gridgen.estimate_resolution(simple_grid.to_spec(), coarsen=coarsen)
+    dx = numpy.ma.median(simple_grid.dx)
+    dy = numpy.ma.median(simple_grid.dy)
+    assert est['nodes'] == simple_grid.x.size
+    assert 0.5 < est['dx']['median'] / dx < 2.0
+    assert 0.5 < est['dy']['median'] / dy < 2.0
+
+
+def test_for_resolution():
+    x, y, beta = boundary_planar()
+    grid = pygridgen.Gridgen.for_resolution(x, y, beta, 0.05)
+    nptest.assert_allclose(numpy.ma.median(grid.dx), 0.05, rtol=0.1)
+    nptest.assert_allclose(numpy.ma.median(grid.dy), 0.05, rtol=0.1)
+
+
+def test_for_resolution_max_nodes():
+    x, y, beta = boundary_planar()
+    with pytest.warns(UserWarning):
+        grid = pygridgen.Gridgen.for_resolution(x, y, beta, 0.01, max_nodes=400)
+    assert grid.x.size <= 400
+
+
+def test_pyramid(simple_grid):
+    levels = simple_grid.pyramid(levels=[1, 2, 4])
+    assert [g.x.shape for g in levels] == [(20, 10), (39, 19), (77, 37)]
+    nptest.assert_array_equal(levels[0].x, levels[2].x[::4, ::4])
+    nptest.assert_array_equal(levels[1].y, levels[2].y[::2, ::2])
+
+
+def test_pyramid_subsample_matches_generated(simple_grid):
+    sub = simple_grid.pyramid(levels=[1, 2], subsample=True)
+    gen = simple_grid.pyramid(levels=[1, 2], subsample=False)
+    nptest.assert_array_almost_equal(sub[0].x, gen[0].x)
+    nptest.assert_array_almost_equal(sub[0].y, gen[0].y)
+    nptest.assert_array_almost_equal(gen[0].x, simple_grid.x)
+
+
+def noisy_rectangle():
+    t = numpy.linspace(0, 1, num=51)[:-1]
+    x = numpy.concatenate([t * 4, numpy.full_like(t, 4), 4 - t * 4, numpy.zeros_like(t)])
+    y = numpy.concatenate([numpy.zeros_like(t), t * 2, numpy.full_like(t, 2), 2 - t * 2])
+    y[1:50] += 0.001 * numpy.sin(t[1:] * 40)
+    beta = numpy.zeros_like(x)
+    beta[[0, 50, 100, 150]] = 1
+    return x, y, beta
+
+
+def test_simplify_boundary():
+    x, y, beta = noisy_rectangle()
+    xs, ys, bs, ul, kept = pygridgen.grid.simplify_boundary(x, y, beta, 0.01, ul_idx=0)
+    nptest.assert_array_equal(kept, [0, 50, 100, 150])
+    nptest.assert_array_equal(xs, [0, 4, 4, 0])
+    nptest.assert_array_equal(ys, [0, 0, 2, 2])
+    nptest.assert_array_equal(bs, [1, 1, 1, 1])
+    assert ul == 0
+
+
+def test_simplify_boundary_keeps_ul_and_deviation():
+    x, y, beta = noisy_rectangle()
+    xs, ys, bs, ul, kept = pygridgen.grid.simplify_boundary(x, y, beta, 0.0005, ul_idx=120)
+    assert 120 in kept
+    assert kept[ul] == 120
+    assert 4 < kept.size < x.size
+    for i in range(x.size):
+        dist = min(
+            pygridgen.grid._segment_distance(x[i], y[i], xs[k], ys[k],
+                                             xs[(k + 1) % xs.size], ys[(k + 1) % ys.size])
+            for k in range(xs.size)
+        )
+        assert dist <= 0.0005
+
+
+def test_gridgen_simplify():
+    x, y, beta = noisy_rectangle()
+    grid = pygridgen.Gridgen(x, y, beta, (5, 9), simplify=0.01)
+    assert grid.simplification['removed'] == 196
+    assert grid.xbry.size == 4
+    assert 'generate' in grid.timings
+
+
+@pytest.mark.parametrize(('boundary', 'ul_idx'), [
+    (boundary_planar(), 0),
+    (boundary_geographic(), 2),
+    (([0.5, 2, 2, 3.5, 3.5, 2, 2, 0.5, 0.5], [0.5, 0.5, 1.75, 1.75, 2.25, 2.25, 3.5, 3.5, 0.5],
+      [1, 1, -1, 1, 1, -1, 1, 1, 0]), 0),
+])
+def test_validate_boundary_valid(boundary, ul_idx):
+    x, y, beta = boundary
+    pygridgen.grid.validate_boundary(x, y, beta, ul_idx=ul_idx)
+
+
+@pytest.mark.parametrize(('x', 'y', 'beta', 'ul_idx', 'match'), [
+    ([0, 1, 1, 0], [0, 0, 1], [1, 1, 1, 1], 0, 'same size'),
+    ([0, 1], [0, 0], [1, 1], 0, 'at least 3'),
+    ([0, 1, numpy.nan, 0], [0, 0, 1, 1], [1, 1, 1, 1], 0, 'finite'),
+    ([0, 1, 1, 0], [0, 0, 1, 1], [1, 1, 1, 1, 0], 0, 'beta'),
+    ([0, 1, 1, 0], [0, 0, 1, 1], [1, 1, 1, 0], 0, 'sum'),
+    ([0, 1, 1, 0], [0, 0, 1, 1], [1, 1, 1, 1], 4, 'ul_idx'),
+    ([0, 1, 2, 3], [0, 1, 2, 3], [1, 1, 1, 1], 0, 'area'),
+    ([0, 2, 2, 1, 1, 0], [0, 0, 2, 2, -1, 1], [1, 1, 1, 1, 0, 0], 0, 'intersects'),
+    ([0, 2, 2, 1, 1, 0], [0, 0, 2, 2, 0, 1], [1, 1, 1, 1, 0, 0], 0, 'intersects'),
+    ([0, 2, 2, 3, 2.5, 2.5, 2, 0], [0, 0, 1, 1, 1, 2, 2, 2], [1, 1, 0, 0, 0, 0, 1, 1], 0,
+     'vertex 2 .* vertex 3 '),
+])
+def test_validate_boundary_invalid(x, y, beta, ul_idx, match):
+    with pytest.raises(ValueError, match=match):
+        pygridgen.grid.validate_boundary(x, y, beta, ul_idx=ul_idx)
+
+
+@pytest.mark.parametrize('max_pairs', [16, 0])
+@pytest.mark.parametrize(('x', 'y', 'expected'), [
+    ([0, 2, 2, 0], [0, 0, 1, 1], None),
+    ([0, 2, 2, 0.5, 0.5, 1.5, 1.5, 0], [0, 0, 2, 2, 1, 1, 1.5, 1.5], (3, 6)),
+    # a spike backtracking along the edge before it
+    ([0, 2, 2, 3, 2.5, 2.5, 2, 0], [0, 0, 1, 1, 1, 2, 2, 2], (2, 3)),
+    # edges overlapping along a line
+    ([0, 3, 3, 2, 2.5, 1, 1, 0], [0, 0, 2, 2, 0, 0, 2, 2], (0, 4)),
+])
+def test_find_intersection(x, y, expected, max_pairs):
+    x, y = numpy.array(x, dtype=float), numpy.array(y, dtype=float)
+    assert pygridgen.grid._find_intersection(x, y, max_pairs=max_pairs) == expected
+
+
+def test_find_intersection_long_edges():
+    # a comb of long edges that all overlap in x
+    n = 2000
+    x = numpy.concatenate([numpy.tile([0.0, 100.0, 100.0, 0.0], n // 2), [-1, -1]])
+    y = numpy.concatenate([numpy.repeat(numpy.arange(n, dtype=float), 2), [n - 1, 0]])
+    assert pygridgen.grid._find_intersection(x, y) is None
+
+    y[2] = 5
+    assert pygridgen.grid._find_intersection(x, y) is not None
+
+
+def test_validate_boundary_large():
+    t = numpy.linspace(0, 2 * numpy.pi, num=100001)[:-1]
+    r = 1 + 0.1 * numpy.sin(50 * t)
+    x, y = r * numpy.cos(t), r * numpy.sin(t)
+    beta = numpy.zeros_like(x)
+    beta[[0, 25000, 50000, 75000]] = 1
+    pygridgen.grid.validate_boundary(x, y, beta)
+
+    x[10] = -2
+    with pytest.raises(ValueError, match='vertex 9 '):
+        pygridgen.grid.validate_boundary(x, y, beta)
+    pygridgen.grid.validate_boundary(x, y, beta, check_intersections=False)
+
+
+def test_solver_state_roundtrip(simple_grid):
+    state = simple_grid.solver_state
+    assert state['sigmas'].size == simple_grid.nsigmas.value
+    assert state['xrect'].shape == simple_grid.xrect.shape == simple_grid.yrect.shape
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'state.npz')
+        numpy.savez(path, **state)
+        with numpy.load(path) as saved:
+            grid2 = pygridgen.Gridgen(simple_grid.xbry, simple_grid.ybry, simple_grid.beta,
+                                      shape=simple_grid.shape, solver_state=saved)
+
+    nptest.assert_array_equal(grid2.solver_state['sigmas'], state['sigmas'])
+    nptest.assert_array_almost_equal(grid2.x, simple_grid.x)
+    nptest.assert_array_almost_equal(grid2.y, simple_grid.y)
+
+
+def test_solver_state_other_boundary(simple_grid):
+    x, y, beta = boundary_planar()
+    with pytest.raises(ValueError, match='different boundary'):
+        pygridgen.Gridgen(x, y, beta, shape=(10, 10), solver_state=simple_grid.solver_state)
+
+
+def test_generate_robust(simple_grid):
+    x, y = simple_grid.x.copy(), simple_grid.y.copy()
+    grid = simple_grid.generate_robust(configs=[{'nnodes': 'bad'}, {'nnodes': 16}], max_workers=2)
+    assert grid is simple_grid
+    assert grid.nnodes == 16
+    assert grid.solver_state is not None
+    nptest.assert_array_almost_equal(grid.x, x)
+    nptest.assert_array_almost_equal(grid.y, y)
+
+
+def test_generate_robust_all_fail(simple_grid):
+    with pytest.raises(RuntimeError, match='none of the solver configurations'):
+        simple_grid.generate_robust(configs=[{'nnodes': 'bad'}, {}], max_orthogonality=-1)
+
+    with pytest.raises(ValueError, match='unknown solver parameters'):
+        simple_grid.generate_robust(configs=[{'shape': (5, 5)}])
+
+
+@pytest.mark.parametrize(('line', 'expected'), [
+    ('  iteration 12: error = 3.0e-09', {'stage': 'sigmas', 'iteration': 12, 'error': 3e-9}),
+    ('calculating sigmas:', {'stage': 'sigmas'}),
+    ('triangulating:', {'stage': 'triangulation'}),
+    ('generating grid:', {'stage': 'grid'}),
+    # details, and lines that merely mention a stage
+    ('  12 nodes in the grid', {'stage': None}),
+    ('  map: iteration over quadrilaterals', {'stage': None}),
+    ('  it 3', {'stage': None}),
+    ('something unexpected', {'stage': None}),
+])
+def test_parse_gridgen_message(line, expected):
+    info = pygridgen.grid.parse_gridgen_message(line)
+    assert info['message'] == line.strip()
+    for key, value in expected.items():
+        assert info[key] == value
+    if 'iteration' not in expected:
+        assert 'iteration' not in info and 'error' not in info
+
+
+def test_generate_grid_supervised(simple_grid):
+    x, y = simple_grid.x.copy(), simple_grid.y.copy()
+    messages = []
+    simple_grid.generate_grid(timeout=60, progress=messages.append)
+    assert all('elapsed' in info for info in messages)
+    nptest.assert_array_almost_equal(simple_grid.x, x)
+    nptest.assert_array_almost_equal(simple_grid.y, y)
+
+
+def test_generate_grid_timeout_and_cancel(simple_grid):
+    # a new grid on the same boundary has to solve it again
+    grid = pygridgen.Gridgen(simple_grid.xbry, simple_grid.ybry, simple_grid.beta,
+                             shape=(1000, 500), autogen=False)
+    with pytest.raises(TimeoutError):
+        grid.generate_grid(timeout=1e-3)
+
+    with pytest.raises(RuntimeError, match='cancelled'):
+        grid.generate_grid(progress=lambda info: False)
+
+
+def test_gridgen_pickle(simple_grid):
+    import pickle
+
+    simple_grid.mask_rho[0, 0] = 0
+    grid2 = pickle.loads(pickle.dumps(simple_grid))
+    assert grid2._gn is None
+    assert grid2.to_spec() == simple_grid.to_spec()
+    nptest.assert_array_equal(grid2.x, simple_grid.x)
+    nptest.assert_array_equal(grid2.y, simple_grid.y)
+    nptest.assert_array_equal(grid2.mask_rho, simple_grid.mask_rho)
+    nptest.assert_array_equal(grid2.solver_state['sigmas'], simple_grid.solver_state['sigmas'])
+
+    # native handles come back when needed
+    grid2.generate_grid()
+    nptest.assert_array_almost_equal(grid2.x, simple_grid.x)
+
+
+def test_gridgen_pickle_not_generated():
+    import pickle
+
+    x, y, beta = boundary_planar()
+    focus = pygridgen.Focus()
+    focus.add_focus(0.5, 'x', factor=2, extent=0.2)
+    grid = pygridgen.Gridgen(x, y, beta, shape=(10, 10), focus=focus, autogen=False)
+    grid2 = pickle.loads(pickle.dumps(grid))
+    assert grid2.to_spec() == grid.to_spec()
+    assert grid2.solver_state is None
+    assert not hasattr(grid2, 'x_vert')
+
+
+def masked_cgrid():
+    y, x = numpy.mgrid[0.0:7.0, 0.0:8.0]
+    x = numpy.ma.masked_where((x < 3) & (y < 3), x)
+    y = numpy.ma.MaskedArray(y, x.mask)
+    grid = pygridgen.grid.CGrid(x, y)
+    grid.mask_rho[-1, -1] = 0
+    return grid
+
+
+@pytest.mark.parametrize('name', ['grid', 'grid.npz'])
+@pytest.mark.parametrize('mmap', [True, False])
+def test_cgrid_save_load(name, mmap):
+    grid = masked_cgrid()
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, name)
+        grid.save(path, metrics=['dx', 'angle'])
+        grid2 = pygridgen.grid.CGrid.load(path, mmap=mmap)
+
+        assert grid2.archive_header['metrics'] == ['dx', 'angle']
+        assert 'dx' in grid2._cache and 'dy' not in grid2._cache
+        nptest.assert_array_equal(grid2.x_vert.mask, grid.x_vert.mask)
+        for attr in ['x', 'y', 'mask_rho', 'mask_psi', 'dx', 'dy', 'angle', 'x_rho']:
+            nptest.assert_array_equal(getattr(grid2, attr), getattr(grid, attr))
+        del grid2
+
+
+def test_cgrid_save_spec(simple_grid):
+    with tempfile.TemporaryDirectory() as folder:
+        simple_grid.save(folder)
+        grid2 = pygridgen.grid.CGrid.load(folder)
+        assert isinstance(grid2, pygridgen.Gridgen)
+        spec = grid2.archive_header['spec']
+        grid3 = pygridgen.Gridgen.from_spec(spec)
+        nptest.assert_array_almost_equal(grid3.x, grid2.x)
+        del grid2
+
+
+def test_cgrid_geo_save_load():
+    utm = pyproj.Proj(proj='utm', zone=10, ellps='WGS84')
+    grid = geo_grid(utm)
+    grid.use_gcdist = False
+    with tempfile.TemporaryDirectory() as folder:
+        grid.save(folder, metrics=['dx'])
+        grid2 = pygridgen.grid.CGrid.load(folder)
+
+        assert isinstance(grid2, pygridgen.grid.CGrid_geo)
+        assert grid2.proj.srs == utm.srs and grid2.ellipse == 'WGS84' and not grid2.use_gcdist
+        nptest.assert_array_equal(grid2.lon_vert, grid.lon_vert)
+        nptest.assert_array_equal(grid2.lat_vert.mask, grid.lat_vert.mask)
+        for attr in ['x', 'mask_rho', 'dx', 'dy', 'lon_rho', 'lat_psi', 'f']:
+            nptest.assert_array_almost_equal(getattr(grid2, attr), getattr(grid, attr))
+        del grid2
+
+
+def test_cgrid_geo_save_unknown_proj():
+    utm = pyproj.Proj(proj='utm', zone=10, ellps='WGS84')
+    grid = geo_grid(CountingProj(utm))
+    with tempfile.TemporaryDirectory() as folder:
+        with pytest.raises(ValueError, match='CountingProj'):
+            grid.save(os.path.join(folder, 'grid'))
+        assert not os.listdir(folder)
+
+
+def test_gridgen_save_load():
+    utm = pyproj.Proj(proj='utm', zone=10, ellps='WGS84')
+    lon, lat = [-123, -122, -122, -123], [44, 44, 45, 45]
+    grid = pygridgen.Gridgen(lon, lat, [1, 1, 1, 1], shape=(6, 5), proj=utm, engine='numpy')
+    with tempfile.TemporaryDirectory() as folder:
+        grid.save(folder)
+        grid2 = pygridgen.grid.CGrid.load(folder)
+
+        assert isinstance(grid2, pygridgen.Gridgen)
+        assert grid2.proj.srs == utm.srs
+        nptest.assert_array_equal(grid2.xbry, grid.xbry)
+        nptest.assert_array_equal(grid2.x, grid.x)
+        del grid2
+
+
+def test_cgrid_cache_cleared():
+    grid = masked_cgrid()
+    dx = grid.dx
+    assert grid.dx is dx
+    grid.x_vert = grid.x_vert * 2
+    nptest.assert_array_almost_equal(grid.dx, dx * 2)
+
+    # cached metrics can't be edited, and reassigning edited vertices
+    # drops them
+    with pytest.raises(ValueError, match='read-only'):
+        grid.x_rho[3, 3] = 0
+    x_rho = grid.x_rho
+    grid.x_vert[4:, :] += 1
+    assert grid.x_rho is x_rho
+    grid.x_vert = grid.x_vert
+    nptest.assert_array_almost_equal(grid.x_rho[4:], x_rho[4:] + 1)
+
+    utm = pyproj.Proj(proj='utm', zone=10, ellps='WGS84')
+    geo = geo_grid(utm)
+    dx = geo.dx
+    geo.lon_vert = geo.lon_vert * 2
+    assert geo.dx is not dx
+    nptest.assert_allclose(geo.dx, dx * 2, rtol=1e-3)
+
+    with pytest.raises(ValueError):
+        grid.save('unused', metrics=['bogus'])
+
+
+class CountingProj:
+    def __init__(self, proj):
+        self.proj = proj
+        self.calls = {True: 0, False: 0}
+
+    def __call__(self, x, y, inverse=False):
+        self.calls[inverse] += 1
+        return self.proj(x, y, inverse=inverse)
+
+
+def geo_grid(proj):
+    lat, lon = numpy.mgrid[44.5:45.5:9j, -123.0:-122.0:7j]
+    lon = numpy.ma.masked_where((lat > 45.2) & (lon > -122.3), lon)
+    lat = numpy.ma.MaskedArray(lat, mask=lon.mask)
+    return pygridgen.grid.CGrid_geo(lon, lat, proj)
+
+
+def test_cgrid_geo_lazy_lonlat():
+    utm = pyproj.Proj(proj='utm', zone=10, ellps='WGS84')
+    proj = CountingProj(utm)
+    grid = geo_grid(proj)
+    assert proj.calls == {False: 1, True: 0}
+
+    for point in ['rho', 'u', 'v', 'psi']:
+        known_lon, known_lat = utm(numpy.ma.getdata(getattr(grid, 'x_' + point)),
+                                   numpy.ma.getdata(getattr(grid, 'y_' + point)), inverse=True)
+        lon, lat = getattr(grid, 'lon_' + point), getattr(grid, 'lat_' + point)
+        assert lon.shape == getattr(grid, 'x_' + point).shape
+        nptest.assert_array_almost_equal(numpy.ma.getdata(lon), known_lon)
+        nptest.assert_array_almost_equal(numpy.ma.getdata(lat), known_lat)
+        known_mask = numpy.ma.getmaskarray(getattr(grid, 'x_' + point))
+        nptest.assert_array_equal(numpy.ma.getmaskarray(lon), known_mask)
+
+    nptest.assert_array_almost_equal(grid.f, 2.0 * 7.29e-5 * numpy.cos(numpy.radians(grid.lat_rho)))
+    assert proj.calls == {False: 1, True: 1}
+
+
+@pytest.mark.parametrize('workers', [None, 3])
+def test_cgrid_geo_edge_lengths(workers):
+    utm = pyproj.Proj(proj='utm', zone=10, ellps='WGS84')
+    grid = geo_grid(utm)
+    grid.workers = workers
+    geod = pyproj.Geod(ellps='WGS84')
+
+    lon, lat = numpy.ma.getdata(grid.lon_vert), numpy.ma.getdata(grid.lat_vert)
+    xi = geod.inv(lon[:, :-1], lat[:, :-1], lon[:, 1:], lat[:, 1:])[2]
+    eta = geod.inv(lon[:-1], lat[:-1], lon[1:], lat[1:])[2]
+    nptest.assert_array_almost_equal(grid.dx, 0.5 * (xi[1:] + xi[:-1]))
+    nptest.assert_array_almost_equal(grid.dy, 0.5 * (eta[:, 1:] + eta[:, :-1]))
+    nptest.assert_array_equal(grid.dx.mask, grid.x_rho.mask)
+    assert grid.dx is grid.dx
+    nptest.assert_array_almost_equal(grid.pm, 1 / grid.dx)
+
+    dx = grid.dx
+    grid.use_gcdist = False
+    assert numpy.ma.max(numpy.abs(grid.dx / dx - 1)) < 0.01
+
+
+def test_cgrid_geo_haversine():
+    utm = pyproj.Proj(proj='utm', zone=10, ellps='WGS84')
+    geodesic = geo_grid(utm)
+    haversine = geo_grid(utm)
+    dx = haversine.dx
+    haversine.haversine = True
+    assert haversine.dx is not dx
+    nptest.assert_allclose(haversine.dx, geodesic.dx, rtol=5e-3)
+    nptest.assert_allclose(haversine.dy, geodesic.dy, rtol=5e-3)
+    nptest.assert_allclose(pygridgen.grid._haversine(0, 0, 1, 0), 111195.08, rtol=1e-6)
+
+
+def test_cgrid_area():
+    # a parallelogram: rows shifted by 0.5, so 1/(pm*pn) overestimates
+    y, x = numpy.mgrid[0:3.0, 0:4.0]
+    grid = pygridgen.grid.CGrid(x + 0.5 * y, y)
+    nptest.assert_array_almost_equal(grid.area, numpy.ones((2, 3)))
+    assert numpy.all(1 / (grid.pm * grid.pn) > 1.1)
+    assert grid.area is grid.area
+
+    masked = masked_cgrid()
+    nptest.assert_array_equal(masked.area.mask, masked.x_rho.mask)
+
+
+def test_cgrid_geo_area():
+    utm = pyproj.Proj(proj='utm', zone=10, ellps='WGS84')
+    grid = geo_grid(utm)
+    geod = pyproj.Geod(ellps='WGS84')
+    for j, i in [(0, 0), (3, 2), (7, 0)]:
+        lon = grid.lon_vert.data[[j, j, j + 1, j + 1], [i, i + 1, i + 1, i]]
+        lat = grid.lat_vert.data[[j, j, j + 1, j + 1], [i, i + 1, i + 1, i]]
+        known = abs(geod.polygon_area_perimeter(lon, lat)[0])
+        assert grid.area[j, i] == pytest.approx(known, rel=1e-4)
+    nptest.assert_array_equal(grid.area.mask, grid.x_rho.mask)
+    nptest.assert_allclose(grid.area, grid.dx * grid.dy, rtol=1e-2)
+
+    # the same lengths as dx and dy, on a sphere
+    area = grid.area
+    grid.haversine = True
+    assert grid.area is not area
+    nptest.assert_allclose(grid.area, grid.dx * grid.dy, rtol=1e-2)
+    assert grid.integrate(numpy.ones(grid.x_rho.shape)) == pytest.approx(grid.area.sum())
+
+    grid.use_gcdist = False
+    nptest.assert_array_almost_equal(grid.area, pygridgen.grid.CGrid(grid.x_vert, grid.y_vert).area)
+
+
+def test_cgrid_integrate():
+    grid = masked_cgrid()
+    wet = numpy.ma.filled(grid.area, 0) * grid.mask_rho
+
+    ones = numpy.ones(grid.x_rho.shape)
+    nptest.assert_almost_equal(grid.integrate(ones), wet.sum())
+    nptest.assert_almost_equal(grid.integrate(ones, mask=False), numpy.ma.sum(grid.area))
+
+    stack = numpy.random.RandomState(0).rand(4, 3, *grid.x_rho.shape)
+    total = grid.integrate(stack)
+    assert total.shape == (4, 3)
+    nptest.assert_array_almost_equal(total, (stack * wet).sum(axis=(-2, -1)))
+
+    field = numpy.ma.masked_greater(stack[0, 0], 0.5)
+    keep = wet * ~field.mask
+    nptest.assert_almost_equal(grid.integrate(field, mean=True),
+                               (field.filled(0) * keep).sum() / keep.sum())
+
+    with pytest.raises(ValueError):
+        grid.integrate(numpy.ones((2, 2)))
+
+
+def test_cgrid_quality():
+    y, x = numpy.mgrid[0:4.0, 0:5.0]
+    grid = pygridgen.grid.CGrid(x + 0.5 * y, y)
+    quality = grid.quality(bins=10, fields=True)
+
+    known = {
+        'aspect_ratio': numpy.sqrt(1.25),
+        'skewness': (90 - numpy.degrees(numpy.arctan(2))) / 90,
+        'size_ratio': 1.0,
+        'min_angle': numpy.degrees(numpy.arctan(2)),
+        'orthogonality': 90 - numpy.degrees(numpy.arctan(2)),
+        'jacobian': 2 / numpy.sqrt(5),
+    }
+    assert quality['cells'] == 12
+    assert quality['inverted'] == 0
+    for name, value in known.items():
+        for stat in ['min', 'mean', 'max']:
+            nptest.assert_almost_equal(quality['summary'][name][stat], value)
+        counts, edges = quality['histograms'][name]
+        assert counts.sum() == 12 and edges.shape == (11,)
+        nptest.assert_array_almost_equal(quality['fields'][name], numpy.full((3, 4), value))
+
+    assert 'fields' not in grid.quality()
+
+
+def test_cgrid_quality_folded():
+    # a left-handed grid with one interior vertex pushed past its neighbour
+    y, x = numpy.mgrid[0:5.0, 0:6.0]
+    x = x[:, ::-1].copy()
+    x[2, 2] = 4.6
+    grid = pygridgen.grid.CGrid(x, y)
+
+    quality = grid.quality(tile_rows=1, fields=True)
+    assert quality['inverted'] == 2
+    jacobian = quality['fields']['jacobian']
+    assert numpy.sum(jacobian <= 0) == 2
+    assert jacobian[0, 0] == pytest.approx(1)
+
+    full = grid.quality(tile_rows=100, fields=True)
+    for name, values in quality['fields'].items():
+        nptest.assert_array_almost_equal(values, full['fields'][name])
+
+
+def test_cgrid_quality_masked():
+    grid = masked_cgrid()
+    quality = grid.quality(tile_rows=2, fields=True)
+    wet = (grid.mask_rho != 0) & ~numpy.ma.getmaskarray(grid.x_rho)
+    assert quality['cells'] == wet.sum() < grid.x_rho.size
+    for counts, _ in quality['histograms'].values():
+        assert counts.sum() == quality['cells']
+    assert quality['fields']['aspect_ratio'].mask[0, 0]
+    assert quality['fields']['aspect_ratio'].mask[-1, -1]
+
+
+def test_cgrid_quality_size_ratio_dry():
+    # cells in the last column are 4 times as large, but dry
+    y, x = numpy.mgrid[0:4.0, 0:5.0]
+    x[:, -1] = 7
+    grid = pygridgen.grid.CGrid(x, y)
+    assert grid.quality(fields=True)['fields']['size_ratio'][1, 2] == 4
+    grid.mask_rho[:, -1] = 0
+    for tile_rows in [1, 100]:
+        quality = grid.quality(tile_rows=tile_rows, fields=True)
+        assert quality['summary']['size_ratio']['max'] == 1
+        nptest.assert_array_equal(quality['fields']['size_ratio'][:, :3], 1)
+
+
+@pytest.mark.parametrize('method', ['laplace', 'winslow'])
+def test_cgrid_smooth(method):
+    y, x = numpy.mgrid[0:11.0, 0:16.0]
+    rng = numpy.random.RandomState(0)
+    noisy_x, noisy_y = x.copy(), y.copy()
+    noisy_x[1:-1, 1:-1] += rng.uniform(-0.3, 0.3, (9, 14))
+    noisy_y[1:-1, 1:-1] += rng.uniform(-0.3, 0.3, (9, 14))
+    grid = pygridgen.grid.CGrid(noisy_x, noisy_y)
+
+    smooth = grid.smooth(method, iterations=1000, tol=1e-9)
+    before, after = smooth.smoothing['orthogonality']
+    assert smooth.smoothing['iterations'] < 1000
+    assert after < 1e-3 < before
+    nptest.assert_array_almost_equal(smooth.x_vert, x, decimal=3)
+    nptest.assert_array_almost_equal(smooth.y_vert, y, decimal=3)
+    nptest.assert_array_equal(grid.x_vert, noisy_x)
+
+    threaded = grid.smooth(method, iterations=1000, tol=1e-9, workers=3)
+    nptest.assert_array_equal(threaded.x_vert, smooth.x_vert)
+
+    relaxed = grid.smooth(method, iterations=1000, tol=1e-9, relaxation=1.5)
+    assert relaxed.smoothing['iterations'] < smooth.smoothing['iterations']
+    nptest.assert_array_almost_equal(relaxed.x_vert, x, decimal=3)
+
+
+def test_cgrid_smooth_sliding_boundary():
+    y, x = numpy.mgrid[0:11.0, 0:11.0]
+    grid = pygridgen.grid.CGrid(x + 0.4 * y, y)
+
+    fixed = grid.smooth('winslow', iterations=500)
+    nptest.assert_array_almost_equal(fixed.x_vert, grid.x_vert)
+
+    sliding = grid.smooth('winslow', iterations=500, fix_boundary=False)
+    assert sliding.smoothing['orthogonality'][1] < 0.5 * fixed.smoothing['orthogonality'][1]
+    # boundary vertices stay on the original boundary, and the corners stay put
+    nptest.assert_array_almost_equal(sliding.y_vert[0], 0)
+    nptest.assert_array_almost_equal(sliding.y_vert[-1], 10)
+    nptest.assert_array_almost_equal(sliding.x_vert[:, 0], 0.4 * sliding.y_vert[:, 0])
+    for corner in [(0, 0), (0, -1), (-1, 0), (-1, -1)]:
+        assert sliding.x_vert[corner] == grid.x_vert[corner]
+    assert numpy.all(numpy.diff(sliding.x_vert[0]) > 0)
+
+
+def test_cgrid_smooth_masked():
+    grid = masked_cgrid()
+    grid.x_vert[4, 5] += 0.3
+    smooth = grid.smooth('winslow')
+    nptest.assert_array_equal(smooth.x_vert.mask, grid.x_vert.mask)
+    nptest.assert_array_equal(smooth.mask_rho, grid.mask_rho)
+    assert abs(smooth.x_vert[4, 5] - 5) < 0.01
+    # next to the masked corner, so it doesn't move
+    assert smooth.x_vert[3, 3] == grid.x_vert[3, 3]
+
+    with pytest.raises(ValueError):
+        grid.smooth('bogus')
+
+
+def test_gridgen_numpy_engine():
+    x, y, beta = boundary_planar()
+    grid = pygridgen.Gridgen(x, y, beta, shape=(10, 5), engine='numpy')
+    assert grid.x.shape == (10, 5)
+    assert grid._gn is None and grid.solver_state is None
+
+    # same layout as gridgen-c: ul_idx is the first vertex of the last row
+    nptest.assert_array_almost_equal(
+        [grid.x[-1, 0], grid.y[-1, 0], grid.x[0, 0], grid.y[0, 0], grid.x[0, -1], grid.y[0, -1]],
+        [0, 0, 1, 0, 1, 1]
+    )
+    nptest.assert_array_almost_equal(grid.x[-1], 0)
+    nptest.assert_array_almost_equal(grid.y[:, 0], 0)
+    nptest.assert_array_almost_equal(grid.y[:, -1], 1)
+    nptest.assert_array_almost_equal(grid.y, 1 - grid.y[:, ::-1])
+    assert grid.quality()['inverted'] == 0
+
+    grid2 = pygridgen.Gridgen.from_spec(grid.to_spec())
+    assert grid2.engine == 'numpy'
+    nptest.assert_array_equal(grid2.x, grid.x)
+
+
+def test_gridgen_numpy_engine_subprocess():
+    x, y, beta = boundary_planar()
+    expected = pygridgen.Gridgen(x, y, beta, shape=(10, 5), engine='numpy')
+
+    grid = pygridgen.Gridgen(x, y, beta, shape=(10, 5), engine='numpy', autogen=False)
+    grid.generate_grid(timeout=60)
+    nptest.assert_array_almost_equal(grid.x, expected.x)
+    assert grid.solver_state is None
+
+    messages = []
+    grid.generate_grid(progress=messages.append)
+    nptest.assert_array_almost_equal(grid.y, expected.y)
+
+    grid = pygridgen.Gridgen(x, y, beta, shape=(10, 5), engine='numpy', autogen=False)
+    assert grid.generate_robust(configs=[{}]) is grid
+    nptest.assert_array_almost_equal(grid.x, expected.x)
+    assert grid.solver_state is None
+
+
+def test_gridgen_numpy_engine_focus():
+    focus = make_focus()
+    grid = pygridgen.Gridgen([0, 4, 4, 0], [0, 0, 2, 2], [1, 1, 1, 1], shape=(6, 9),
+                             focus=focus, engine='numpy')
+    v, u = numpy.mgrid[0:1:6j, 0:1:9j]
+    u, v = focus(u, v)
+    nptest.assert_array_almost_equal(grid.y, 2 * u)
+    nptest.assert_array_almost_equal(grid.x, 4 * (1 - v))
+
+
+def test_gridgen_numpy_engine_errors():
+    x = [0.50, 2.00, 2.00, 3.50, 3.50, 2.00, 2.00, 0.50, 0.50]
+    y = [0.50, 0.50, 1.75, 1.75, 2.25, 2.25, 3.50, 3.50, 0.50]
+    beta = [1, 1, -1, 1, 1, -1, 1, 1, 0]
+    with pytest.raises(ValueError, match='four corners'):
+        pygridgen.Gridgen(x, y, beta, shape=(20, 10), engine='numpy')
+
+    with pytest.raises(ValueError, match='engine'):
+        pygridgen.Gridgen(x, y, beta, shape=(20, 10), engine='bogus')
+
+
+def test_cgrid_refine():
+    # cubic in index space, which cubic Lagrange interpolation reproduces
+    j, i = numpy.mgrid[0:8.0, 0:10.0]
+    grid = pygridgen.grid.CGrid(0.01 * i ** 3 + j, 0.05 * j ** 3 - 0.2 * i ** 2 + i)
+    grid.mask_rho[4, 6] = 0
+
+    child, index_map = grid.refine(2, 9, 1, 7, ratio=3)
+    assert child.x_vert.shape == (19, 22)
+    jc, ic = numpy.meshgrid(index_map['j_vert'], index_map['i_vert'], indexing='ij')
+    nptest.assert_array_almost_equal(child.x_vert, 0.01 * ic ** 3 + jc)
+    nptest.assert_array_almost_equal(child.y_vert, 0.05 * jc ** 3 - 0.2 * ic ** 2 + ic)
+    nptest.assert_array_equal(child.x_vert[index_map['child']], grid.x_vert[index_map['parent']])
+
+    assert index_map['j_rho'].size == 18 and index_map['i_rho'].size == 21
+    parent_mask = grid.mask_rho[numpy.ix_(index_map['j_rho'], index_map['i_rho'])]
+    nptest.assert_array_equal(child.mask_rho, parent_mask)
+    assert child.mask_rho.sum() == child.mask_rho.size - 9
+
+    smoothed, _ = grid.refine(2, 9, 1, 7, ratio=3, smooth=5)
+    nptest.assert_array_equal(smoothed.x_vert[0], child.x_vert[0])
+
+    with pytest.raises(ValueError):
+        grid.refine(2, 10, 1, 7)
+
+
+def test_cgrid_refine_masked():
+    grid = masked_cgrid()
+    child, index_map = grid.refine(0, 7, 0, 6, ratio=2)
+    nptest.assert_array_equal(child.x_vert[index_map['child']], grid.x_vert)
+    assert numpy.ma.getmaskarray(child.x_vert)[:6, :6].all()
+    assert child.mask_rho[:6, :6].sum() == 0 and child.mask_rho[6:, 6:-2].all()
+
+    utm = pyproj.Proj(proj='utm', zone=10, ellps='WGS84')
+    geo = geo_grid(utm)
+    child, index_map = geo.refine(0, 3, 0, 3, ratio=2)
+    assert isinstance(child, pygridgen.grid.CGrid_geo)
+    nptest.assert_array_almost_equal(child.lon_vert[index_map['child']], geo.lon_vert[:4, :4])
+
+
+def test_cgrid_subset():
+    grid = masked_cgrid()
+    grid.mask_rho[4, 2] = 0
+    sub = grid.subset(2, 6, 1, -1)
+
+    assert sub.x_vert.shape == (5, 6)
+    assert numpy.shares_memory(sub.x_vert, grid.x_vert)
+    assert numpy.shares_memory(sub.mask_rho, grid.mask_rho)
+    assert sub._cache == {}
+    nptest.assert_array_equal(sub.mask_rho, grid.mask_rho[2:6, 1:6])
+    assert sub.mask_rho[2, 1] == 0
+    for name in ['x_rho', 'y_rho', 'dx', 'dy', 'area']:
+        nptest.assert_array_equal(getattr(sub, name), getattr(grid, name)[2:6, 1:6])
+    nptest.assert_array_equal(sub.x_u, grid.x_u[2:6, 1:5])
+
+    nptest.assert_array_equal(grid[2:6, 1:-1].x_vert, sub.x_vert)
+
+    # item assignments to the mask are shared, new masks are not
+    sub.mask_rho[0, 0] = 0
+    assert grid.mask_rho[2, 1] == 0
+    wet = grid.mask_rho.sum()
+    sub.mask_polygon(numpy.array([[0, 3], [8, 3], [8, 8], [0, 8]]))
+    assert sub.mask_rho[1:].sum() == 0
+    assert grid.mask_rho.sum() == wet
+    assert not numpy.shares_memory(sub.mask_rho, grid.mask_rho)
+    nptest.assert_array_equal(grid[:, -2:].x_rho, grid.x_rho[:, -2:])
+
+    with pytest.raises(ValueError):
+        grid.subset(3, 3)
+    with pytest.raises(ValueError):
+        grid[::2, :]
+    with pytest.raises(TypeError):
+        grid[2]
+
+
+def test_cgrid_geo_subset():
+    utm = pyproj.Proj(proj='utm', zone=10, ellps='WGS84')
+    proj = CountingProj(utm)
+    grid = geo_grid(proj)
+    sub = grid[1:5, 2:6]
+    assert isinstance(sub, pygridgen.grid.CGrid_geo)
+    assert proj.calls == {False: 1, True: 0}
+    nptest.assert_array_almost_equal(sub.lon_rho, grid.lon_rho[1:5, 2:6])
+    nptest.assert_array_almost_equal(sub.dx, grid.dx[1:5, 2:6])
+
+
+def tile_points(grid):
+    return grid.x_rho, grid.y_u, grid.x_v, grid.y_psi, grid.x_vert
+
+
+def test_cgrid_tiles():
+    grid = masked_cgrid()
+    tiles = list(grid.tiles((4, 3), halo=1))
+    assert [tile.index for tile in tiles] == [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2)]
+
+    tile = tiles[4]
+    assert (tile.rows, tile.cols) == (slice(4, 6), slice(3, 6))
+    assert tile.grid.mask_rho.shape == (3, 5)
+    assert numpy.shares_memory(tile.grid.x_vert, grid.x_vert)
+    nptest.assert_array_equal(tile.grid.x_rho[tile.interior], grid.x_rho[4:6, 3:6])
+
+
+@pytest.mark.parametrize(('workers', 'backend'), [(None, 'thread'), (2, 'thread'), (2, 'process')])
+def test_cgrid_map_tiles(workers, backend):
+    grid = masked_cgrid()
+    outputs = grid.map_tiles(tile_points, tile_shape=(4, 3), workers=workers, backend=backend)
+    for output, known in zip(outputs, tile_points(grid)):
+        assert output.shape == known.shape
+        nptest.assert_array_equal(numpy.ma.getmaskarray(output), numpy.ma.getmaskarray(known))
+        nptest.assert_array_equal(output, known)
+
+    area = grid.map_tiles(lambda g: numpy.ma.getdata(g.area), tile_shape=(2, 2), halo=0)
+    assert not numpy.ma.isMaskedArray(area)
+    nptest.assert_array_equal(area, numpy.ma.getdata(grid.area))
+
+
+def test_cgrid_map_tiles_errors():
+    grid = masked_cgrid()
+    with pytest.raises(ValueError, match='halo'):
+        grid.map_tiles(lambda g: g.x_u, tile_shape=(2, 2), halo=0)
+    with pytest.raises(ValueError, match='cannot place'):
+        grid.map_tiles(lambda g: numpy.zeros((1, 1)), tile_shape=(3, 3))
+    with pytest.raises(ValueError, match='backend'):
+        grid.map_tiles(tile_points, backend='mpi')
+
+
+def test_cgrid_sample():
+    grid = masked_cgrid()
+    calls = []
+
+    def surface(x, y):
+        calls.append(x.shape)
+        z = x + 2 * y
+        return numpy.where(x > 6.5, numpy.nan, z)
+
+    z = grid.sample(surface)
+    wet = (grid.mask_rho != 0) & ~numpy.ma.getmaskarray(grid.x_rho)
+    assert calls == [(wet.sum(),)]
+    nptest.assert_array_equal(z.mask, ~wet | (grid.x_rho > 6.5))
+    nptest.assert_array_equal(z.compressed(), (grid.x_rho + 2 * grid.y_rho)[~z.mask])
+
+    z = grid.sample(surface, point='u', wet_only=False)
+    assert calls[-1] == (numpy.ma.count(grid.x_u),)
+    nptest.assert_array_almost_equal(z[3:], (grid.x_u + 2 * grid.y_u)[3:])
+
+    with pytest.raises(ValueError):
+        grid.sample(surface, point='w')
+
+
+def test_public_names():
+    for name in pygridgen.grid.__all__:
+        assert getattr(pygridgen, name) is getattr(pygridgen.grid, name)
+    for name in ['logger', 'time', 'json', 're', 'multiprocessing', 'numpy']:
+        assert not hasattr(pygridgen, name)
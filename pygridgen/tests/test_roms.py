@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+import numpy
+import numpy.testing as nptest
+import pytest
+
+import pygridgen
+from pygridgen import roms
+
+
+def curved_grid():
+    j, i = numpy.mgrid[0:1:23j, 0:1:11j]
+    x = (1 + i) * numpy.cos(j)
+    y = (1 + i) * numpy.sin(j)
+    x = numpy.ma.masked_where((i > 0.7) & (j > 0.8), x)
+    y = numpy.ma.MaskedArray(y, mask=x.mask)
+    grid = pygridgen.grid.CGrid(x, y)
+    grid.mask_rho[5, 5] = 0
+    return grid
+
+
+def known_values(grid, name):
+    if name == 'angle':
+        return grid.angle_rho
+    if name == 'f':
+        return numpy.zeros(grid.x_rho.shape)
+    return getattr(grid, name)
+
+
+@pytest.mark.parametrize('tile_rows', [1, 4, 100])
+def test_write_grid_npy(tile_rows):
+    grid = curved_grid()
+    with tempfile.TemporaryDirectory() as folder:
+        path = roms.write_grid(grid, os.path.join(folder, 'grid'), tile_rows=tile_rows, backend='npy')
+        for name, point, _ in roms._VARIABLES:
+            result = numpy.load(os.path.join(path, name + '.npy'))
+            known = numpy.ma.filled(known_values(grid, name), numpy.nan)
+            nptest.assert_array_almost_equal(result, known, err_msg=name)
+
+
+def test_write_grid_netcdf():
+    netCDF4 = pytest.importorskip('netCDF4')
+    grid = curved_grid()
+    with tempfile.TemporaryDirectory() as folder:
+        path = roms.write_grid(grid, os.path.join(folder, 'grid.nc'), tile_rows=5)
+        with netCDF4.Dataset(path) as dataset:
+            assert dataset['spherical'][...] == b'F'
+            assert dataset.dimensions['eta_psi'].size == 21
+            for name, point, _ in roms._VARIABLES:
+                nptest.assert_array_almost_equal(dataset[name][:], known_values(grid, name), err_msg=name)
+
+
+def test_write_grid_bad_backend():
+    with pytest.raises(ValueError):
+        roms.write_grid(curved_grid(), 'unused', backend='zarr')
+
+
+def test_write_grid_geographic():
+    pyproj = pytest.importorskip('pyproj')
+    lat, lon = numpy.mgrid[44.5:45.5:9j, -123.0:-122.0:7j]
+    grid = pygridgen.grid.CGrid_geo(lon, lat, pyproj.Proj(proj='utm', zone=10, ellps='WGS84'))
+    with tempfile.TemporaryDirectory() as folder:
+        path = roms.write_grid(grid, os.path.join(folder, 'grid'), tile_rows=3, backend='npy')
+        for name in ['lon_psi', 'lat_v', 'pm', 'dmde', 'f']:
+            result = numpy.load(os.path.join(path, name + '.npy'))
+            nptest.assert_array_almost_equal(result, getattr(grid, name), err_msg=name)
@@ -16,3 +16,50 @@ def test_requires(obj, error):
             return 4
 
         assert foo() == 4
+
+
+def test_capture_fd():
+    import os
+
+    lines = []
+    with utils.capture_fd(lines.append):
+        os.write(2, b'first line\n\nsecond line\n')
+    assert lines == ['first line', 'second line']
+
+
+def test_capture_fd_threads():
+    import os
+    import threading
+
+    before = os.fstat(2)
+    captured = {}
+
+    def capture(i):
+        lines = []
+        for _ in range(20):
+            with utils.capture_fd(lines.append):
+                os.write(2, f'thread {i}\n'.encode())
+        captured[i] = lines
+
+    threads = [threading.Thread(target=capture, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for i, lines in captured.items():
+        assert lines == [f'thread {i}'] * 20
+    after = os.fstat(2)
+    assert (after.st_dev, after.st_ino) == (before.st_dev, before.st_ino)
+
+
+def test_log_native_output_error():
+    import os
+    import logging
+
+    logger = logging.getLogger('pygridgen.tests')
+    parse = lambda line: {'message': line, 'stage': 'a'}  # noqa: E731
+    with pytest.raises(ValueError), utils.log_native_output(logger, parse) as native:
+        os.write(2, b'stage a\n')
+        raise ValueError
+    assert 'a' in native.timings
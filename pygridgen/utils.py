@@ -1,3 +1,7 @@
+import os
+import time
+import threading
+import contextlib
 from functools import wraps
 
 import numpy
@@ -24,3 +28,140 @@ def seed(func):
         numpy.random.seed(0)
         return func(*args, **kwargs)
     return wrapper
+
+
+# file descriptors belong to the whole process, so only one thread at a
+# time may redirect them
+_CAPTURE_LOCK = threading.RLock()
+
+
+@contextlib.contextmanager
+def capture_fd(callback, fd=2, echo=False):
+    """
+    Redirect everything written to the file descriptor ``fd`` (stderr
+    by default, which is where gridgen-c and csa print) into a pipe and
+    call ``callback`` with each non-empty line, from a reader thread.
+    Unlike ``contextlib.redirect_stderr``, this also catches output of
+    native code. With ``echo``, the lines are still written to ``fd``
+    as well.
+
+    The redirection is process-wide: whatever any thread writes to
+    ``fd`` meanwhile is captured too, and other threads wanting to
+    capture wait until this one is done.
+    """
+    with _CAPTURE_LOCK, _redirect_fd(callback, fd, echo):
+        yield
+
+
+@contextlib.contextmanager
+def _redirect_fd(callback, fd, echo):
+    read_fd, write_fd = os.pipe()
+    try:
+        saved_fd = os.dup(fd)
+    except OSError:
+        os.close(read_fd)
+        os.close(write_fd)
+        raise
+    try:
+        os.dup2(write_fd, fd)
+    except OSError:
+        os.close(read_fd)
+        os.close(saved_fd)
+        raise
+    finally:
+        os.close(write_fd)
+
+    def reader():
+        with os.fdopen(read_fd, 'r', errors='replace') as stream:
+            for line in stream:
+                if echo:
+                    os.write(saved_fd, line.encode())
+                line = line.rstrip()
+                if line:
+                    callback(line)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    try:
+        thread.start()
+        yield
+    finally:
+        # closing the last write end lets the reader reach EOF, and it
+        # may still echo to saved_fd until then
+        os.dup2(saved_fd, fd)
+        if thread.ident is not None:
+            thread.join()
+        os.close(saved_fd)
+
+
+class NativeLog:
+    """
+    Callable that turns the lines printed by gridgen-c or csa into
+    ``logging`` records and splits the elapsed time between the stages
+    they announce.
+
+    Parameters
+    ----------
+    logger : logging.Logger
+    parse : callable
+        Turns a line into a dictionary with (at least) the ``message``
+        and the ``stage`` it belongs to (None to stay in the current
+        stage).
+
+    Attributes
+    ----------
+    timings : dict
+        Seconds spent in each stage, counted from the line announcing it
+        to the line announcing the next one (or :meth:`close`).
+
+    """
+
+    def __init__(self, logger, parse):
+        self.logger = logger
+        self.parse = parse
+        self.timings = {}
+        self._stage = None
+        self._since = time.perf_counter()
+
+    def _tick(self, now=None):
+        if now is None:
+            now = time.perf_counter()
+        if self._stage is not None:
+            self.timings[self._stage] = self.timings.get(self._stage, 0.0) + now - self._since
+        self._since = now
+
+    def __call__(self, line, now=None):
+        info = self.parse(line)
+        self._tick(now)
+        self._stage = info['stage'] or self._stage
+        self.logger.info(info['message'], extra={'stage': self._stage, 'native': info})
+        return info
+
+    def close(self, now=None):
+        """ Stop the clock on the current stage. """
+        self._tick(now)
+        self._stage = None
+        return self.timings
+
+
+@contextlib.contextmanager
+def log_native_output(logger, parse, fd=2):
+    """
+    Capture what native code prints to ``fd`` into ``logger`` (see
+    :class:`~NativeLog`). When logging isn't configured, the output is
+    also echoed like before, so ``verbose`` still shows something.
+
+    The records are only emitted once ``fd`` is restored: a handler
+    writing to stderr would otherwise feed its own output back in. As
+    with :func:`~capture_fd`, the capture is process-wide.
+    """
+    native = NativeLog(logger, parse)
+    lines = []
+    try:
+        with capture_fd(lambda line: lines.append((time.perf_counter(), line)), fd=fd,
+                        echo=not logger.hasHandlers()):
+            yield native
+    finally:
+        end = time.perf_counter()
+        for now, line in lines:
+            native(line, now)
+        native.close(end)